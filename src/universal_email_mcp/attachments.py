@@ -0,0 +1,171 @@
+"""Incremental decoding and resumable storage of attachment downloads.
+
+A download writes decoded bytes to "<file>.part" next to a small JSON state
+file recording how many encoded octets of the MIME part were consumed and
+any undecoded tail. Downloading the same part of the same message again
+(same UIDVALIDITY) resumes from there instead of starting over.
+"""
+
+import binascii
+import json
+import logging
+import os
+import quopri
+import re
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+ATTACHMENT_CHUNK_BYTES = int(
+    float(os.getenv("UNIVERSAL_EMAIL_MCP_ATTACHMENT_CHUNK_KB", "512")) * 1024
+)
+DOWNLOAD_DIR = Path(
+    os.getenv("UNIVERSAL_EMAIL_MCP_DOWNLOAD_DIR", "~/Downloads")
+).expanduser()
+
+_UNSAFE_FILENAME_RE = re.compile(r'[\x00-\x1f<>:"/\\|?*]')
+
+
+class IdentityDecoder:
+    """Passes 7bit, 8bit and binary content through unchanged."""
+
+    def __init__(self, carry: bytes = b""):
+        self.carry = b""
+
+    def feed(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class Base64Decoder:
+    """Decodes base64 split at arbitrary points, keeping incomplete quanta."""
+
+    def __init__(self, carry: bytes = b""):
+        self.carry = carry
+
+    def feed(self, data: bytes) -> bytes:
+        data = self.carry + b"".join(data.split())
+        usable = len(data) // 4 * 4
+        self.carry = data[usable:]
+        return binascii.a2b_base64(data[:usable])
+
+    def flush(self) -> bytes:
+        # A truncated final quantum only happens with broken senders; pad it.
+        tail, self.carry = self.carry, b""
+        if len(tail) < 2:
+            return b""
+        return binascii.a2b_base64(tail + b"=" * (-len(tail) % 4))
+
+
+class QuotedPrintableDecoder:
+    """Decodes quoted-printable a line at a time so escapes are never split."""
+
+    def __init__(self, carry: bytes = b""):
+        self.carry = carry
+
+    def feed(self, data: bytes) -> bytes:
+        data = self.carry + data
+        cut = data.rfind(b"\n") + 1
+        if not cut:
+            # No line break in sight: keep only a possibly incomplete =XX escape.
+            escape = data.rfind(b"=", max(len(data) - 2, 0))
+            cut = escape if escape >= 0 else len(data)
+        self.carry = data[cut:]
+        return quopri.decodestring(data[:cut])
+
+    def flush(self) -> bytes:
+        tail, self.carry = self.carry, b""
+        return quopri.decodestring(tail)
+
+
+def make_decoder(encoding: str, carry: bytes = b""):
+    """Decoder for a content-transfer-encoding, seeded with a saved tail."""
+    if encoding == "base64":
+        return Base64Decoder(carry)
+    if encoding == "quoted-printable":
+        return QuotedPrintableDecoder(carry)
+    return IdentityDecoder(carry)
+
+
+def safe_filename(name: str | None, fallback: str) -> str:
+    """A file name without path components or characters filesystems reject."""
+    name = _UNSAFE_FILENAME_RE.sub("_", os.path.basename(name or "")).strip(" .")
+    return name or fallback
+
+
+class ResumableDownload:
+    """Decoded output of one MIME part plus the state needed to resume it."""
+
+    def __init__(self, path: Path, key: dict[str, Any]):
+        self.path = path
+        self.partial_path = path.with_name(path.name + ".part")
+        self.state_path = path.with_name(path.name + ".part.json")
+        self.key = key
+        self.offset = 0
+        self.carry = b""
+        self.resumed = False
+        self._file = None
+
+    def open(self) -> None:
+        """Open the partial file, resuming when its state matches this part."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        state = self._load_state()
+        if (
+            state is not None
+            and state.get("key") == self.key
+            and self.partial_path.exists()
+            and self.partial_path.stat().st_size >= state["decoded_size"]
+        ):
+            self._file = open(self.partial_path, "r+b")
+            self._file.truncate(state["decoded_size"])
+            self._file.seek(0, os.SEEK_END)
+            self.offset = state["offset"]
+            self.carry = state["carry"].encode("latin-1")
+            self.resumed = True
+            logger.info(f"Resuming download of {self.path.name} at octet {self.offset}")
+        else:
+            self._file = open(self.partial_path, "wb")
+
+    def write(self, data: bytes, offset: int, carry: bytes) -> None:
+        """Append decoded bytes and record how far into the encoded part they reach."""
+        self._file.write(data)
+        self._file.flush()
+        self.offset, self.carry = offset, carry
+        self._save_state()
+
+    def complete(self) -> int:
+        """Move the finished file into place; returns its size."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        size = self._file.tell()
+        self._file.close()
+        self._file = None
+        os.replace(self.partial_path, self.path)
+        self.state_path.unlink(missing_ok=True)
+        return size
+
+    def close(self) -> None:
+        """Close an unfinished download, leaving it resumable."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _load_state(self) -> dict[str, Any] | None:
+        try:
+            return json.loads(self.state_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _save_state(self) -> None:
+        state = {
+            "key": self.key,
+            "offset": self.offset,
+            "decoded_size": self._file.tell(),
+            "carry": self.carry.decode("latin-1"),
+        }
+        temp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        temp_path.write_text(json.dumps(state))
+        os.replace(temp_path, self.state_path)
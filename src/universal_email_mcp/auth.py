@@ -19,6 +19,8 @@ from starlette.types import Scope, Receive, Send
 from starlette.responses import JSONResponse
 import logging
 
+from . import blocking
+
 logger = logging.getLogger("universal-email-mcp-auth")
 
 
@@ -150,7 +152,7 @@ class BearerTokenValidator(AuthenticationBackend):
         if scheme.lower() != "bearer":
             raise AuthenticationError("Invalid authentication scheme")
         
-        if not self.token_manager.validate_token(token):
+        if not await blocking.run(self.token_manager.validate_token, token):
             raise AuthenticationError("Invalid or expired token")
         
         # Return authenticated scope with basic credentials
@@ -224,7 +226,7 @@ class MCPAuthMiddleware:
             await response(scope, receive, send)
             return
         
-        if not self.token_manager.validate_token(token):
+        if not await blocking.run(self.token_manager.validate_token, token):
             response = JSONResponse(
                 {"error": {"code": 403, "message": "Invalid or expired token"}},
                 status_code=403
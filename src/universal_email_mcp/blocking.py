@@ -0,0 +1,91 @@
+"""Blocking crypto, keyring and file I/O, off the event loop.
+
+Decrypting the configuration, asking the system keyring for the key (a
+D-Bus round trip with the Secret Service backend) and reading token or
+spool files all block. Called from a coroutine, they stall every other
+session for their duration. run() executes them in a small dedicated
+thread pool instead, kept apart from the loop's default executor so IMAP
+and SMTP work queued there cannot delay them.
+
+LoopStallMonitor measures the effect: it logs whenever the loop wakes a
+timer later than UNIVERSAL_EMAIL_MCP_LOOP_STALL_WARN_MS.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import suppress
+from typing import Any, TypeVar
+
+logger = logging.getLogger(__name__)
+
+BLOCKING_IO_WORKERS = int(os.getenv("UNIVERSAL_EMAIL_MCP_BLOCKING_IO_WORKERS", "4"))
+LOOP_STALL_WARN_MS = float(os.getenv("UNIVERSAL_EMAIL_MCP_LOOP_STALL_WARN_MS", "0"))
+
+T = TypeVar("T")
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(BLOCKING_IO_WORKERS, 1), thread_name_prefix="blocking-io"
+        )
+    return _executor
+
+
+async def run(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Call func in the blocking I/O threads and await its result."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+def shutdown() -> None:
+    """Stop the thread pool; used on server shutdown."""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+class LoopStallMonitor:
+    """Measures how long callbacks keep the event loop from running anything else."""
+
+    def __init__(self, warn_ms: float = LOOP_STALL_WARN_MS, interval: float = 0.05):
+        self.warn_ms = warn_ms
+        self.interval = interval
+        self.max_stall_ms = 0.0
+        self.total_stall_ms = 0.0
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="loop-stall-monitor")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            # Anything beyond the requested sleep is time the loop spent elsewhere.
+            stall_ms = max(loop.time() - started - self.interval, 0) * 1000
+            self.total_stall_ms += stall_ms
+            self.max_stall_ms = max(self.max_stall_ms, stall_ms)
+            if self.warn_ms and stall_ms >= self.warn_ms:
+                logger.warning(f"Event loop was blocked for {stall_ms:.0f} ms")
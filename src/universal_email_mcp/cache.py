@@ -0,0 +1,138 @@
+"""In-memory LRU cache of parsed messages for Universal Email MCP Server.
+
+Entries are keyed by (account, mailbox, UIDVALIDITY, UID). A UID is only
+stable while the mailbox's UIDVALIDITY is unchanged, so a new UIDVALIDITY
+seen on SELECT drops every cached entry for that mailbox.
+"""
+
+import logging
+import os
+from collections import OrderedDict
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_CACHE_MAX_BYTES = int(
+    float(os.getenv("UNIVERSAL_EMAIL_MCP_MESSAGE_CACHE_MB", "64")) * 1024 * 1024
+)
+
+# Rough per-entry overhead of the model object itself, on top of its strings.
+_ENTRY_OVERHEAD = 512
+
+CacheKey = tuple[str, str, int, str]
+
+
+def estimate_size(message: models.EmailMessage) -> int:
+    """Approximate memory held by a cached message, in bytes."""
+    return (
+        _ENTRY_OVERHEAD
+        + len(message.body.encode("utf-8"))
+        + len(message.subject.encode("utf-8"))
+        + len(message.sender.encode("utf-8"))
+        + len((message.preview or "").encode("utf-8"))
+    )
+
+
+class MessageCache:
+    """LRU of parsed EmailMessage objects bounded by total estimated size."""
+
+    def __init__(self, max_bytes: int = MESSAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: OrderedDict[CacheKey, tuple[models.EmailMessage, int]] = (
+            OrderedDict()
+        )
+        self._uidvalidity: dict[tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def uidvalidity(self, account: str, mailbox: str) -> int | None:
+        """The last UIDVALIDITY seen for a mailbox, if it was ever selected."""
+        return self._uidvalidity.get((account, mailbox))
+
+    def set_uidvalidity(self, account: str, mailbox: str, uidvalidity: int) -> None:
+        """Record UIDVALIDITY from a SELECT, invalidating the mailbox if it changed."""
+        previous = self._uidvalidity.get((account, mailbox))
+        if previous is not None and previous != uidvalidity:
+            logger.info(
+                f"UIDVALIDITY changed for {account}/{mailbox}; dropping cached messages"
+            )
+            self.invalidate_mailbox(account, mailbox)
+        self._uidvalidity[(account, mailbox)] = uidvalidity
+
+    def get(
+        self, account: str, mailbox: str, uidvalidity: int, uid: str
+    ) -> models.EmailMessage | None:
+        """Return a copy of a cached message and mark it most recently used."""
+        key = (account, mailbox, uidvalidity, uid)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0].model_copy()
+
+    def put(
+        self, account: str, mailbox: str, uidvalidity: int, message: models.EmailMessage
+    ) -> None:
+        """Cache a message, evicting least recently used entries to fit."""
+        size = estimate_size(message)
+        if size > self.max_bytes:
+            return
+
+        key = (account, mailbox, uidvalidity, message.uid)
+        self._pop(key)
+        self._entries[key] = (message.model_copy(), size)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+
+    def update_flags(self, account: str, mailbox: str, uid: str, is_read: bool) -> None:
+        """Apply a read-state change to a cached message, if present."""
+        uidvalidity = self.uidvalidity(account, mailbox)
+        entry = self._entries.get((account, mailbox, uidvalidity, uid))
+        if entry is not None:
+            entry[0].is_read = is_read
+
+    def update_flags_in_ranges(
+        self, account: str, mailbox: str, ranges: list[tuple[int, int]], is_read: bool
+    ) -> None:
+        """Apply a read-state change to the cached messages in inclusive UID ranges."""
+        uidvalidity = self.uidvalidity(account, mailbox)
+        for key, (message, _) in self._entries.items():
+            if key[:3] == (account, mailbox, uidvalidity) and any(
+                low <= int(key[3]) <= high for low, high in ranges
+            ):
+                message.is_read = is_read
+
+    def discard(self, account: str, mailbox: str, uid: str) -> None:
+        """Drop a single message, e.g. after it was expunged."""
+        self._pop((account, mailbox, self.uidvalidity(account, mailbox), uid))
+
+    def invalidate_mailbox(self, account: str, mailbox: str) -> None:
+        """Drop every cached message of a mailbox."""
+        for key in [k for k in self._entries if k[0] == account and k[1] == mailbox]:
+            self._pop(key)
+
+    def invalidate_account(self, account: str) -> None:
+        """Drop everything cached for an account."""
+        for key in [k for k in self._entries if k[0] == account]:
+            self._pop(key)
+        for mailbox_key in [k for k in self._uidvalidity if k[0] == account]:
+            del self._uidvalidity[mailbox_key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._uidvalidity.clear()
+        self.current_bytes = 0
+
+    def _pop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[1]
+
+
+message_cache = MessageCache()
@@ -0,0 +1,108 @@
+"""RFC 4978 COMPRESS=DEFLATE for aioimaplib connections.
+
+After a successful COMPRESS DEFLATE both directions carry a raw deflate
+stream. The protocol's transport is wrapped to compress what is written,
+and its data_received hook inflates what arrives before aioimaplib parses
+it. Byte counters per login (user@host) record traffic before and after
+compression.
+"""
+
+import asyncio
+import logging
+import zlib
+
+import aioimaplib
+
+logger = logging.getLogger(__name__)
+
+
+class CompressionCounters:
+    """Bytes exchanged by compressed connections, before and after deflate."""
+
+    def __init__(self):
+        self.raw_in = 0
+        self.wire_in = 0
+        self.raw_out = 0
+        self.wire_out = 0
+
+    @property
+    def saved(self) -> int:
+        """Bytes that did not cross the wire thanks to compression."""
+        return self.raw_in + self.raw_out - self.wire_in - self.wire_out
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "raw_in": self.raw_in,
+            "wire_in": self.wire_in,
+            "raw_out": self.raw_out,
+            "wire_out": self.wire_out,
+            "saved": self.saved,
+        }
+
+
+_counters: dict[str, CompressionCounters] = {}
+
+
+def get_counters(key: str) -> CompressionCounters:
+    """Return the counters for a login, creating them on first use."""
+    return _counters.setdefault(key, CompressionCounters())
+
+
+def compression_stats() -> dict[str, dict[str, int]]:
+    """Snapshot of the byte counters of every login."""
+    return {name: counters.as_dict() for name, counters in _counters.items()}
+
+
+class _DeflateTransport:
+    """Transport proxy that deflates everything written through it."""
+
+    def __init__(self, transport, counters: CompressionCounters):
+        self._transport = transport
+        self._compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+        self._counters = counters
+
+    def write(self, data: bytes) -> None:
+        # Each command is flushed so the server can act on it immediately.
+        compressed = self._compressor.compress(data)
+        compressed += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        self._counters.raw_out += len(data)
+        self._counters.wire_out += len(compressed)
+        self._transport.write(compressed)
+
+    def __getattr__(self, name):
+        return getattr(self._transport, name)
+
+
+async def enable_deflate(
+    client: aioimaplib.IMAP4, counters: CompressionCounters
+) -> bool:
+    """Negotiate COMPRESS=DEFLATE on an authenticated connection.
+
+    Returns False without touching the connection when the server does not
+    advertise the extension or refuses the command.
+    """
+    if not client.has_capability("COMPRESS=DEFLATE"):
+        return False
+
+    protocol = client.protocol
+    command = aioimaplib.Command(
+        "COMPRESS", protocol.new_tag(), "DEFLATE", loop=protocol.loop
+    )
+    response = await asyncio.wait_for(protocol.execute(command), client.timeout)
+    if response.result != "OK":
+        logger.info(f"Server refused COMPRESS=DEFLATE: {response.lines}")
+        return False
+
+    decompressor = zlib.decompressobj(wbits=-zlib.MAX_WBITS)
+    receive = protocol.data_received
+
+    def data_received(data: bytes) -> None:
+        plain = decompressor.decompress(data)
+        counters.wire_in += len(data)
+        counters.raw_in += len(plain)
+        if plain:
+            receive(plain)
+
+    protocol.data_received = data_received
+    protocol.transport = _DeflateTransport(protocol.transport, counters)
+    return True
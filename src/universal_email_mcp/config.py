@@ -2,15 +2,25 @@ from __future__ import annotations
 
 import base64
 import json
+import logging
 import os
+import threading
+import uuid
+from collections.abc import Iterable
 from pathlib import Path
+from typing import ClassVar
 
 import tomli_w
 from cryptography.fernet import Fernet, InvalidToken
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from . import blocking
+
+logger = logging.getLogger(__name__)
+
 CONFIG_PATH = Path("~/.config/universal_email_mcp/config.toml").expanduser()
+CONFIG_INDEX_VERSION = 2
 
 
 class EmailServer(BaseModel):
@@ -21,6 +31,7 @@ class EmailServer(BaseModel):
     port: int
     use_ssl: bool = True
     verify_ssl: bool = True
+    use_compression: bool = True
 
 
 class EmailSettings(BaseModel):
@@ -31,6 +42,14 @@ class EmailSettings(BaseModel):
     incoming: EmailServer
     outgoing: EmailServer
 
+    @field_validator("outgoing")
+    @classmethod
+    def _outgoing_without_compression(cls, server: EmailServer) -> EmailServer:
+        # COMPRESS=DEFLATE is an IMAP extension; SMTP has no equivalent.
+        if server.use_compression:
+            server = server.model_copy(update={"use_compression": False})
+        return server
+
 
 class Settings(BaseSettings):
 
@@ -42,6 +61,10 @@ class Settings(BaseSettings):
 
     accounts: list[EmailSettings] = Field(default_factory=list)
 
+    # Accounts by name, rebuilt whenever the accounts list is replaced.
+    _index: dict[str, EmailSettings] = PrivateAttr(default_factory=dict)
+    _indexed: list[EmailSettings] | None = PrivateAttr(default=None)
+
     def store(self) -> None:
         CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
         data = {"accounts": [acc.model_dump() for acc in self.accounts]}
@@ -49,16 +72,25 @@ class Settings(BaseSettings):
         with open(CONFIG_PATH, "wb") as f:
             tomli_w.dump(data, f)
 
+    def account_names(self) -> list[str]:
+        return [account.account_name for account in self.accounts]
+
     def get_account(self, account_name: str) -> EmailSettings | None:
-        for account in self.accounts:
-            if account.account_name == account_name:
-                return account
-        return None
+        if self._indexed is not self.accounts:
+            self._index = {account.account_name: account for account in self.accounts}
+            self._indexed = self.accounts
+        return self._index.get(account_name)
 
     def add_account(self, account: EmailSettings) -> None:
         self.accounts = [acc for acc in self.accounts if acc.account_name != account.account_name]
         self.accounts.append(account)
 
+    def import_accounts(self, accounts: Iterable[EmailSettings]) -> None:
+        """Add or replace many accounts and save them once."""
+        for account in accounts:
+            self.add_account(account)
+        self.store()
+
     def remove_account(self, account_name: str) -> bool:
         initial_count = len(self.accounts)
         self.accounts = [acc for acc in self.accounts if acc.account_name != account_name]
@@ -66,12 +98,28 @@ class Settings(BaseSettings):
 
 
 class SecureConfigStore:
+    """Encrypts account records; the key is resolved on first use, not on creation."""
 
     _encryption_key: bytes | None = None
+    # Keys resolved in this process, by key file. Resolving may generate and
+    # save a new key, so only one thread at a time.
+    _keys: dict[Path, bytes] = {}
+    _key_lock = threading.Lock()
 
     def __init__(self) -> None:
         self._key_path = CONFIG_PATH.parent / "encryption.key"
-        self._setup_encryption_key()
+        self._fernet: Fernet | None = None
+
+    def _get_fernet(self) -> Fernet:
+        """The cipher, with the key from the keyring or key file looked up once."""
+        if self._fernet is None:
+            with self._key_lock:
+                key = self._keys.get(self._key_path)
+                if key is None:
+                    self._setup_encryption_key()
+                    key = SecureConfigStore._keys[self._key_path] = self._encryption_key
+                self._fernet = Fernet(key)
+        return self._fernet
 
     def _setup_encryption_key(self) -> None:
         # First, try to get key from system keyring
@@ -123,20 +171,14 @@ class SecureConfigStore:
             raise RuntimeError(f"Failed to save encryption key: {e}")
 
     def encrypt_data(self, data: dict) -> str:
-        if self._encryption_key is None:
-            raise ValueError("No encryption key available")
-
-        fernet = Fernet(self._encryption_key)
+        fernet = self._get_fernet()
         json_data = json.dumps(data, separators=(',', ':'), sort_keys=True)
         encrypted = fernet.encrypt(json_data.encode())
         return base64.b64encode(encrypted).decode()
 
     def decrypt_data(self, encrypted_data: str) -> dict:
-        if self._encryption_key is None:
-            raise ValueError("No encryption key available")
-
+        fernet = self._get_fernet()
         try:
-            fernet = Fernet(self._encryption_key)
             encrypted = base64.b64decode(encrypted_data.encode())
             decrypted = fernet.decrypt(encrypted)
             return json.loads(decrypted.decode())
@@ -144,100 +186,290 @@ class SecureConfigStore:
             raise ValueError("Failed to decrypt configuration data") from e
 
 
+def _records_dir() -> Path:
+    return CONFIG_PATH.parent / "accounts"
+
+
+def _write_file(path: Path, data: bytes, sync: bool = True) -> None:
+    """Write path via a temporary file and a rename; readers never see half a file."""
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        if sync:
+            os.fsync(f.fileno())
+    os.chmod(temp_path, 0o600)
+    os.replace(temp_path, path)
+
+
+def _fsync_directory(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
 class SecureSettings(Settings):
+    """Settings stored as one encrypted record per account plus a plaintext index.
+
+    CONFIG_PATH holds the index: a JSON object mapping each account name to
+    its record file in the accounts/ directory next to it. Every write of an
+    account goes to a new record file and becomes visible when the index is
+    atomically replaced, so a crash leaves either the old or the new state.
+    Saving re-encrypts only the accounts that changed.
+
+    Settings loaded from an index decrypt nothing up front: account_names()
+    comes from the index and get_account() decrypts the one record it
+    returns. The accounts list is decrypted in full on first access.
+    """
 
     _secure_store = None
-    _cache = {}
-    _cache_ttl = 30  # seconds
+    # Decrypted accounts by record file name. Record files are never
+    # rewritten in place, so entries stay valid across reloads, and are kept
+    # after a save deletes the file for settings loaded before it.
+    _decrypted: ClassVar[dict[str, EmailSettings]] = {}
+
+    # Record file of each account as of the last load or save.
+    _records: dict[str, str] = PrivateAttr(default_factory=dict)
+    # Accounts handed out by get_account() before the list was decrypted.
+    _loaded: dict[str, EmailSettings] = PrivateAttr(default_factory=dict)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if self._secure_store is None:
             SecureSettings._secure_store = SecureConfigStore()
 
-    def store(self) -> None:
-        CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
+    def __getattr__(self, name: str):
+        # _load_index leaves accounts out until something needs all of them.
+        if name == "accounts":
+            accounts = [self._account(account_name) for account_name in self._records]
+            self.__dict__["accounts"] = accounts
+            self._loaded = {}
+            return accounts
+        return super().__getattr__(name)
+
+    def _is_lazy(self) -> bool:
+        return "accounts" not in self.__dict__
+
+    def _account(self, name: str) -> EmailSettings:
+        """The account stored under name, decrypting its record on first use."""
+        account = self._loaded.get(name)
+        if account is None:
+            account = self._decrypt_record(self._records[name])
+        return account
 
-        # Prepare data for encryption
-        data = {"accounts": [acc.model_dump() for acc in self.accounts]}
+    @classmethod
+    def _decrypt_record(cls, record: str) -> EmailSettings:
+        account = cls._decrypted.get(record)
+        if account is None:
+            encrypted = (_records_dir() / record).read_text()
+            account = EmailSettings(**cls._secure_store.decrypt_data(encrypted))
+            cls._decrypted[record] = account
+        # Callers may modify what they get; the cached copy must stay as stored.
+        return account.model_copy(deep=True)
+
+    def record_of(self, account_name: str) -> str | None:
+        """Record file of an account; accounts with the same record are unchanged."""
+        return self._records.get(account_name)
+
+    def account_names(self) -> list[str]:
+        if self._is_lazy():
+            return list(self._records)
+        return super().account_names()
+
+    def get_account(self, account_name: str) -> EmailSettings | None:
+        if not self._is_lazy():
+            return super().get_account(account_name)
+        if account_name not in self._records:
+            return None
+        account = self._loaded.get(account_name)
+        if account is None:
+            account = self._loaded[account_name] = self._account(account_name)
+        return account
+
+    def store(self) -> None:
+        """Write the records of new and changed accounts, then the index."""
+        # Saves run in the blocking I/O threads; one at a time.
+        with _settings_lock:
+            self._store()
+
+    def _store(self) -> None:
+        records_dir = _records_dir()
+        records_dir.mkdir(parents=True, exist_ok=True)
         if self._secure_store is None:
             self._secure_store = SecureConfigStore()
-        encrypted_data = self._secure_store.encrypt_data(data)
 
-        # Store encrypted data
-        with open(CONFIG_PATH, "w") as f:
-            json.dump({"encrypted": True, "data": encrypted_data}, f)
+        records = {}
+        written = []
+        for account in self.accounts:
+            name = account.account_name
+            record = self._records.get(name)
+            if record is None or self._decrypted.get(record) != account:
+                record = f"{uuid.uuid4().hex}.enc"
+                encrypted = self._secure_store.encrypt_data(account.model_dump())
+                _write_file(records_dir / record, encrypted.encode(), sync=False)
+                SecureSettings._decrypted[record] = account.model_copy(deep=True)
+                written.append(records_dir / record)
+            records[name] = record
+
+        if records == self._records and CONFIG_PATH.exists():
+            return
 
-        # Invalidate cache
-        cache_key = str(CONFIG_PATH)
-        if cache_key in self._cache:
-            del self._cache[cache_key]
+        # The records, and their directory entries, must be on disk before
+        # the index that makes them live is written.
+        for path in written:
+            with open(path, "rb+") as f:
+                os.fsync(f.fileno())
+        _fsync_directory(records_dir)
+
+        index = {
+            "encrypted": True,
+            "version": CONFIG_INDEX_VERSION,
+            "accounts": records,
+        }
+        _write_file(CONFIG_PATH, json.dumps(index).encode())
+        _fsync_directory(CONFIG_PATH.parent)
+
+        obsolete = set(self._records.values()) - set(records.values())
+        self._records = records
+        for record in obsolete:
+            (records_dir / record).unlink(missing_ok=True)
+
+        # What was just written is already decrypted here; no need to read it back.
+        _remember(self, _config_stamp())
 
     @classmethod
     def load_secure(cls) -> SecureSettings:
-        import time
-        current_time = time.time()
-        cache_key = str(CONFIG_PATH)
-
-        # Check cache validity
-        if cache_key in cls._cache:
-            cached_data, cache_timestamp = cls._cache[cache_key]
-            if current_time - cache_timestamp < cls._cache_ttl:
-                return cached_data
+        try:
+            return cls.read()
+        except Exception:
+            # Migration or corruption - start fresh
+            return cls()
 
+    @classmethod
+    def read(cls) -> SecureSettings:
+        """Load CONFIG_PATH, raising instead of falling back to empty settings."""
         if not CONFIG_PATH.exists():
-            instance = cls()
-            # Cache the empty instance
-            cls._cache[cache_key] = (instance, current_time)
-            return instance
+            return cls()
 
-        try:
-            with open(CONFIG_PATH) as f:
-                cfg = json.load(f)
-
-            # Handle legacy unencrypted format
-            if not cfg.get("encrypted", False):
-                # Migrate legacy format to encrypted
-                instance = cls(**cfg)
-                # Store securely
-                instance.store()
-                cls._cache[cache_key] = (instance, current_time)
-                return instance
-
-            # Decrypt new format
+        with open(CONFIG_PATH) as f:
+            cfg = json.load(f)
+
+        if cfg.get("version") == CONFIG_INDEX_VERSION:
+            return cls._load_index(cfg["accounts"])
+
+        # Handle legacy unencrypted format and the legacy single encrypted
+        # blob; both are migrated to per-account records.
+        if cfg.get("encrypted", False):
             if cls._secure_store is None:
                 cls._secure_store = SecureConfigStore()
-            decrypted_data = cls._secure_store.decrypt_data(cfg["data"])
-            instance = cls(**decrypted_data)
-            cls._cache[cache_key] = (instance, current_time)
-            return instance
+            cfg = cls._secure_store.decrypt_data(cfg["data"])
+        instance = cls(**cfg)
+        instance.store()
+        return instance
 
-        except (FileNotFoundError, ValueError):
-            # Migration or corruption - start fresh
-            instance = cls()
-            cls._cache[cache_key] = (instance, current_time)
-            return instance
-        except Exception:
-            instance = cls()
-            cls._cache[cache_key] = (instance, current_time)
-            return instance
+    @classmethod
+    def _load_index(cls, records: dict[str, str]) -> SecureSettings:
+        """Build settings from an index; records are decrypted when first used."""
+        if cls._secure_store is None:
+            cls._secure_store = SecureConfigStore()
 
+        instance = cls()
+        instance._records = dict(records)
+        del instance.__dict__["accounts"]
+        return instance
 
+
+# Decrypted settings and the (mtime, inode, size) of CONFIG_PATH they were read from.
 _settings: SecureSettings | None = None
+_settings_stamp: tuple[int, int, int] | None = None
+_settings_lock = threading.RLock()
+
+
+def _config_stamp() -> tuple[int, int, int] | None:
+    try:
+        stat = CONFIG_PATH.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+
+def _remember(settings: SecureSettings, stamp: tuple[int, int, int] | None) -> None:
+    global _settings, _settings_stamp
+
+    with _settings_lock:
+        _settings, _settings_stamp = settings, stamp
+
 
+def get_settings() -> SecureSettings:
+    """Return the decrypted settings, reading CONFIG_PATH again only when it changed.
 
-def get_settings(reload: bool = False) -> SecureSettings:
-    global _settings
+    A stat() per call detects edits by other processes through the file's
+    mtime, inode and size; rewrites by this process update the cache
+    directly in store(). Once settings are loaded, a file that cannot be
+    read or validated leaves them in place.
+    """
+    global _settings, _settings_stamp
 
-    if _settings is None or reload:
+    stamp = _config_stamp()
+    settings = _settings
+    if settings is not None and stamp == _settings_stamp:
+        return settings
+
+    with _settings_lock:
+        # Another thread may have reloaded while this one waited.
+        if _settings is not None and stamp == _settings_stamp:
+            return _settings
+        if _settings is not None:
+            try:
+                return reload_settings()
+            except Exception as e:
+                logger.warning(
+                    f"Keeping the loaded settings; {CONFIG_PATH} could not be read: {e}"
+                )
+                return _settings
         try:
-            _settings = SecureSettings.load_secure()
+            settings = SecureSettings.load_secure()
         except Exception:
-            _settings = SecureSettings()
+            settings = SecureSettings()
+        # The stamp from before the read: a write racing with it triggers
+        # another reload. A migration on load has already stored its own.
+        if _settings is not settings:
+            _settings, _settings_stamp = settings, stamp
+
+    return settings
+
+
+async def load_settings() -> SecureSettings:
+    """get_settings() for coroutines: a changed file is read off the event loop."""
+    if _settings is not None and _config_stamp() == _settings_stamp:
+        return get_settings()
+    return await blocking.run(get_settings)
+
+
+def reload_settings() -> SecureSettings:
+    """Like get_settings(), but raise if CONFIG_PATH cannot be read or validated."""
+    global _settings, _settings_stamp
 
-    return _settings
+    stamp = _config_stamp()
+    with _settings_lock:
+        if _settings is not None and stamp == _settings_stamp:
+            return _settings
+        previous = _settings
+        settings = SecureSettings.read()
+        if _settings is previous:
+            _settings, _settings_stamp = settings, stamp
+        return _settings
 
 
 def reset_settings() -> None:
-    global _settings
-    _settings = None
+    global _settings, _settings_stamp
+    with _settings_lock:
+        _settings = None
+        _settings_stamp = None
@@ -0,0 +1,449 @@
+"""Helpers for building IMAP commands and parsing IMAP responses."""
+
+import re
+from array import array
+from collections.abc import Iterable
+from typing import Any, NamedTuple
+
+FETCH_START_RE = re.compile(rb"(\d+) FETCH ")
+
+_ATOM_DELIMITERS = b" ()\r\n"
+
+
+def format_message_set(ids: Iterable[int | str]) -> str:
+    """Format message numbers as a compact IMAP sequence set, e.g. '1:3,7'."""
+    numbers = sorted({int(i) for i in ids})
+    if not numbers:
+        raise ValueError("Message set must not be empty")
+
+    ranges = []
+    start = prev = numbers[0]
+    for number in numbers[1:]:
+        if number == prev + 1:
+            prev = number
+            continue
+        ranges.append(f"{start}:{prev}" if start != prev else str(start))
+        start = prev = number
+    ranges.append(f"{start}:{prev}" if start != prev else str(start))
+
+    return ",".join(ranges)
+
+
+class _Tokenizer:
+    """Reads IMAP values (atoms, strings, literals, lists) from a buffer.
+
+    The buffer is the response as handed over by aioimaplib: each literal's
+    bytes directly follow its ``{size}`` marker without the CRLF.
+    """
+
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def _skip_spaces(self) -> None:
+        while self.pos < len(self.data) and self.data[self.pos:self.pos + 1] == b" ":
+            self.pos += 1
+
+    def at_end(self) -> bool:
+        self._skip_spaces()
+        return self.pos >= len(self.data)
+
+    def read_value(self) -> Any:
+        """Read the next value: list, str, bytes (literal) or None (NIL)."""
+        self._skip_spaces()
+        if self.pos >= len(self.data):
+            raise ValueError("Unexpected end of IMAP response")
+
+        char = self.data[self.pos:self.pos + 1]
+        if char == b"(":
+            return self._read_list()
+        if char == b'"':
+            return self._read_quoted()
+        if char == b"{":
+            return self._read_literal()
+
+        atom = self._read_atom()
+        return None if atom.upper() == "NIL" else atom
+
+    def _read_list(self) -> list[Any]:
+        self.pos += 1
+        values = []
+        while True:
+            self._skip_spaces()
+            if self.pos >= len(self.data):
+                raise ValueError("Unterminated list in IMAP response")
+            if self.data[self.pos:self.pos + 1] == b")":
+                self.pos += 1
+                return values
+            values.append(self.read_value())
+
+    def _read_quoted(self) -> str:
+        self.pos += 1
+        out = bytearray()
+        while self.pos < len(self.data):
+            char = self.data[self.pos]
+            if char == 0x5C:  # backslash
+                out.append(self.data[self.pos + 1])
+                self.pos += 2
+                continue
+            self.pos += 1
+            if char == 0x22:  # closing quote
+                return out.decode("utf-8", errors="replace")
+            out.append(char)
+        raise ValueError("Unterminated quoted string in IMAP response")
+
+    def _read_literal(self) -> bytes:
+        end = self.data.index(b"}", self.pos)
+        size = int(self.data[self.pos + 1:end])
+        start = end + 1
+        self.pos = start + size
+        return bytes(self.data[start:self.pos])
+
+    def _read_atom(self) -> str:
+        start = self.pos
+        depth = 0
+        while self.pos < len(self.data):
+            char = self.data[self.pos:self.pos + 1]
+            if char == b"[":
+                depth += 1
+            elif char == b"]":
+                depth -= 1
+            elif depth == 0 and char in _ATOM_DELIMITERS:
+                break
+            self.pos += 1
+        if self.pos == start:
+            raise ValueError(f"Unexpected character in IMAP response at {start}")
+        return self.data[start:self.pos].decode("ascii", errors="replace")
+
+
+def parse_imap_value(data: bytes) -> Any:
+    """Parse a single IMAP value, e.g. a parenthesized list."""
+    return _Tokenizer(data).read_value()
+
+
+def split_fetch_response(lines: list[bytes]) -> list[bytes]:
+    """Split a multi-message FETCH response into one buffer per message."""
+    buffers: list[bytearray] = []
+    for line in lines:
+        # Literals arrive as bytearray; only plain lines can start a message.
+        if isinstance(line, bytes) and FETCH_START_RE.match(line):
+            buffers.append(bytearray(line))
+        elif buffers:
+            buffers[-1].extend(line)
+    return [bytes(buffer) for buffer in buffers]
+
+
+def parse_fetch_response(lines: list[bytes]) -> list[dict[str, Any]]:
+    """Parse FETCH response lines into one dict of data items per message.
+
+    Item names are upper-cased (``UID``, ``FLAGS``, ``BODY[TEXT]<0>``...) and
+    the message sequence number is stored under ``SEQ``.
+    """
+    messages = []
+    for buffer in split_fetch_response(lines):
+        match = FETCH_START_RE.match(buffer)
+        tokenizer = _Tokenizer(buffer, match.end())
+        items = tokenizer.read_value()
+        if not isinstance(items, list):
+            continue
+
+        message: dict[str, Any] = {"SEQ": match.group(1).decode()}
+        for name, value in zip(items[::2], items[1::2]):
+            message[str(name).upper()] = value
+        messages.append(message)
+
+    return messages
+
+
+def as_bytes(value: Any) -> bytes:
+    """Coerce a FETCH item (literal, quoted string or NIL) to bytes."""
+    if value is None:
+        return b""
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return bytes(value)
+
+
+def find_item(fetch_item: dict[str, Any], prefix: str) -> Any:
+    """Return the first FETCH item whose name starts with prefix, if any.
+
+    Servers echo section names back in their own spelling, e.g. a request
+    for ``BODY.PEEK[TEXT]<0.512>`` is answered as ``BODY[TEXT]<0>``.
+    """
+    for name, value in fetch_item.items():
+        if name.startswith(prefix):
+            return value
+    return None
+
+
+def _params(value: Any) -> dict[str, str]:
+    """Turn a BODYSTRUCTURE parameter list into a dict with upper-cased keys."""
+    if not isinstance(value, list):
+        return {}
+    return {
+        str(key).upper(): str(val)
+        for key, val in zip(value[::2], value[1::2])
+        if key is not None and val is not None
+    }
+
+
+def iter_leaf_parts(structure: Any):
+    """Yield the non-multipart parts of a BODYSTRUCTURE, depth first."""
+    if not isinstance(structure, list) or not structure:
+        return
+    if isinstance(structure[0], list):
+        for child in structure:
+            if not isinstance(child, list):
+                break
+            yield from iter_leaf_parts(child)
+    else:
+        yield structure
+
+
+def first_leaf_part(structure: Any) -> list[Any] | None:
+    """The part whose content comes first in the message's TEXT section."""
+    return next(iter_leaf_parts(structure), None)
+
+
+def iter_numbered_parts(structure: Any, section: str = ""):
+    """Yield (section number, part) for the non-multipart parts of a BODYSTRUCTURE.
+
+    Section numbers follow RFC 3501: "1" for a single-part message, "2" or
+    "1.3" for parts of a multipart one, usable as BODY[<section>].
+    """
+    if not isinstance(structure, list) or not structure:
+        return
+    if isinstance(structure[0], list):
+        for index, child in enumerate(structure, 1):
+            if not isinstance(child, list):
+                break
+            yield from iter_numbered_parts(
+                child, f"{section}.{index}" if section else str(index)
+            )
+    else:
+        yield section or "1", structure
+
+
+def _part_disposition(part: list[Any]) -> list[Any] | None:
+    """The (type params) disposition of a part, found among its extension data."""
+    for extension in part[7:]:
+        if (
+            isinstance(extension, list)
+            and extension
+            and isinstance(extension[0], str)
+            and extension[0].upper() in ("ATTACHMENT", "INLINE")
+        ):
+            return extension
+    return None
+
+
+def part_filename(part: list[Any]) -> str | None:
+    """A part's file name from its disposition, or its Content-Type name."""
+    disposition = _part_disposition(part)
+    if disposition is not None and len(disposition) > 1:
+        filename = _params(disposition[1]).get("FILENAME")
+        if filename:
+            return filename
+    return _params(part[2] if len(part) > 2 else None).get("NAME")
+
+
+def is_attachment_part(part: list[Any]) -> bool:
+    """Whether a non-multipart part is disposed or named as an attachment."""
+    if len(part) < 2:
+        return False
+    disposition = _part_disposition(part)
+    if disposition is not None and disposition[0].upper() == "ATTACHMENT":
+        return True
+    maintype = str(part[0]).upper()
+    params = _params(part[2] if len(part) > 2 else None)
+    return maintype not in ("TEXT", "MESSAGE") and "NAME" in params
+
+
+class BodyPart(NamedTuple):
+    """A non-multipart part described by BODYSTRUCTURE."""
+
+    section: str
+    content_type: str
+    encoding: str
+    size: int
+    charset: str | None
+    filename: str | None
+    disposition: str | None
+    is_attachment: bool
+
+    @property
+    def decoded_size(self) -> int:
+        """Approximate decoded size; base64 lines are 76 chars plus CRLF."""
+        if self.encoding == "base64":
+            return self.size * 57 // 78
+        return self.size
+
+
+def parse_bodystructure(structure: Any) -> list[BodyPart]:
+    """Describe every non-multipart part of a BODYSTRUCTURE, in section order.
+
+    Accepts the raw ``(...)`` bytes or the value parsed from a FETCH item.
+    An attached message/rfc822 is reported as one part, not descended into.
+    """
+    if isinstance(structure, (bytes, bytearray)):
+        structure = parse_imap_value(bytes(structure))
+
+    parts = []
+    for section, part in iter_numbered_parts(structure):
+        params = _params(part[2] if len(part) > 2 else None)
+        disposition = _part_disposition(part)
+        size = part[6] if len(part) > 6 else None
+        parts.append(
+            BodyPart(
+                section=section,
+                content_type=f"{part[0]}/{part[1] if len(part) > 1 else ''}".lower(),
+                encoding=part_encoding(part)[0],
+                size=int(size) if isinstance(size, str) and size.isdigit() else 0,
+                charset=params.get("CHARSET"),
+                filename=part_filename(part),
+                disposition=disposition[0].lower() if disposition else None,
+                is_attachment=is_attachment_part(part),
+            )
+        )
+    return parts
+
+
+def part_encoding(part: list[Any]) -> tuple[str, str]:
+    """The (content-transfer-encoding, charset) of a non-multipart part."""
+    encoding = str(part[5]).lower() if len(part) > 5 and part[5] else "7bit"
+    charset = _params(part[2] if len(part) > 2 else None).get("CHARSET", "utf-8")
+    return encoding, charset
+
+
+_RESPONSE_CODE_RE = re.compile(
+    rb"\[(UIDVALIDITY|UIDNEXT|HIGHESTMODSEQ) (\d+)\]", re.IGNORECASE
+)
+_EXISTS_RE = re.compile(rb"^(\d+) EXISTS", re.IGNORECASE)
+_VANISHED_RE = re.compile(rb"^VANISHED (?:\(EARLIER\) )?([\d:,]+)", re.IGNORECASE)
+_ESEARCH_RE = re.compile(rb"^ESEARCH\b", re.IGNORECASE)
+_NUMBER_RE = re.compile(rb"\d+")
+_MODIFIED_RE = re.compile(rb"\[MODIFIED ([\d:,]+)\]", re.IGNORECASE)
+_UID_SET_ITEM_RE = re.compile(r"^\d+(:\d+)?$")
+
+
+def parse_message_set(message_set: str) -> list[tuple[int, int]]:
+    """Parse a sequence set such as '1:3,7' into inclusive (low, high) ranges."""
+    ranges = []
+    for item in message_set.split(","):
+        low, _, high = item.partition(":")
+        low_number = int(low)
+        high_number = int(high) if high else low_number
+        ranges.append((min(low_number, high_number), max(low_number, high_number)))
+    return ranges
+
+
+def expand_message_set(message_set: str | None) -> array:
+    """Expand a UID set such as '1:3,7' into an ascending array of UIDs."""
+    uids = array("I")
+    if message_set:
+        for low, high in sorted(parse_message_set(message_set)):
+            uids.extend(range(low, high + 1))
+    return uids
+
+
+def subtract_uids(
+    ranges: Iterable[tuple[int, int]], uids: Iterable[int]
+) -> list[tuple[int, int]]:
+    """Remove single UIDs from inclusive (low, high) ranges without expanding them."""
+    result = []
+    excluded = sorted(set(uids))
+    for low, high in ranges:
+        for uid in excluded:
+            if uid > high:
+                break
+            if uid < low:
+                continue
+            if uid > low:
+                result.append((low, uid - 1))
+            low = uid + 1
+        if low <= high:
+            result.append((low, high))
+    return result
+
+
+def normalize_uid_set(items: Iterable[str]) -> str:
+    """Join UIDs and 'low:high' ranges into one compact UID set.
+
+    Raises ValueError for anything else, so user input never reaches the
+    command line unchecked.
+    """
+    singles, ranges = [], []
+    for item in items:
+        item = str(item).strip()
+        if not _UID_SET_ITEM_RE.match(item):
+            raise ValueError(f"Invalid UID or UID range: '{item}'")
+        (ranges if ":" in item else singles).append(item)
+    if not singles and not ranges:
+        raise ValueError("No UIDs given")
+    return ",".join(([format_message_set(singles)] if singles else []) + ranges)
+
+
+def parse_modified(lines: list[bytes]) -> array:
+    """UIDs a conditional STORE left alone, from its [MODIFIED set] response code."""
+    for line in lines:
+        if isinstance(line, bytes):
+            match = _MODIFIED_RE.search(line)
+            if match:
+                return expand_message_set(match.group(1).decode())
+    return array("I")
+
+
+def parse_uid_list(data: bytes) -> array:
+    """Parse the space-separated numbers of a SEARCH response into an array."""
+    return array("I", (int(match.group()) for match in _NUMBER_RE.finditer(data)))
+
+
+def parse_esearch_response(lines: list[bytes]) -> dict[str, Any]:
+    """Extract the return data of an ESEARCH response (RFC 4731/9394).
+
+    COUNT, MIN and MAX are ints; ALL and PARTIAL are UID sets, or None when
+    nothing matched. Returns {} if the server sent no ESEARCH response.
+    """
+    for line in lines:
+        if isinstance(line, bytes) and _ESEARCH_RE.match(line):
+            tokenizer = _Tokenizer(line, len(b"ESEARCH"))
+            break
+    else:
+        return {}
+
+    result: dict[str, Any] = {}
+    while not tokenizer.at_end():
+        name = tokenizer.read_value()
+        if isinstance(name, list) or str(name).upper() == "UID":
+            continue  # search correlator (TAG "A1") or the UID marker
+        name = str(name).upper()
+        value = tokenizer.read_value()
+        if name in ("COUNT", "MIN", "MAX"):
+            result[name] = int(value)
+        elif name == "PARTIAL" and isinstance(value, list):
+            result[name] = value[1] if len(value) > 1 else None
+        else:
+            result[name] = value
+    return result
+
+
+def parse_select_response(lines: list[bytes]) -> dict[str, Any]:
+    """Extract mailbox state from SELECT/EXAMINE response lines.
+
+    Returns UIDVALIDITY, UIDNEXT, HIGHESTMODSEQ and EXISTS when present,
+    VANISHED as a list of UID ranges (QRESYNC) and FETCH as the parsed
+    flag updates reported by a QRESYNC SELECT.
+    """
+    info: dict[str, Any] = {"VANISHED": [], "FETCH": parse_fetch_response(lines)}
+    for line in lines:
+        if not isinstance(line, bytes):
+            continue
+        for match in _RESPONSE_CODE_RE.finditer(line):
+            info[match.group(1).decode().upper()] = int(match.group(2))
+        exists = _EXISTS_RE.match(line)
+        if exists:
+            info["EXISTS"] = int(exists.group(1))
+        vanished = _VANISHED_RE.match(line)
+        if vanished:
+            info["VANISHED"].extend(parse_message_set(vanished.group(1).decode()))
+    return info
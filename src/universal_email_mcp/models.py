@@ -1,8 +1,10 @@
 """Pydantic models for Universal Email MCP Server tool inputs and outputs."""
 
+from collections.abc import Awaitable, Callable
 from datetime import datetime
+from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 # --- Account Management Models ---
 
@@ -22,6 +24,10 @@ class AddAccountInput(BaseModel):
     imap_port: int = Field(default=993, description="IMAP server port (default: 993)")
     imap_use_ssl: bool = Field(default=True, description="Use SSL for IMAP connection")
     imap_verify_ssl: bool = Field(default=True, description="Verify SSL certificates for IMAP")
+    imap_use_compression: bool = Field(
+        default=True,
+        description="Use COMPRESS=DEFLATE on IMAP when the server supports it",
+    )
     smtp_host: str = Field(description="SMTP server hostname")
     smtp_port: int = Field(default=465, description="SMTP server port (default: 465)")
     smtp_use_ssl: bool = Field(default=True, description="Use SSL for SMTP connection")
@@ -32,6 +38,22 @@ class ListAccountsOutput(BaseModel):
     """Output model for listing configured accounts."""
 
     accounts: list[str] = Field(description="List of configured account names")
+    compression: dict[str, dict[str, int]] = Field(
+        default_factory=dict,
+        description="IMAP COMPRESS=DEFLATE byte counters (raw_in, wire_in, raw_out, "
+        "wire_out, saved) by account, for accounts that have compressed",
+    )
+
+
+class ImportAccountsInput(BaseModel):
+    """Input model for adding or replacing many accounts at once."""
+
+    accounts: list[AddAccountInput] = Field(
+        min_length=1,
+        description=(
+            "Accounts to add; existing accounts with the same name are replaced"
+        ),
+    )
 
 
 class RemoveAccountInput(BaseModel):
@@ -42,22 +64,75 @@ class RemoveAccountInput(BaseModel):
 
 # --- Mail Operation Models ---
 
-class EmailMessage(BaseModel):
-    """Represents an email message."""
+class AttachmentInfo(BaseModel):
+    """Describes one attachment of a message, as found in its MIME structure."""
+
+    section: str = Field(description="MIME section number, e.g. '2' or '1.3'")
+    filename: str | None = Field(
+        default=None, description="File name of the attachment"
+    )
+    content_type: str = Field(description="MIME type of the attachment")
+    size: int = Field(description="Approximate decoded size in bytes")
+
+
+class MessageSummary(BaseModel):
+    """Represents an email message in a listing, without its body.
+
+    The body is not transferred with listings; load_body() resolves it on
+    first use through the loader attached by the client that listed it.
+    """
 
     uid: str = Field(description="Unique identifier for the email")
     subject: str = Field(description="Email subject")
     sender: str = Field(description="Sender email address")
-    body: str = Field(description="Email body content")
     date: datetime = Field(description="Date the email was sent")
     is_read: bool = Field(default=False, description="Whether the email has been read")
     has_attachments: bool = Field(default=False, description="Whether the email has attachments")
+    attachments: list[AttachmentInfo] = Field(
+        default_factory=list,
+        description="Attachments with their names, types and sizes",
+    )
+    size: int | None = Field(
+        default=None, description="Message size in bytes (RFC822.SIZE)"
+    )
+    preview: str | None = Field(
+        default=None, description="Short plain-text preview of the body, if requested"
+    )
+
+    _body_loader: Callable[[], Awaitable[str]] | None = PrivateAttr(default=None)
+    _body: str | None = PrivateAttr(default=None)
+
+    def set_body_loader(self, loader: Callable[[], Awaitable[str]]) -> None:
+        """Attach the coroutine function that fetches this message's body."""
+        self._body_loader = loader
+
+    async def load_body(self) -> str:
+        """Return the message body, fetching it on first access."""
+        if self._body is None:
+            if self._body_loader is None:
+                raise ValueError(f"No way to load the body of message {self.uid}")
+            self._body = await self._body_loader()
+        return self._body
+
+
+class EmailMessage(MessageSummary):
+    """Represents an email message."""
+
+    body: str = Field(description="Email body content")
+
+    async def load_body(self) -> str:
+        return self.body
 
 
 class ListMessagesInput(BaseModel):
     """Input model for listing email messages."""
 
-    account_name: str = Field(description="Name of the account to list messages from")
+    account_name: str | list[str] = Field(
+        description=(
+            "Name of the account to list messages from, a list of names, "
+            "or '*' for all accounts"
+        )
+    )
     mailbox: str = Field(default="INBOX", description="Mailbox to list messages from")
     page: int = Field(default=1, ge=1, description="Page number for pagination")
     page_size: int = Field(
@@ -78,6 +153,12 @@ class ListMessagesInput(BaseModel):
     unread_only: bool = Field(
         default=False, description="Only show unread messages"
     )
+    preview_chars: int = Field(
+        default=0,
+        ge=0,
+        le=1024,
+        description="Include a body preview of up to this many characters (0 disables)",
+    )
 
 
 class ListMessagesOutput(BaseModel):
@@ -88,7 +169,83 @@ class ListMessagesOutput(BaseModel):
     page: int = Field(description="Current page number")
     page_size: int = Field(description="Number of messages per page")
     total_messages: int = Field(description="Total number of messages matching filters")
-    messages: list[EmailMessage] = Field(description="List of email messages")
+    messages: list[MessageSummary] = Field(description="List of email messages")
+    highestmodseq: int | None = Field(
+        default=None,
+        description=(
+            "Mailbox HIGHESTMODSEQ when listed (CONDSTORE); pass it to mark_messages "
+            "as unchanged_since"
+        ),
+    )
+    error: str | None = Field(
+        default=None, description="Why the account could not be listed, if it failed"
+    )
+
+
+class MultiAccountListMessagesOutput(BaseModel):
+    """Output model for listing email messages of several accounts."""
+
+    results: list[ListMessagesOutput] = Field(
+        description="One listing per account, in the requested order"
+    )
+
+
+class CountMessagesInput(BaseModel):
+    """Input model for counting email messages."""
+
+    account_name: str | list[str] = Field(
+        description="Name of the account, a list of names, or '*' for all accounts"
+    )
+    mailbox: str = Field(default="INBOX", description="Mailbox to count messages in")
+    unread_only: bool = Field(default=False, description="Only count unread messages")
+
+
+class CountMessagesOutput(BaseModel):
+    """Output model for counting email messages of one account."""
+
+    account_name: str = Field(description="Account name used for the query")
+    mailbox: str = Field(description="Mailbox that was counted")
+    total_messages: int | None = Field(
+        default=None, description="Number of matching messages, None if counting failed"
+    )
+    error: str | None = Field(
+        default=None, description="Why the account could not be counted, if it failed"
+    )
+
+
+class MultiAccountCountMessagesOutput(BaseModel):
+    """Output model for counting email messages of several accounts."""
+
+    results: list[CountMessagesOutput] = Field(
+        description="One count per account, in the requested order"
+    )
+
+
+class SearchMessagesInput(BaseModel):
+    """Input model for full-text searching email messages."""
+
+    account_name: str = Field(description="Name of the account to search")
+    query: str = Field(
+        min_length=1,
+        description=(
+            'Words to search for; supports "exact phrases", OR, NOT and prefix*'
+        ),
+    )
+    mailbox: str = Field(default="INBOX", description="Mailbox to search")
+    limit: int = Field(
+        default=20, ge=1, le=100, description="Maximum number of results"
+    )
+
+
+class SearchMessagesOutput(BaseModel):
+    """Output model for full-text searching email messages."""
+
+    account_name: str = Field(description="Account name used for the query")
+    mailbox: str = Field(description="Mailbox that was searched")
+    query: str = Field(description="The search query")
+    messages: list[MessageSummary] = Field(
+        description="Matching messages, best match first, with a snippet as preview"
+    )
 
 
 class SendMessageInput(BaseModel):
@@ -107,6 +264,68 @@ class SendMessageInput(BaseModel):
     is_html: bool = Field(
         default=False, description="Whether the body content is HTML"
     )
+    queue: bool | None = Field(
+        default=None,
+        description=(
+            "Queue the message in the outbound spool and return at once; "
+            "defaults to whether the spool is configured"
+        ),
+    )
+
+
+class GetSendStatusInput(BaseModel):
+    """Input model for checking a message queued in the outbound spool."""
+
+    queue_id: str = Field(description="Queue ID returned by send_message")
+
+
+class OutgoingMessage(BaseModel):
+    """One message of a bulk send."""
+
+    recipients: list[str] = Field(description="List of recipient email addresses")
+    subject: str = Field(description="Email subject")
+    body: str = Field(description="Email body content")
+    cc: list[str] | None = Field(
+        default=None, description="List of CC recipient email addresses"
+    )
+    bcc: list[str] | None = Field(
+        default=None, description="List of BCC recipient email addresses"
+    )
+    is_html: bool = Field(default=False, description="Whether the body content is HTML")
+
+
+class MessageTemplate(BaseModel):
+    """Subject and body with $name or ${name} placeholders for a mail merge."""
+
+    subject: str = Field(description="Email subject template")
+    body: str = Field(description="Email body template")
+    is_html: bool = Field(default=False, description="Whether the body content is HTML")
+
+
+class MergeRecipient(BaseModel):
+    """A mail-merge recipient and the values for the template placeholders."""
+
+    email: str = Field(description="Recipient email address, also available as $email")
+    variables: dict[str, str] = Field(
+        default_factory=dict, description="Values for the template placeholders"
+    )
+
+
+class SendMessagesInput(BaseModel):
+    """Input model for sending many messages, or a template to many recipients."""
+
+    account_name: str = Field(description="Name of the account to send from")
+    messages: list[OutgoingMessage] = Field(
+        default_factory=list, max_length=1000, description="Complete messages to send"
+    )
+    template: MessageTemplate | None = Field(
+        default=None, description="Template to personalise for each entry of merge"
+    )
+    merge: list[MergeRecipient] = Field(
+        default_factory=list,
+        max_length=1000,
+        description="Recipients of the template, one message each",
+    )
 
 
 class GetMessageInput(BaseModel):
@@ -126,6 +345,75 @@ class GetMessageOutput(BaseModel):
     message: EmailMessage = Field(description="The requested email message")
 
 
+class GetMessagesInput(BaseModel):
+    """Input model for getting several email messages at once."""
+
+    account_name: str = Field(description="Name of the account")
+    message_uids: list[str] = Field(
+        min_length=1, max_length=500, description="Unique identifiers of the messages"
+    )
+    mailbox: str = Field(default="INBOX", description="Mailbox containing the messages")
+    max_total_kb: int = Field(
+        default=4096,
+        ge=0,
+        description=(
+            "Total size budget in KB; messages that do not fit are skipped "
+            "(0 disables)"
+        ),
+    )
+
+
+class GetMessagesOutput(BaseModel):
+    """Output model for getting several email messages at once."""
+
+    account_name: str = Field(description="Account name used for the query")
+    mailbox: str = Field(description="Mailbox containing the messages")
+    messages: list[EmailMessage] = Field(
+        description="The messages found, in request order"
+    )
+    skipped_uids: list[str] = Field(
+        default_factory=list,
+        description="UIDs not returned because they exceed the size budget",
+    )
+    missing_uids: list[str] = Field(
+        default_factory=list, description="UIDs that do not exist in the mailbox"
+    )
+
+
+class DownloadAttachmentInput(BaseModel):
+    """Input model for downloading an attachment of a message."""
+
+    account_name: str = Field(description="Name of the account")
+    message_uid: str = Field(description="Unique identifier of the message")
+    mailbox: str = Field(default="INBOX", description="Mailbox containing the message")
+    attachment: str | None = Field(
+        default=None,
+        description=(
+            "MIME section number (e.g. '2' or '1.3') or file name; "
+            "defaults to the first attachment"
+        ),
+    )
+    directory: str | None = Field(
+        default=None, description="Directory to save the attachment in"
+    )
+
+
+class DownloadAttachmentOutput(BaseModel):
+    """Output model for downloading an attachment of a message."""
+
+    account_name: str = Field(description="Account name used for the download")
+    message_uid: str = Field(description="Unique identifier of the message")
+    section: str = Field(description="MIME section number of the attachment")
+    filename: str = Field(description="File name the attachment was saved under")
+    content_type: str = Field(description="MIME type of the attachment")
+    path: str = Field(description="Full path of the saved file")
+    size: int = Field(description="Decoded size of the saved file in bytes")
+    resumed: bool = Field(
+        default=False,
+        description="Whether an interrupted earlier download was continued",
+    )
+
+
 class MarkMessageInput(BaseModel):
     """Input model for marking a message as read/unread."""
 
@@ -135,6 +423,33 @@ class MarkMessageInput(BaseModel):
     mark_as_read: bool = Field(description="True to mark as read, False to mark as unread")
 
 
+class MarkMessagesInput(BaseModel):
+    """Input model for changing flags on several messages at once."""
+
+    account_name: str = Field(description="Name of the account")
+    message_uids: list[str] = Field(
+        min_length=1, description="UIDs and UID ranges such as '120:180'"
+    )
+    mailbox: str = Field(default="INBOX", description="Mailbox containing the messages")
+    flags: list[str] = Field(
+        default=["\\Seen"],
+        min_length=1,
+        description="Flags to change, e.g. '\\Seen', '\\Flagged' or a keyword",
+    )
+    action: Literal["add", "remove", "replace"] = Field(
+        default="add",
+        description="Add the flags, remove them, or replace all flags with them",
+    )
+    unchanged_since: int | None = Field(
+        default=None,
+        description=(
+            "Only change messages whose MODSEQ is not above this (CONDSTORE), "
+            "e.g. the highestmodseq returned by list_messages; without it "
+            "flags are changed unconditionally"
+        ),
+    )
+
+
 class ListMailboxesInput(BaseModel):
     """Input model for listing mailboxes/folders."""
 
@@ -159,6 +474,73 @@ class StatusOutput(BaseModel):
     )
 
 
+class SendMessageOutput(StatusOutput):
+    """Output model for sending, or queueing, one message."""
+
+    queue_id: str | None = Field(
+        default=None, description="Spool queue ID when the message was queued"
+    )
+
+
+class SendStatusOutput(BaseModel):
+    """Delivery state of a message in the outbound spool."""
+
+    queue_id: str = Field(description="Queue ID of the message")
+    account_name: str = Field(description="Name of the account sending the message")
+    status: Literal["queued", "sending", "sent", "failed"] = Field(
+        description="Delivery state"
+    )
+    recipients: list[str] = Field(description="Envelope recipients")
+    attempts: int = Field(description="Delivery attempts made so far")
+    last_error: str | None = Field(
+        default=None, description="Error of the last failed attempt"
+    )
+    refused: dict[str, str] = Field(
+        default_factory=dict,
+        description="Recipients the server refused, with its replies",
+    )
+    created_at: datetime = Field(description="When the message was queued")
+    updated_at: datetime = Field(description="When the state last changed")
+    next_attempt: datetime | None = Field(
+        default=None, description="When the next attempt is due, while queued"
+    )
+
+
+class SendResult(BaseModel):
+    """Outcome of one message of a bulk send."""
+
+    index: int = Field(description="Position of the message in the request")
+    recipients: list[str] = Field(description="Envelope recipients of the message")
+    status: Literal["success", "error"] = Field(
+        description="Whether the message was accepted"
+    )
+    details: str | None = Field(
+        default=None, description="Error, or recipients the server refused"
+    )
+
+
+class SendMessagesOutput(BaseModel):
+    """Output model for a bulk send."""
+
+    account_name: str = Field(
+        description="Name of the account the messages were sent from"
+    )
+    sent: int = Field(description="Number of messages accepted by the server")
+    failed: int = Field(description="Number of messages that could not be sent")
+    results: list[SendResult] = Field(
+        description="Per-message outcome, in request order"
+    )
+
+
+class MarkMessagesOutput(StatusOutput):
+    """Output model for changing flags on several messages at once."""
+
+    skipped_uids: list[str] = Field(
+        default_factory=list,
+        description="UIDs left alone because they were changed concurrently",
+    )
+
+
 class ErrorOutput(BaseModel):
     """Error output model."""
 
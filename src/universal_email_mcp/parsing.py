@@ -0,0 +1,182 @@
+"""MIME parsing of full messages, off the event loop for large ones.
+
+Messages up to PARSE_INLINE_MAX_BYTES are parsed inline, where a process
+hop would cost more than the parse. Larger ones go to a fixed-size
+ProcessPoolExecutor whose workers run under address-space and CPU-time
+limits, so a hostile MIME structure can only take down its worker, never
+the server. A broken pool is replaced on the next large message.
+"""
+
+import asyncio
+import email
+import email.utils
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+PARSE_INLINE_MAX_BYTES = int(
+    float(os.getenv("UNIVERSAL_EMAIL_MCP_PARSE_INLINE_MAX_KB", "1024")) * 1024
+)
+PARSE_WORKERS = int(os.getenv("UNIVERSAL_EMAIL_MCP_PARSE_WORKERS", "2"))
+PARSE_WORKER_MEMORY_BYTES = int(
+    float(os.getenv("UNIVERSAL_EMAIL_MCP_PARSE_WORKER_MEMORY_MB", "512")) * 1024 * 1024
+)
+PARSE_WORKER_CPU_SECONDS = int(
+    os.getenv("UNIVERSAL_EMAIL_MCP_PARSE_WORKER_CPU_SECONDS", "10")
+)
+
+
+def parse_raw_message(raw_message: bytes) -> dict[str, Any]:
+    """Parse an RFC 822 message into the fields of an EmailMessage."""
+    msg = email.message_from_bytes(raw_message)
+
+    subject = msg.get("Subject", "")
+    sender = msg.get("From", "")
+    date_str = msg.get("Date", "")
+
+    try:
+        date = email.utils.parsedate_to_datetime(date_str)
+    except (ValueError, TypeError):
+        date = datetime.now()
+
+    attachments = [
+        {
+            "section": section,
+            "filename": part.get_filename(),
+            "content_type": part.get_content_type(),
+            "size": _decoded_size(part),
+        }
+        for section, part in _numbered_parts(msg)
+        if _is_attachment(part)
+    ]
+
+    body = ""
+    if msg.is_multipart():
+        for part in msg.walk():
+            if part.get_content_type() == "text/plain":
+                payload = part.get_payload(decode=True)
+                if payload:
+                    body = payload.decode("utf-8", errors="ignore")
+                    break
+    else:
+        payload = msg.get_payload(decode=True)
+        if payload:
+            body = payload.decode("utf-8", errors="ignore")
+
+    return {
+        "subject": str(subject),
+        "sender": str(sender),
+        "date": date,
+        "body": body,
+        "has_attachments": bool(attachments),
+        "attachments": attachments,
+    }
+
+
+def _numbered_parts(msg, section: str = ""):
+    """Yield (IMAP section number, part) for the leaf parts, like BODYSTRUCTURE."""
+    if msg.get_content_maintype() == "multipart":
+        for index, child in enumerate(msg.get_payload(), 1):
+            yield from _numbered_parts(
+                child, f"{section}.{index}" if section else str(index)
+            )
+    else:
+        yield section or "1", msg
+
+
+def _decoded_size(part) -> int:
+    if part.get_content_type() == "message/rfc822":
+        return sum(len(inner.as_bytes()) for inner in part.get_payload())
+    return len(part.get_payload(decode=True) or b"")
+
+
+def _is_attachment(part) -> bool:
+    """Same rule as imap_utils.is_attachment_part, applied to a parsed part."""
+    if part.get_content_maintype() == "multipart":
+        return False
+    if part.get_content_disposition() == "attachment":
+        return True
+    maintype = part.get_content_maintype()
+    return maintype not in ("text", "message") and bool(part.get_filename())
+
+
+def _limit_worker(memory_bytes: int) -> None:
+    """Worker initializer: cap the address space of the process."""
+    if resource is not None and memory_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+
+
+def _parse_in_worker(raw_message: bytes, cpu_seconds: int) -> dict[str, Any]:
+    """Parse with a CPU budget for this task on top of what the worker already used."""
+    if resource is not None and cpu_seconds > 0:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        limit = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        # Exceeding the soft limit delivers SIGXCPU, which kills the worker.
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    return parse_raw_message(raw_message)
+
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=PARSE_WORKERS,
+            # Forking a process that runs an event loop and threads is unsafe.
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_limit_worker,
+            initargs=(PARSE_WORKER_MEMORY_BYTES,),
+        )
+    return _executor
+
+
+async def parse_message(raw_message: bytes) -> dict[str, Any]:
+    """Parse a message inline when small, in the worker pool otherwise."""
+    if len(raw_message) <= PARSE_INLINE_MAX_BYTES or PARSE_WORKERS <= 0:
+        return parse_raw_message(raw_message)
+
+    global _executor
+
+    executor = _get_executor()
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(
+            executor, _parse_in_worker, raw_message, PARSE_WORKER_CPU_SECONDS
+        )
+    except BrokenProcessPool:
+        logger.warning(
+            f"MIME worker died parsing a {len(raw_message)} byte message; "
+            "restarting the pool"
+        )
+        if _executor is executor:
+            _executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise ValueError(
+            "Message could not be parsed within the worker's resource limits"
+        )
+
+
+def shutdown() -> None:
+    """Stop the worker pool; used on server shutdown."""
+    global _executor
+
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,183 @@
+"""RFC 2920 PIPELINING for aiosmtplib connections.
+
+aiosmtplib waits for the reply to every command, so a message to N
+recipients costs N + 3 round trips. When the server advertises PIPELINING,
+MAIL FROM, every RCPT TO and DATA are written at once and their replies
+read back in order, leaving two round trips per message: the envelope and
+the content.
+
+While a pipelined transaction runs, the protocol's data_received hook is
+replaced by one that queues every complete reply, because aiosmtplib
+itself keeps only one reply at a time and drops data arriving after it.
+"""
+
+import asyncio
+import logging
+import re
+from email.message import Message
+
+import aiosmtplib
+from aiosmtplib.email import flatten_message
+from aiosmtplib.protocol import SMTPProtocol
+
+logger = logging.getLogger(__name__)
+
+_LINE_END_RE = re.compile(rb"\r\n|\r|\n")
+_PERIOD_RE = re.compile(rb"(?m)^\.")
+_UNSAFE_ADDRESS_RE = re.compile(r"[\x00-\x1f\x7f<>]")
+
+
+def supports_pipelining(client: aiosmtplib.SMTP) -> bool:
+    return client.supports_extension("pipelining")
+
+
+async def send_message(
+    client: aiosmtplib.SMTP,
+    message: Message | bytes,
+    sender: str,
+    recipients: list[str],
+) -> dict[str, aiosmtplib.SMTPResponse]:
+    """Send a message or its rendered bytes, pipelining the envelope where allowed.
+
+    Returns the refused recipients with the server's replies, like
+    aiosmtplib's send_message. Raises SMTPRecipientsRefused when every
+    recipient was refused.
+    """
+    if client.is_ehlo_or_helo_needed:
+        await client.ehlo()
+
+    if not supports_pipelining(client) or not _plain_addresses(sender, *recipients):
+        # Internationalised addresses need SMTPUTF8 negotiation, and odd ones
+        # aiosmtplib's own validation; leave both to aiosmtplib.
+        if isinstance(message, bytes):
+            errors, _ = await client.sendmail(sender, recipients, message)
+        else:
+            errors, _ = await client.send_message(
+                message, sender=sender, recipients=recipients
+            )
+        return errors
+
+    if isinstance(message, bytes):
+        content = message
+    else:
+        content = flatten_message(message, utf8=False, cte_type="8bit")
+    async with _PipelinedReplies(client.protocol, client.timeout) as replies:
+        body_option = " BODY=8BITMIME" if client.supports_extension("8bitmime") else ""
+        commands = [f"MAIL FROM:<{sender}>{body_option}\r\n".encode()]
+        commands.extend(
+            f"RCPT TO:<{recipient}>\r\n".encode() for recipient in recipients
+        )
+        commands.append(b"DATA\r\n")
+        client.protocol.write(b"".join(commands))
+
+        mail_reply = await replies.next()
+        refused: dict[str, aiosmtplib.SMTPResponse] = {}
+        for recipient in recipients:
+            reply = await replies.next()
+            if reply.code not in (250, 251):
+                refused[recipient] = reply
+        data_reply = await replies.next()
+
+        if data_reply.code == 354:
+            # DATA was accepted, so it must be completed even when the
+            # envelope failed; an empty message is sent in that case.
+            if mail_reply.code != 250 or len(refused) == len(recipients):
+                client.protocol.write(b".\r\n")
+                await replies.next()
+            else:
+                client.protocol.write(_dot_stuff(content))
+                final = await replies.next()
+                if final.code != 250:
+                    raise aiosmtplib.SMTPDataError(final.code, final.message)
+                return refused
+
+    if mail_reply.code != 250:
+        raise aiosmtplib.SMTPSenderRefused(mail_reply.code, mail_reply.message, sender)
+    if len(refused) == len(recipients):
+        raise aiosmtplib.SMTPRecipientsRefused(
+            [
+                aiosmtplib.SMTPRecipientRefused(reply.code, reply.message, recipient)
+                for recipient, reply in refused.items()
+            ]
+        )
+    raise aiosmtplib.SMTPDataError(data_reply.code, data_reply.message)
+
+
+class _PipelinedReplies:
+    """Collects server replies while several commands are in flight."""
+
+    def __init__(self, protocol: SMTPProtocol | None, timeout: float | None):
+        if protocol is None or protocol._command_lock is None:
+            raise aiosmtplib.SMTPServerDisconnected("Server not connected")
+        self._protocol = protocol
+        self._lock = protocol._command_lock
+        self._timeout = timeout
+        self._replies: asyncio.Queue = asyncio.Queue()
+        self._original = None
+
+    async def __aenter__(self) -> "_PipelinedReplies":
+        await self._lock.acquire()
+        self._original = self._protocol.data_received
+        self._protocol.data_received = self._data_received
+        self._protocol.connection_lost = self._connection_lost_hook(
+            self._protocol.connection_lost
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        protocol = self._protocol
+        protocol.data_received = self._original
+        del protocol.connection_lost
+        self._lock.release()
+        if (
+            exc_type is not None
+            and not issubclass(exc_type, aiosmtplib.SMTPResponseException)
+            and protocol.transport is not None
+        ):
+            # Replies may still be outstanding; the session cannot be reused.
+            protocol.transport.close()
+
+    async def next(self) -> aiosmtplib.SMTPResponse:
+        try:
+            reply = await asyncio.wait_for(self._replies.get(), self._timeout)
+        except TimeoutError as e:
+            raise aiosmtplib.SMTPReadTimeoutError(
+                "Timed out waiting for server response"
+            ) from e
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def _data_received(self, data: bytes) -> None:
+        buffer = self._protocol._buffer
+        buffer.extend(data)
+        try:
+            while (reply := self._protocol._read_response_from_buffer()) is not None:
+                self._replies.put_nowait(reply)
+        except Exception as e:
+            del buffer[:]
+            self._replies.put_nowait(e)
+
+    def _connection_lost_hook(self, connection_lost):
+        def hook(exc: Exception | None) -> None:
+            self._replies.put_nowait(
+                aiosmtplib.SMTPServerDisconnected("Connection lost")
+            )
+            connection_lost(exc)
+
+        return hook
+
+
+def _plain_addresses(*addresses: str) -> bool:
+    return all(
+        address.isascii() and not _UNSAFE_ADDRESS_RE.search(address)
+        for address in addresses
+    )
+
+
+def _dot_stuff(content: bytes) -> bytes:
+    """CRLF line endings, leading dots doubled and the terminating line added."""
+    content = _LINE_END_RE.sub(b"\r\n", content)
+    if not content.endswith(b"\r\n"):
+        content += b"\r\n"
+    return _PERIOD_RE.sub(b"..", content) + b".\r\n"
@@ -0,0 +1,475 @@
+"""Process-wide IMAP and SMTP connection pooling for Universal Email MCP Server."""
+
+import asyncio
+import logging
+import os
+import ssl
+import time
+import warnings
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import aioimaplib
+import aiosmtplib
+
+from . import compress, config, store
+
+logger = logging.getLogger(__name__)
+
+IMAP_POOL_SIZE = int(os.getenv("UNIVERSAL_EMAIL_MCP_IMAP_POOL_SIZE", "4"))
+IMAP_POOL_IDLE_TIMEOUT = float(
+    os.getenv("UNIVERSAL_EMAIL_MCP_IMAP_POOL_IDLE_TIMEOUT", "300")
+)
+IMAP_POOL_HEALTH_CHECK_INTERVAL = float(
+    os.getenv("UNIVERSAL_EMAIL_MCP_IMAP_POOL_HEALTH_CHECK_INTERVAL", "30")
+)
+SMTP_POOL_SIZE = int(os.getenv("UNIVERSAL_EMAIL_MCP_SMTP_POOL_SIZE", "2"))
+# Servers commonly drop idle SMTP sessions after a few minutes (RFC 5321 allows 5).
+SMTP_POOL_IDLE_TIMEOUT = float(
+    os.getenv("UNIVERSAL_EMAIL_MCP_SMTP_POOL_IDLE_TIMEOUT", "120")
+)
+SMTP_POOL_HEALTH_CHECK_INTERVAL = float(
+    os.getenv("UNIVERSAL_EMAIL_MCP_SMTP_POOL_HEALTH_CHECK_INTERVAL", "10")
+)
+SMTP_RATE_LIMIT_PER_MINUTE = float(
+    os.getenv("UNIVERSAL_EMAIL_MCP_SMTP_RATE_LIMIT_PER_MINUTE", "120")
+)
+
+
+def create_ssl_context(server: config.EmailServer) -> ssl.SSLContext:
+    """Build the SSL context for a server, honouring its verify_ssl setting."""
+    ssl_context = ssl.create_default_context()
+    if not server.verify_ssl:
+        warnings.warn(
+            f"SSL verification disabled for {server.host}. "
+            "This is insecure and should only be used for testing.",
+            category=UserWarning,
+            stacklevel=2
+        )
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+    return ssl_context
+
+
+def _login(server: config.EmailServer) -> str:
+    return f"{server.user_name}@{server.host}"
+
+
+async def connect_imap(incoming: config.EmailServer) -> aioimaplib.IMAP4:
+    """Open a new IMAP connection and log in."""
+    if incoming.use_ssl:
+        client = aioimaplib.IMAP4_SSL(
+            host=incoming.host,
+            port=incoming.port,
+            ssl_context=create_ssl_context(incoming)
+        )
+    else:
+        client = aioimaplib.IMAP4(
+            host=incoming.host,
+            port=incoming.port
+        )
+
+    await client.wait_hello_from_server()
+    response = await client.login(incoming.user_name, incoming.password)
+    if response.result != "OK":
+        raise ConnectionError(f"IMAP login failed for {_login(incoming)}")
+
+    use_store = store.get_metadata_store() is not None
+    if incoming.use_compression or use_store:
+        try:
+            # Many servers only advertise COMPRESS/CONDSTORE/QRESYNC once authenticated.
+            await client.protocol.capability()
+        except Exception as e:
+            logger.warning(f"Could not refresh IMAP capabilities: {e}")
+
+    if incoming.use_compression:
+        await _enable_compression(client, incoming)
+    if use_store:
+        await _enable_qresync(client)
+
+    return client
+
+
+async def _enable_compression(
+    client: aioimaplib.IMAP4, incoming: config.EmailServer
+) -> None:
+    """Turn on COMPRESS=DEFLATE when the server offers it."""
+    try:
+        counters = compress.get_counters(_login(incoming))
+        if await compress.enable_deflate(client, counters):
+            logger.debug(f"COMPRESS=DEFLATE active for {_login(incoming)}")
+    except Exception as e:
+        logger.warning(f"Could not enable COMPRESS=DEFLATE: {e}")
+
+
+async def _enable_qresync(client: aioimaplib.IMAP4) -> None:
+    """ENABLE QRESYNC for incremental sync of the metadata store."""
+    try:
+        if client.has_capability("QRESYNC") and client.has_capability("ENABLE"):
+            response = await client.enable("QRESYNC")
+            if response.result != "OK":
+                client.protocol.capabilities.discard("QRESYNC")
+    except Exception as e:
+        logger.warning(f"Could not enable QRESYNC: {e}")
+        client.protocol.capabilities.discard("QRESYNC")
+
+
+async def connect_smtp(outgoing: config.EmailServer) -> aiosmtplib.SMTP:
+    """Open a new SMTP connection (implicit TLS or STARTTLS) and log in."""
+    ssl_context = create_ssl_context(outgoing)
+    if outgoing.use_ssl:
+        client = aiosmtplib.SMTP(
+            hostname=outgoing.host,
+            port=outgoing.port,
+            use_tls=True,
+            tls_context=ssl_context,
+        )
+    else:
+        client = aiosmtplib.SMTP(
+            hostname=outgoing.host,
+            port=outgoing.port,
+            use_tls=False,
+            start_tls=True,
+            tls_context=ssl_context,
+        )
+
+    await client.connect()
+    await client.login(outgoing.user_name, outgoing.password)
+    return client
+
+
+class PooledIMAPConnection:
+    """An authenticated IMAP connection owned by an IMAPConnectionPool."""
+
+    def __init__(self, client: aioimaplib.IMAP4):
+        self.client = client
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # Mailbox currently open on this connection and how it was opened.
+        self.selected_mailbox: str | None = None
+        self.read_only = False
+        self.select_info: dict = {}
+
+    def idle_for(self) -> float:
+        """Seconds since the connection was last returned to the pool."""
+        return time.monotonic() - self.last_used
+
+    async def is_healthy(self) -> bool:
+        """Check the connection with a NOOP round trip."""
+        try:
+            response = await self.client.noop()
+            return response.result == "OK"
+        except Exception:
+            return False
+
+    async def logout(self) -> None:
+        """Log out, ignoring errors from connections that are already dead."""
+        try:
+            await self.client.logout()
+        except Exception:
+            pass
+
+
+class PooledSMTPConnection:
+    """An authenticated SMTP session owned by an SMTPConnectionPool."""
+
+    def __init__(self, client: aiosmtplib.SMTP):
+        self.client = client
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    def idle_for(self) -> float:
+        """Seconds since the connection was last returned to the pool."""
+        return time.monotonic() - self.last_used
+
+    async def is_healthy(self) -> bool:
+        """Check the session with a NOOP round trip."""
+        try:
+            return self.client.is_connected and (await self.client.noop()).code == 250
+        except Exception:
+            return False
+
+    async def reset(self) -> bool:
+        """Abort any mail transaction with RSET so the session can send again."""
+        try:
+            return (await self.client.rset()).code == 250
+        except Exception:
+            return False
+
+    async def logout(self) -> None:
+        """End the session with QUIT, ignoring errors from dead connections."""
+        try:
+            await self.client.quit()
+        except Exception:
+            self.client.close()
+
+
+class RateLimiter:
+    """Spaces events out so at most per_minute start in any minute; 0 disables it."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60 / per_minute if per_minute > 0 else 0
+        self._next = 0.0
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+class _ConnectionPool:
+    """Bounded pool of authenticated connections for a single account.
+
+    Connections are borrowed with acquire() and handed back with release().
+    Idle connections older than idle_timeout are logged out, and connections
+    idle longer than health_check_interval are verified with NOOP before
+    being lent out again.
+    """
+
+    protocol = ""
+
+    def __init__(
+        self,
+        account_settings: config.EmailSettings,
+        max_size: int,
+        idle_timeout: float,
+        health_check_interval: float,
+    ):
+        self.account_settings = account_settings
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._idle: list = []
+        self._in_use = 0
+        self._semaphore = asyncio.Semaphore(max_size)
+        self._closed = False
+
+    @property
+    def size(self) -> int:
+        """Number of open connections, idle or borrowed."""
+        return len(self._idle) + self._in_use
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def _connect(self):
+        raise NotImplementedError
+
+    def _take_idle(self, preference=None):
+        return self._idle.pop()
+
+    async def _acquire(self, preference=None):
+        """Borrow a connection, opening a new one if none is idle."""
+        if self._closed:
+            raise RuntimeError(
+                f"Connection pool for '{self.account_settings.account_name}' is closed"
+            )
+
+        await self._semaphore.acquire()
+        try:
+            await self._discard_expired()
+
+            while self._idle:
+                conn = self._take_idle(preference)
+                fresh = conn.idle_for() < self.health_check_interval
+                if fresh or await conn.is_healthy():
+                    self._in_use += 1
+                    return conn
+                logger.info(
+                    f"Discarding stale {self.protocol} connection for "
+                    f"{self.account_settings.account_name}"
+                )
+                await conn.logout()
+
+            conn = await self._connect()
+            self._in_use += 1
+            return conn
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def release(self, conn, discard: bool = False) -> None:
+        """Return a borrowed connection; discarded connections are logged out."""
+        self._in_use -= 1
+        try:
+            if discard or self._closed:
+                await conn.logout()
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+        finally:
+            self._semaphore.release()
+
+    async def close(self) -> None:
+        """Close the pool; borrowed connections are logged out when released."""
+        self._closed = True
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await conn.logout()
+
+    async def _discard_expired(self) -> None:
+        """Log out idle connections that exceeded idle_timeout."""
+        expired = [conn for conn in self._idle if conn.idle_for() >= self.idle_timeout]
+        if not expired:
+            return
+        self._idle = [conn for conn in self._idle if conn not in expired]
+        for conn in expired:
+            await conn.logout()
+
+
+class IMAPConnectionPool(_ConnectionPool):
+    """Bounded pool of authenticated IMAP connections for a single account."""
+
+    protocol = "IMAP"
+
+    def __init__(
+        self,
+        account_settings: config.EmailSettings,
+        max_size: int = IMAP_POOL_SIZE,
+        idle_timeout: float = IMAP_POOL_IDLE_TIMEOUT,
+        health_check_interval: float = IMAP_POOL_HEALTH_CHECK_INTERVAL,
+    ):
+        super().__init__(
+            account_settings, max_size, idle_timeout, health_check_interval
+        )
+
+    async def acquire(self, mailbox: str | None = None) -> PooledIMAPConnection:
+        """Borrow a connection, opening a new one if none is idle.
+
+        An idle connection that already has mailbox selected is preferred,
+        so the borrower can skip the SELECT.
+        """
+        return await self._acquire(mailbox)
+
+    async def _connect(self) -> PooledIMAPConnection:
+        return PooledIMAPConnection(await connect_imap(self.account_settings.incoming))
+
+    def _take_idle(self, mailbox: str | None = None) -> PooledIMAPConnection:
+        if mailbox is not None:
+            for index in range(len(self._idle) - 1, -1, -1):
+                if self._idle[index].selected_mailbox == mailbox:
+                    return self._idle.pop(index)
+        return self._idle.pop()
+
+    @asynccontextmanager
+    async def connection(
+        self, mailbox: str | None = None
+    ) -> AsyncIterator[PooledIMAPConnection]:
+        """Borrow a connection for the duration of a block."""
+        conn = await self.acquire(mailbox)
+        try:
+            yield conn
+        except BaseException:
+            await self.release(conn, discard=True)
+            raise
+        else:
+            await self.release(conn)
+
+
+class SMTPConnectionPool(_ConnectionPool):
+    """Bounded pool of authenticated SMTP sessions for a single account.
+
+    A returned session is RSET so the next message starts a clean mail
+    transaction; sessions the server has dropped fail the NOOP check and
+    are replaced.
+    """
+
+    protocol = "SMTP"
+
+    def __init__(
+        self,
+        account_settings: config.EmailSettings,
+        max_size: int = SMTP_POOL_SIZE,
+        idle_timeout: float = SMTP_POOL_IDLE_TIMEOUT,
+        health_check_interval: float = SMTP_POOL_HEALTH_CHECK_INTERVAL,
+        rate_limit_per_minute: float = SMTP_RATE_LIMIT_PER_MINUTE,
+    ):
+        super().__init__(
+            account_settings, max_size, idle_timeout, health_check_interval
+        )
+        # Shared by every session of the account, so concurrency cannot exceed it.
+        self.rate_limiter = RateLimiter(rate_limit_per_minute)
+
+    async def acquire(self) -> PooledSMTPConnection:
+        """Borrow a session, opening a new one if none is idle."""
+        return await self._acquire()
+
+    async def _connect(self) -> PooledSMTPConnection:
+        return PooledSMTPConnection(await connect_smtp(self.account_settings.outgoing))
+
+    async def release(self, conn: PooledSMTPConnection, discard: bool = False) -> None:
+        """Return a borrowed session after RSET; sessions refusing RSET are closed."""
+        if not discard and not self._closed and not await conn.reset():
+            discard = True
+        await super().release(conn, discard)
+
+
+_imap_pools: dict[str, IMAPConnectionPool] = {}
+_smtp_pools: dict[str, SMTPConnectionPool] = {}
+_retiring: set[asyncio.Task] = set()
+
+
+def _get_pool(pools: dict, pool_class, account_settings: config.EmailSettings):
+    """Return the pool for an account, replacing it when its settings changed.
+
+    A pool whose account settings no longer match (e.g. the password was
+    changed) is closed in the background.
+    """
+    name = account_settings.account_name
+    existing = pools.get(name)
+    if existing is not None and existing.account_settings == account_settings:
+        return existing
+
+    if existing is not None:
+        task = asyncio.get_running_loop().create_task(existing.close())
+        _retiring.add(task)
+        task.add_done_callback(_retiring.discard)
+
+    new_pool = pool_class(account_settings)
+    pools[name] = new_pool
+    return new_pool
+
+
+def get_imap_pool(account_settings: config.EmailSettings) -> IMAPConnectionPool:
+    """Return the process-wide IMAP pool for an account, creating it on first use."""
+    return _get_pool(_imap_pools, IMAPConnectionPool, account_settings)
+
+
+def get_smtp_pool(account_settings: config.EmailSettings) -> SMTPConnectionPool:
+    """Return the process-wide SMTP pool for an account, creating it on first use."""
+    return _get_pool(_smtp_pools, SMTPConnectionPool, account_settings)
+
+
+def compression_stats(account_name: str) -> dict[str, int] | None:
+    """COMPRESS=DEFLATE byte counters of an account's pooled IMAP login, if any."""
+    imap_pool = _imap_pools.get(account_name)
+    if imap_pool is None:
+        return None
+    return compress.compression_stats().get(_login(imap_pool.account_settings.incoming))
+
+
+async def close_pool(account_name: str) -> None:
+    """Close and forget the pools for an account, if any."""
+    for pools in (_imap_pools, _smtp_pools):
+        existing = pools.pop(account_name, None)
+        if existing is not None:
+            await existing.close()
+
+
+async def close_all_pools() -> None:
+    """Close every pool; used on server shutdown."""
+    names = set(_imap_pools) | set(_smtp_pools)
+    for name in names:
+        await close_pool(name)
+
+    for login, stats in compress.compression_stats().items():
+        logger.info(
+            f"IMAP compression for {login}: {stats['raw_in']} bytes received as "
+            f"{stats['wire_in']}, {stats['raw_out']} sent as {stats['wire_out']} "
+            f"({stats['saved']} saved)"
+        )
@@ -0,0 +1,199 @@
+"""Configuration hot reload for long-running servers.
+
+ConfigWatcher notices when the configuration is rewritten by another
+process, such as the CLI or a second server, and applies the change
+without a restart. On Linux it waits on inotify events for the config
+directory. Elsewhere, or if inotify is unavailable, it compares the file's
+stat every ``UNIVERSAL_EMAIL_MCP_CONFIG_POLL_SECONDS``.
+
+The reload is incremental: config.reload_settings() decrypts only account
+records it has not seen before. Only accounts whose credentials or servers
+changed have their connection pools drained. An unreadable or invalid file
+is logged and ignored, and the settings already loaded stay in effect.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+
+from . import blocking, cache, config, pool, store
+
+logger = logging.getLogger(__name__)
+
+CONFIG_POLL_SECONDS = float(os.getenv("UNIVERSAL_EMAIL_MCP_CONFIG_POLL_SECONDS", "2"))
+# Editors and store() write several events per save; wait for them to settle.
+CONFIG_SETTLE_SECONDS = 0.2
+# With inotify, still stat the file now and then in case the directory was replaced.
+CONFIG_INOTIFY_RECHECK_SECONDS = 60
+
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_FROM = 0x040
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+OnChange = Callable[[], Awaitable[None]]
+
+
+def _open_inotify(directory) -> int | None:
+    """An inotify descriptor watching directory, or None without inotify."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    mask = (
+        _IN_MODIFY
+        | _IN_CLOSE_WRITE
+        | _IN_MOVED_FROM
+        | _IN_MOVED_TO
+        | _IN_CREATE
+        | _IN_DELETE
+    )
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _drain_inotify(fd: int) -> list[str]:
+    """Read pending events; returns the names of the files they concern."""
+    names = []
+    while True:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        if not data:
+            return names
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16 : offset + 16 + length].rstrip(b"\0")
+            names.append(os.fsdecode(name))
+            offset += 16 + length
+
+
+def _connection_changed(old: config.EmailSettings, new: config.EmailSettings) -> bool:
+    """Whether pooled connections made with old are no longer valid for new."""
+    return old.incoming != new.incoming or old.outgoing != new.outgoing
+
+
+def _mailbox_changed(old: config.EmailSettings, new: config.EmailSettings) -> bool:
+    """Whether the account now points at a different IMAP mailbox store."""
+    return any(
+        getattr(old.incoming, field) != getattr(new.incoming, field)
+        for field in ("host", "port", "user_name")
+    )
+
+
+class ConfigWatcher:
+    """Background task applying configuration changes made by other processes."""
+
+    def __init__(self, on_change: OnChange | None = None):
+        self.on_change = on_change
+        # The settings last applied; other callers may load a change first.
+        self._applied: config.SecureSettings | None = None
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="config-watcher")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        if self._applied is None:
+            self._applied = await config.load_settings()
+        fd = _open_inotify(config.CONFIG_PATH.parent)
+        if fd is None:
+            logger.info(
+                f"Polling {config.CONFIG_PATH} for changes every {CONFIG_POLL_SECONDS}s"
+            )
+        try:
+            while True:
+                if fd is None:
+                    await asyncio.sleep(CONFIG_POLL_SECONDS)
+                elif await self._wait_readable(fd, CONFIG_INOTIFY_RECHECK_SECONDS):
+                    await asyncio.sleep(CONFIG_SETTLE_SECONDS)
+                    if config.CONFIG_PATH.name not in _drain_inotify(fd):
+                        continue
+                try:
+                    await self.check()
+                except Exception as e:
+                    logger.error(f"Applying configuration change failed: {e}")
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    @staticmethod
+    async def _wait_readable(fd: int, timeout: float) -> bool:
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+        loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+        try:
+            await asyncio.wait_for(readable, timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            loop.remove_reader(fd)
+
+    async def check(self) -> bool:
+        """Reload the configuration if it changed; returns whether it was applied."""
+        try:
+            current = await blocking.run(config.reload_settings)
+        except Exception as e:
+            logger.warning(
+                f"Ignoring unreadable configuration {config.CONFIG_PATH}: {e}"
+            )
+            return False
+        previous, self._applied = self._applied, current
+        if current is previous:
+            return False
+
+        if previous is not None:
+            for name in previous.account_names():
+                # Unchanged accounts keep their record; only changed ones are decrypted.
+                if current.record_of(name) == previous.record_of(name):
+                    continue
+                try:
+                    old = await blocking.run(previous.get_account, name)
+                except (OSError, ValueError):
+                    # Replaced by another process before this one ever read it.
+                    old = None
+                new = await blocking.run(current.get_account, name)
+                if old and new and not _connection_changed(old, new):
+                    continue
+                logger.info(
+                    f"Account '{name}' was {'removed' if new is None else 'changed'}; "
+                    "draining its connections"
+                )
+                await pool.close_pool(name)
+                if new is None or old is None or _mailbox_changed(old, new):
+                    cache.message_cache.invalidate_account(name)
+                if new is None or (old is not None and _mailbox_changed(old, new)):
+                    metadata = store.get_metadata_store()
+                    if metadata is not None:
+                        await blocking.run(metadata.reset_account, name)
+
+        if self.on_change is not None:
+            await self.on_change()
+        return True
@@ -1,11 +1,16 @@
-"""Security utilities for encrypted configuration storage and secure credential management."""
+"""Security utilities for encrypted configuration and secure credential management.
+
+Nothing here touches the keyring or the filesystem at import time: the
+master key is fetched on first use and kept for the life of the process,
+and ``secure_config`` is created on first access.
+"""
 
 import base64
 import os
+import threading
 from pathlib import Path
 from typing import Any
 
-import keyring
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
@@ -17,11 +22,23 @@ class SecureStore:
     SERVICE_NAME = "universal-email-mcp"
     MASTER_KEY_NAME = "master-key"
 
-    def __init__(self):
-        self.cipher_suite = self._get_or_create_cipher_suite()
+    # Shared by every instance; two threads must not both create a master key.
+    _cipher_suite: Fernet | None = None
+    _cipher_lock = threading.Lock()
+
+    @property
+    def cipher_suite(self) -> Fernet:
+        """The cipher, created from the keyring's master key on first use."""
+        if SecureStore._cipher_suite is None:
+            with self._cipher_lock:
+                if SecureStore._cipher_suite is None:
+                    SecureStore._cipher_suite = self._get_or_create_cipher_suite()
+        return SecureStore._cipher_suite
 
     def _get_or_create_cipher_suite(self) -> Fernet:
         """Get or create a Fernet cipher suite for encryption."""
+        import keyring
+
         master_key = keyring.get_password(self.SERVICE_NAME, self.MASTER_KEY_NAME)
 
         if master_key is None:
@@ -64,16 +81,22 @@ class SecureStore:
 
     def store_secure_string(self, key: str, value: str) -> None:
         """Store a secure string in the system keyring."""
+        import keyring
+
         keyring.set_password(self.SERVICE_NAME, key, value)
 
     def get_secure_string(self, key: str) -> str | None:
         """Retrieve a secure string from the system keyring."""
+        import keyring
+
         return keyring.get_password(self.SERVICE_NAME, key)
 
     def delete_secure_string(self, key: str) -> bool:
         """Delete a secure string from the system keyring."""
+        import keyring
+        from keyring.errors import PasswordDeleteError
+
         try:
-            from keyring.errors import PasswordDeleteError
             keyring.delete_password(self.SERVICE_NAME, key)
             return True
         except PasswordDeleteError:
@@ -81,6 +104,8 @@ class SecureStore:
 
     def clear_all_secrets(self) -> None:
         """Clear all stored secrets (primarily for testing)."""
+        import keyring
+
         try:
             if hasattr(keyring, 'get_keyring'):
                 backend = keyring.get_keyring()
@@ -108,7 +133,6 @@ class SecureConfigManager:
     def __init__(self):
         self.secure_store = SecureStore()
         self.salt_file = Path.home() / ".local" / "share" / "universal-email-mcp" / "salt"
-        self.salt_file.parent.mkdir(parents=True, exist_ok=True)
 
     def _get_or_create_salt(self) -> bytes:
         """Get or create a salt for password-based key derivation."""
@@ -116,6 +140,7 @@ class SecureConfigManager:
             return self.salt_file.read_bytes()
         else:
             salt = os.urandom(16)
+            self.salt_file.parent.mkdir(parents=True, exist_ok=True)
             self.salt_file.write_bytes(salt)
             return salt
 
@@ -152,4 +177,20 @@ class SecureConfigManager:
         return decrypted_data
 
 
-secure_config = SecureConfigManager()
+_secure_config: SecureConfigManager | None = None
+
+
+def get_secure_config() -> SecureConfigManager:
+    """Return the process-wide SecureConfigManager, creating it on first use."""
+    global _secure_config
+
+    if _secure_config is None:
+        _secure_config = SecureConfigManager()
+    return _secure_config
+
+
+def __getattr__(name: str) -> Any:
+    # ``secure_config`` used to be created at import; keep the name working.
+    if name == "secure_config":
+        return get_secure_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
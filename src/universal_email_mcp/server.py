@@ -1,11 +1,12 @@
 
 import logging
+import weakref
 from typing import Any
 
 from mcp.server import Server
 from mcp.types import Tool
 
-from . import models
+from . import blocking, config, models, parsing, pool, reloader, spool, watcher
 from .tools import account, mail
 
 logging.basicConfig(
@@ -16,17 +17,146 @@ logging.basicConfig(
 logger = logging.getLogger("universal-email-mcp")
 
 
+def _format_attachments(attachments: list[models.AttachmentInfo]) -> str:
+    """One-line summary, e.g. 'report.pdf (application/pdf, 12 KB) [part 2]'."""
+    return ", ".join(
+        f"{a.filename or 'unnamed'} ({a.content_type}, "
+        f"{max(a.size // 1024, 1)} KB) [part {a.section}]"
+        for a in attachments
+    )
+
+
+def _format_summary(msg: models.MessageSummary, preview_label: str = "Preview") -> str:
+    """Render one entry of a listing or of search results."""
+    status = "✉️" if not msg.is_read else "📧"
+    attachment = "📎" if msg.has_attachments else ""
+    entry = (
+        f"{status} {attachment} [{msg.uid}] {msg.subject}\n"
+        f"    From: {msg.sender}\n"
+        f"    Date: {msg.date.strftime('%Y-%m-%d %H:%M')}"
+    )
+    if msg.attachments:
+        entry += f"\n    Attachments: {_format_attachments(msg.attachments)}"
+    if msg.preview:
+        entry += f"\n    {preview_label}: {msg.preview}"
+    return entry
+
+
+def _format_listing(result: models.ListMessagesOutput) -> str:
+    """Render one account's page of messages for list_messages."""
+    if result.error:
+        return (
+            f"Could not list {result.account_name} ({result.mailbox}): {result.error}"
+        )
+    if not result.messages:
+        return f"No messages found in {result.account_name} ({result.mailbox})."
+
+    messages_text = "\n\n".join(_format_summary(msg) for msg in result.messages)
+    pages = (result.total_messages + result.page_size - 1) // result.page_size
+    modseq = (
+        f"HIGHESTMODSEQ: {result.highestmodseq}\n"
+        if result.highestmodseq is not None
+        else ""
+    )
+    return (
+        f"Messages from {result.account_name} ({result.mailbox})\n"
+        f"Page {result.page} of {pages} ({result.total_messages} total)\n"
+        f"{modseq}\n{messages_text}"
+    )
+
+
+def _format_message(msg: models.EmailMessage) -> str:
+    """Render a full message for get_message and get_messages."""
+    status = "✉️ (Unread)" if not msg.is_read else "📧 (Read)"
+    attachment = " 📎 Has attachments" if msg.has_attachments else ""
+    attachment_list = (
+        f"Attachments: {_format_attachments(msg.attachments)}\n"
+        if msg.attachments else ""
+    )
+    return (
+        f"{status}{attachment}\n\n"
+        f"Subject: {msg.subject}\n"
+        f"From: {msg.sender}\n"
+        f"Date: {msg.date.strftime('%Y-%m-%d %H:%M:%S')}\n"
+        f"UID: {msg.uid}\n"
+        f"{attachment_list}\n"
+        f"Body:\n{msg.body}"
+    )
+
+
 class UniversalEmailServer:
 
     def __init__(self):
         self.server = Server("universal-email-mcp")
+        # Client sessions that receive mailbox change notifications.
+        self._sessions = weakref.WeakSet()
+        self.watchers = watcher.WatcherManager(self._notify_clients)
+        self.spool_worker: spool.SpoolWorker | None = None
+        # Applies configuration edits made by other processes, e.g. the CLI.
+        self.config_watcher = reloader.ConfigWatcher(self.watchers.refresh)
+        self.stall_monitor = (
+            blocking.LoopStallMonitor() if blocking.LOOP_STALL_WARN_MS > 0 else None
+        )
         self._setup_handlers()
 
+    def _start_spool_worker(self) -> None:
+        """Deliver queued outbound messages in the background, if a spool is set up."""
+        outbound = spool.get_spool()
+        if outbound is not None:
+            self.spool_worker = spool.SpoolWorker(outbound, mail.deliver_spooled)
+            self.spool_worker.start()
+
+    async def _stop_spool_worker(self) -> None:
+        if self.spool_worker is not None:
+            await self.spool_worker.stop()
+            self.spool_worker = None
+
+    def _track_session(self) -> None:
+        """Remember the session of the current request for notifications."""
+        try:
+            self._sessions.add(self.server.request_context.session)
+        except LookupError:
+            pass
+
+    async def _notify_clients(self, event: dict[str, Any]) -> None:
+        """Forward a mailbox change event to every connected client."""
+        for session in list(self._sessions):
+            try:
+                await session.send_log_message(
+                    level="info", data=event, logger="universal-email-mcp.watch"
+                )
+            except Exception as e:
+                logger.debug(f"Dropping session after failed notification: {e}")
+                self._sessions.discard(session)
+
+    def _progress_reporter(self, total: int):
+        """A per-item callback sending progress notifications, if asked for."""
+        try:
+            context = self.server.request_context
+        except LookupError:
+            return None
+        token = context.meta.progressToken if context.meta else None
+        if token is None:
+            return None
+
+        done = 0
+
+        async def report(_item) -> None:
+            nonlocal done
+            done += 1
+            try:
+                await context.session.send_progress_notification(token, done, total)
+            except Exception as e:
+                logger.debug(f"Could not send progress notification: {e}")
+
+        return report
+
     def _setup_handlers(self):
 
         @self.server.list_tools()
         async def handle_list_tools() -> list[Tool]:
             """List all available email tools."""
+            self._track_session()
             return [
                 Tool(
                     name="add_account",
@@ -73,6 +203,14 @@ class UniversalEmailServer:
                                 "default": True,
                                 "description": "Verify SSL certificates for IMAP (set to false for self-signed certificates)"
                             },
+                            "imap_use_compression": {
+                                "type": "boolean",
+                                "default": True,
+                                "description": (
+                                    "Use COMPRESS=DEFLATE on IMAP when the server "
+                                    "supports it (set to false to opt out)"
+                                )
+                            },
                             "smtp_host": {
                                 "type": "string",
                                 "description": "SMTP server hostname"
@@ -96,6 +234,27 @@ class UniversalEmailServer:
                         "required": ["account_name", "full_name", "email_address", "user_name", "password", "imap_host", "smtp_host"]
                     }
                 ),
+                Tool(
+                    name="import_accounts",
+                    description=(
+                        "Add or replace many email accounts in one operation, "
+                        "written to disk with a single sync"
+                    ),
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "accounts": {
+                                "type": "array",
+                                "minItems": 1,
+                                "items": models.AddAccountInput.model_json_schema(),
+                                "description": (
+                                    "Accounts with the same fields as add_account"
+                                )
+                            }
+                        },
+                        "required": ["accounts"]
+                    }
+                ),
                 Tool(
                     name="list_accounts",
                     description="List all configured email accounts",
@@ -121,13 +280,22 @@ class UniversalEmailServer:
                 ),
                 Tool(
                     name="list_messages",
-                    description="List email messages from a specified account with optional filtering",
+                    description=(
+                        "List email messages from one or more accounts with optional "
+                        "filtering; accounts are queried concurrently"
+                    ),
                     inputSchema={
                         "type": "object",
                         "properties": {
                             "account_name": {
-                                "type": "string",
-                                "description": "Name of the account to list messages from"
+                                "oneOf": [
+                                    {"type": "string"},
+                                    {"type": "array", "items": {"type": "string"}}
+                                ],
+                                "description": (
+                                    "Account to list messages from, a list of "
+                                    "accounts, or '*' for all accounts"
+                                )
                             },
                             "mailbox": {
                                 "type": "string",
@@ -169,11 +337,90 @@ class UniversalEmailServer:
                                 "type": "boolean",
                                 "default": False,
                                 "description": "Only show unread messages"
+                            },
+                            "preview_chars": {
+                                "type": "integer",
+                                "default": 0,
+                                "minimum": 0,
+                                "maximum": 1024,
+                                "description": (
+                                    "Include a body preview of up to this many "
+                                    "characters (0 disables)"
+                                )
                             }
                         },
                         "required": ["account_name"]
                     }
                 ),
+                Tool(
+                    name="count_messages",
+                    description=(
+                        "Count the messages in a mailbox of one or more accounts; "
+                        "accounts are queried concurrently"
+                    ),
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "account_name": {
+                                "oneOf": [
+                                    {"type": "string"},
+                                    {"type": "array", "items": {"type": "string"}}
+                                ],
+                                "description": (
+                                    "Account to count messages of, a list of accounts, "
+                                    "or '*' for all accounts"
+                                )
+                            },
+                            "mailbox": {
+                                "type": "string",
+                                "default": "INBOX",
+                                "description": "Mailbox to count messages in"
+                            },
+                            "unread_only": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Only count unread messages"
+                            }
+                        },
+                        "required": ["account_name"]
+                    }
+                ),
+                Tool(
+                    name="search_messages",
+                    description=(
+                        "Full-text search of subjects, senders and message bodies "
+                        "using a local index"
+                    ),
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "account_name": {
+                                "type": "string",
+                                "description": "Name of the account to search"
+                            },
+                            "query": {
+                                "type": "string",
+                                "description": (
+                                    "Words to search for; supports \"exact phrases\", "
+                                    "OR, NOT and prefix*"
+                                )
+                            },
+                            "mailbox": {
+                                "type": "string",
+                                "default": "INBOX",
+                                "description": "Mailbox to search"
+                            },
+                            "limit": {
+                                "type": "integer",
+                                "default": 20,
+                                "minimum": 1,
+                                "maximum": 100,
+                                "description": "Maximum number of results"
+                            }
+                        },
+                        "required": ["account_name", "query"]
+                    }
+                ),
                 Tool(
                     name="send_message",
                     description="Send an email message from a specified account",
@@ -211,11 +458,107 @@ class UniversalEmailServer:
                                 "type": "boolean",
                                 "default": False,
                                 "description": "Whether the body content is HTML"
+                            },
+                            "queue": {
+                                "type": "boolean",
+                                "description": (
+                                    "Queue in the outbound spool and return a queue ID "
+                                    "at once; defaults to true when the spool is "
+                                    "configured"
+                                )
                             }
                         },
                         "required": ["account_name", "recipients", "subject", "body"]
                     }
                 ),
+                Tool(
+                    name="get_send_status",
+                    description=(
+                        "Get the delivery state of a message queued by send_message"
+                    ),
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "queue_id": {
+                                "type": "string",
+                                "description": "Queue ID returned by send_message"
+                            }
+                        },
+                        "required": ["queue_id"]
+                    }
+                ),
+                Tool(
+                    name="send_messages",
+                    description=(
+                        "Send many messages, or one template to many recipients "
+                        "($name placeholders), over a few reused SMTP sessions; "
+                        "reports the outcome of each message"
+                    ),
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "account_name": {
+                                "type": "string",
+                                "description": "Name of the account to send from"
+                            },
+                            "messages": {
+                                "type": "array",
+                                "maxItems": 1000,
+                                "description": "Complete messages to send",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "recipients": {
+                                            "type": "array", "items": {"type": "string"}
+                                        },
+                                        "subject": {"type": "string"},
+                                        "body": {"type": "string"},
+                                        "cc": {
+                                            "type": "array", "items": {"type": "string"}
+                                        },
+                                        "bcc": {
+                                            "type": "array", "items": {"type": "string"}
+                                        },
+                                        "is_html": {"type": "boolean", "default": False}
+                                    },
+                                    "required": ["recipients", "subject", "body"]
+                                }
+                            },
+                            "template": {
+                                "type": "object",
+                                "description": (
+                                    "Subject and body with $name or ${name} "
+                                    "placeholders, sent to each merge entry"
+                                ),
+                                "properties": {
+                                    "subject": {"type": "string"},
+                                    "body": {"type": "string"},
+                                    "is_html": {"type": "boolean", "default": False}
+                                },
+                                "required": ["subject", "body"]
+                            },
+                            "merge": {
+                                "type": "array",
+                                "maxItems": 1000,
+                                "description": (
+                                    "Template recipients; $email is always available"
+                                ),
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "email": {"type": "string"},
+                                        "variables": {
+                                            "type": "object",
+                                            "additionalProperties": {"type": "string"}
+                                        }
+                                    },
+                                    "required": ["email"]
+                                }
+                            }
+                        },
+                        "required": ["account_name"]
+                    }
+                ),
                 Tool(
                     name="get_message",
                     description="Get a specific email message by UID",
@@ -244,6 +587,81 @@ class UniversalEmailServer:
                         "required": ["account_name", "message_uid"]
                     }
                 ),
+                Tool(
+                    name="get_messages",
+                    description=(
+                        "Get several email messages by UID in one round trip, "
+                        "within a total size budget"
+                    ),
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "account_name": {
+                                "type": "string",
+                                "description": "Name of the account"
+                            },
+                            "message_uids": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "minItems": 1,
+                                "maxItems": 500,
+                                "description": "Unique identifiers of the messages"
+                            },
+                            "mailbox": {
+                                "type": "string",
+                                "default": "INBOX",
+                                "description": "Mailbox containing the messages"
+                            },
+                            "max_total_kb": {
+                                "type": "integer",
+                                "default": 4096,
+                                "minimum": 0,
+                                "description": (
+                                    "Total size budget in KB; messages that do not "
+                                    "fit are skipped (0 disables)"
+                                )
+                            }
+                        },
+                        "required": ["account_name", "message_uids"]
+                    }
+                ),
+                Tool(
+                    name="download_attachment",
+                    description=(
+                        "Download an attachment of an email message to a local file; "
+                        "interrupted downloads resume"
+                    ),
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "account_name": {
+                                "type": "string",
+                                "description": "Name of the account"
+                            },
+                            "message_uid": {
+                                "type": "string",
+                                "description": "Unique identifier of the message"
+                            },
+                            "mailbox": {
+                                "type": "string",
+                                "default": "INBOX",
+                                "description": "Mailbox containing the message"
+                            },
+                            "attachment": {
+                                "type": "string",
+                                "description": (
+                                    "MIME section number (e.g. '2' or '1.3') or file "
+                                    "name; defaults to the first attachment"
+                                )
+                            },
+                            "directory": {
+                                "type": "string",
+                                "description": "Directory to save the attachment in"
+                            }
+                        },
+                        "required": ["account_name", "message_uid"]
+                    }
+                ),
                 Tool(
                     name="mark_message",
                     description="Mark a message as read or unread",
@@ -271,6 +689,62 @@ class UniversalEmailServer:
                         "required": ["account_name", "message_uid", "mark_as_read"]
                     }
                 ),
+                Tool(
+                    name="mark_messages",
+                    description=(
+                        "Add, remove or replace flags on many messages with one "
+                        "command. Pass the HIGHESTMODSEQ shown by list_messages as "
+                        "unchanged_since to skip messages changed since they were "
+                        "listed; without it flags are changed unconditionally"
+                    ),
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "account_name": {
+                                "type": "string",
+                                "description": "Name of the account"
+                            },
+                            "message_uids": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "minItems": 1,
+                                "description": "UIDs and UID ranges such as '120:180'"
+                            },
+                            "mailbox": {
+                                "type": "string",
+                                "default": "INBOX",
+                                "description": "Mailbox containing the messages"
+                            },
+                            "flags": {
+                                "type": "array",
+                                "items": {"type": "string"},
+                                "default": ["\\Seen"],
+                                "description": (
+                                    "Flags to change, e.g. '\\Seen', '\\Flagged' "
+                                    "or a keyword"
+                                )
+                            },
+                            "action": {
+                                "type": "string",
+                                "enum": ["add", "remove", "replace"],
+                                "default": "add",
+                                "description": (
+                                    "Add the flags, remove them, or replace all "
+                                    "flags with them"
+                                )
+                            },
+                            "unchanged_since": {
+                                "type": "integer",
+                                "description": (
+                                    "Only change messages whose MODSEQ is not above "
+                                    "this, e.g. the HIGHESTMODSEQ shown by "
+                                    "list_messages (needs CONDSTORE)"
+                                )
+                            }
+                        },
+                        "required": ["account_name", "message_uids"]
+                    }
+                ),
                 Tool(
                     name="list_mailboxes",
                     description="List available mailboxes/folders for an account",
@@ -287,9 +761,15 @@ class UniversalEmailServer:
                 )
             ]
 
+        @self.server.set_logging_level()
+        async def handle_set_logging_level(level) -> None:
+            """Accept logging/setLevel; mailbox notifications always use info."""
+            self._track_session()
+
         @self.server.call_tool()
         async def handle_call_tool(name: str, arguments: dict[str, Any] | None) -> list[dict[str, Any]]:
             """Handle tool execution."""
+            self._track_session()
             if arguments is None:
                 arguments = {}
 
@@ -301,20 +781,48 @@ class UniversalEmailServer:
 
             try:
                 logger.info(f"[{request_id}] Executing tool: {name} with arguments: {list(arguments.keys())}")
+                # Read and decrypt a changed configuration off the loop; the
+                # handlers below then find the settings already cached.
+                await config.load_settings()
 
                 if name == "add_account":
                     input_data = models.AddAccountInput(**arguments)
                     logger.info(f"[{request_id}] Adding account: {input_data.account_name}")
                     result = await account.add_account(input_data)
                     logger.info(f"[{request_id}] Account added: {result.status}")
+                    if result.status == "success":
+                        await self.watchers.refresh()
                     return [{"type": "text", "text": f"Status: {result.status}\nDetails: {result.details}"}]
 
+                elif name == "import_accounts":
+                    input_data = models.ImportAccountsInput(**arguments)
+                    logger.info(
+                        f"[{request_id}] Importing {len(input_data.accounts)} accounts"
+                    )
+                    result = await account.import_accounts(input_data)
+                    logger.info(f"[{request_id}] Account import: {result.status}")
+                    if result.status == "success":
+                        await self.watchers.refresh()
+                    text = f"Status: {result.status}\nDetails: {result.details}"
+                    return [{"type": "text", "text": text}]
+
                 elif name == "list_accounts":
                     logger.info(f"[{request_id}] Listing accounts")
                     result = await account.list_accounts()
                     logger.info(f"[{request_id}] Found {len(result.accounts)} accounts")
                     if result.accounts:
-                        account_list = "\n".join(f"- {acc}" for acc in result.accounts)
+                        lines = []
+                        for acc in result.accounts:
+                            stats = result.compression.get(acc)
+                            if stats:
+                                raw = stats["raw_in"] + stats["raw_out"]
+                                wire = stats["wire_in"] + stats["wire_out"]
+                                acc += (
+                                    f" (IMAP compression: {raw} bytes carried "
+                                    f"as {wire}, {stats['saved']} saved)"
+                                )
+                            lines.append(f"- {acc}")
+                        account_list = "\n".join(lines)
                         return [{"type": "text", "text": f"Configured accounts:\n{account_list}"}]
                     else:
                         return [{"type": "text", "text": "No email accounts configured."}]
@@ -324,57 +832,189 @@ class UniversalEmailServer:
                     logger.info(f"[{request_id}] Removing account: {input_data.account_name}")
                     result = await account.remove_account(input_data)
                     logger.info(f"[{request_id}] Account removal: {result.status}")
+                    if result.status == "success":
+                        await self.watchers.refresh()
                     return [{"type": "text", "text": f"Status: {result.status}\nDetails: {result.details}"}]
 
                 elif name == "list_messages":
                     input_data = models.ListMessagesInput(**arguments)
-                    logger.info(f"[{request_id}] Listing messages from {input_data.account_name}")
+                    logger.info(
+                        f"[{request_id}] Listing messages from "
+                        f"{input_data.account_name}"
+                    )
                     result = await mail.list_messages(input_data)
+
+                    if isinstance(result, models.MultiAccountListMessagesOutput):
+                        logger.info(
+                            f"[{request_id}] Listed {len(result.results)} accounts"
+                        )
+                        text = "\n\n---\n\n".join(
+                            _format_listing(listing) for listing in result.results
+                        )
+                        text = text or "No email accounts configured."
+                        return [{"type": "text", "text": text}]
+
                     logger.info(f"[{request_id}] Found {result.total_messages} messages")
+                    return [{"type": "text", "text": _format_listing(result)}]
 
-                    if result.messages:
-                        message_list = []
-                        for msg in result.messages:
-                            status = "✉️" if not msg.is_read else "📧"
-                            attachment = "📎" if msg.has_attachments else ""
-                            message_list.append(
-                                f"{status} {attachment} [{msg.uid}] {msg.subject}\n"
-                                f"    From: {msg.sender}\n"
-                                f"    Date: {msg.date.strftime('%Y-%m-%d %H:%M')}"
-                            )
+                elif name == "count_messages":
+                    input_data = models.CountMessagesInput(**arguments)
+                    logger.info(
+                        f"[{request_id}] Counting messages of {input_data.account_name}"
+                    )
+                    result = await mail.count_messages(input_data)
 
-                        messages_text = "\n\n".join(message_list)
-                        return [{"type": "text", "text":
-                                f"Messages from {result.account_name} ({result.mailbox})\n"
-                                f"Page {result.page} of {(result.total_messages + result.page_size - 1) // result.page_size} "
-                                f"({result.total_messages} total)\n\n{messages_text}"}]
+                    if isinstance(result, models.MultiAccountCountMessagesOutput):
+                        counts = result.results
                     else:
-                        return [{"type": "text", "text": f"No messages found in {result.account_name} ({result.mailbox})."}]
+                        counts = [result]
+                    kind = "unread messages" if input_data.unread_only else "messages"
+                    lines = [
+                        f"- {count.account_name} ({count.mailbox}): "
+                        + (
+                            f"error: {count.error}"
+                            if count.error
+                            else f"{count.total_messages} {kind}"
+                        )
+                        for count in counts
+                    ]
+                    text = "\n".join(lines) or "No email accounts configured."
+                    return [{"type": "text", "text": text}]
+
+                elif name == "search_messages":
+                    input_data = models.SearchMessagesInput(**arguments)
+                    logger.info(
+                        f"[{request_id}] Searching messages in "
+                        f"{input_data.account_name}"
+                    )
+                    result = await mail.search_messages(input_data)
+                    logger.info(f"[{request_id}] Found {len(result.messages)} matches")
+
+                    where = f"in {result.account_name} ({result.mailbox})"
+                    if not result.messages:
+                        text = f"No messages matching '{result.query}' {where}."
+                        return [{"type": "text", "text": text}]
+
+                    messages_text = "\n\n".join(
+                        _format_summary(msg, preview_label="Match")
+                        for msg in result.messages
+                    )
+                    text = f"Results for '{result.query}' {where}\n\n{messages_text}"
+                    return [{"type": "text", "text": text}]
 
                 elif name == "send_message":
                     input_data = models.SendMessageInput(**arguments)
                     logger.info(f"[{request_id}] Sending message to {len(input_data.recipients)} recipients")
                     result = await mail.send_message(input_data)
                     logger.info(f"[{request_id}] Send result: {result.status}")
-                    return [{"type": "text", "text": f"Status: {result.status}\nDetails: {result.details}"}]
+                    text = f"Status: {result.status}\nDetails: {result.details}"
+                    if result.queue_id:
+                        text += f"\nQueue ID: {result.queue_id}"
+                    return [{"type": "text", "text": text}]
+
+                elif name == "get_send_status":
+                    input_data = models.GetSendStatusInput(**arguments)
+                    result = await mail.get_send_status(input_data)
+                    logger.info(
+                        f"[{request_id}] Queue entry {result.queue_id} "
+                        f"is {result.status}"
+                    )
+
+                    text = (
+                        f"Queue ID: {result.queue_id}\n"
+                        f"Account: {result.account_name}\n"
+                        f"Status: {result.status}\n"
+                        f"Recipients: {', '.join(result.recipients)}\n"
+                        f"Attempts: {result.attempts}\n"
+                        f"Queued: {result.created_at.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                        f"Updated: {result.updated_at.strftime('%Y-%m-%d %H:%M:%S')}"
+                    )
+                    if result.next_attempt:
+                        next_attempt = result.next_attempt.strftime("%Y-%m-%d %H:%M:%S")
+                        text += f"\nNext attempt: {next_attempt}"
+                    if result.last_error:
+                        text += f"\nLast error: {result.last_error}"
+                    if result.refused:
+                        text += "\nRefused: " + "; ".join(
+                            f"{rcpt} ({reply})"
+                            for rcpt, reply in result.refused.items()
+                        )
+                    return [{"type": "text", "text": text}]
+
+                elif name == "send_messages":
+                    input_data = models.SendMessagesInput(**arguments)
+                    total = len(input_data.messages) or len(input_data.merge)
+                    logger.info(f"[{request_id}] Sending {total} messages")
+                    result = await mail.send_messages(
+                        input_data, self._progress_reporter(total)
+                    )
+                    logger.info(
+                        f"[{request_id}] Sent {result.sent}, failed {result.failed}"
+                    )
+
+                    lines = [
+                        f"Sent {result.sent} of {len(result.results)} messages "
+                        f"from {result.account_name}"
+                    ]
+                    for item in result.results:
+                        if item.status == "error" or item.details:
+                            recipients = ", ".join(item.recipients)
+                            lines.append(
+                                f"#{item.index} ({recipients}): "
+                                f"{item.status} - {item.details}"
+                            )
+                    return [{"type": "text", "text": "\n".join(lines)}]
 
                 elif name == "get_message":
                     input_data = models.GetMessageInput(**arguments)
                     logger.info(f"[{request_id}] Getting message UID {input_data.message_uid}")
                     result = await mail.get_message(input_data)
 
-                    msg = result.message
-                    status = "✉️ (Unread)" if not msg.is_read else "📧 (Read)"
-                    attachment = " 📎 Has attachments" if msg.has_attachments else ""
+                    logger.info(
+                        f"[{request_id}] Message retrieved: {result.message.subject}"
+                    )
+                    return [{"type": "text", "text": _format_message(result.message)}]
+
+                elif name == "get_messages":
+                    input_data = models.GetMessagesInput(**arguments)
+                    requested = len(input_data.message_uids)
+                    logger.info(f"[{request_id}] Getting {requested} messages")
+                    result = await mail.get_messages(
+                        input_data, self._progress_reporter(requested)
+                    )
+                    logger.info(
+                        f"[{request_id}] Retrieved {len(result.messages)} messages"
+                    )
+
+                    parts = [_format_message(msg) for msg in result.messages]
+                    if result.skipped_uids:
+                        parts.append(
+                            f"Skipped (over the {input_data.max_total_kb} KB budget): "
+                            f"{', '.join(result.skipped_uids)}"
+                        )
+                    if result.missing_uids:
+                        parts.append(f"Not found: {', '.join(result.missing_uids)}")
+                    return [{"type": "text", "text": "\n\n---\n\n".join(parts)}]
+
+                elif name == "download_attachment":
+                    input_data = models.DownloadAttachmentInput(**arguments)
+                    logger.info(
+                        f"[{request_id}] Downloading attachment of UID "
+                        f"{input_data.message_uid}"
+                    )
+                    result = await mail.download_attachment(input_data)
+                    logger.info(
+                        f"[{request_id}] Saved {result.size} bytes to {result.path}"
+                    )
 
-                    logger.info(f"[{request_id}] Message retrieved: {msg.subject}")
+                    resumed = " (resumed)" if result.resumed else ""
                     return [{"type": "text", "text":
-                            f"{status}{attachment}\n\n"
-                            f"Subject: {msg.subject}\n"
-                            f"From: {msg.sender}\n"
-                            f"Date: {msg.date.strftime('%Y-%m-%d %H:%M:%S')}\n"
-                            f"UID: {msg.uid}\n\n"
-                            f"Body:\n{msg.body}"}]
+                            f"Saved attachment{resumed}\n\n"
+                            f"File: {result.filename}\n"
+                            f"Type: {result.content_type}\n"
+                            f"Size: {result.size} bytes\n"
+                            f"Part: {result.section}\n"
+                            f"Path: {result.path}"}]
 
                 elif name == "mark_message":
                     input_data = models.MarkMessageInput(**arguments)
@@ -383,6 +1023,19 @@ class UniversalEmailServer:
                     logger.info(f"[{request_id}] Mark result: {result.status}")
                     return [{"type": "text", "text": f"Status: {result.status}\nDetails: {result.details}"}]
 
+                elif name == "mark_messages":
+                    input_data = models.MarkMessagesInput(**arguments)
+                    logger.info(
+                        f"[{request_id}] Changing flags of "
+                        f"{len(input_data.message_uids)} UID items"
+                    )
+                    result = await mail.mark_messages(input_data)
+                    logger.info(f"[{request_id}] Mark result: {result.status}")
+                    text = f"Status: {result.status}\nDetails: {result.details}"
+                    if result.skipped_uids:
+                        text += f"\nSkipped UIDs: {', '.join(result.skipped_uids)}"
+                    return [{"type": "text", "text": text}]
+
                 elif name == "list_mailboxes":
                     input_data = models.ListMailboxesInput(**arguments)
                     logger.info(f"[{request_id}] Listing mailboxes for {input_data.account_name}")
@@ -413,27 +1066,43 @@ class UniversalEmailServer:
         """Run server with STDIO transport."""
         from mcp.server.models import InitializationOptions
         from mcp.server.stdio import stdio_server
-        from mcp.types import ServerCapabilities, ToolsCapability
-
-        async with stdio_server() as (read_stream, write_stream):
-            await self.server.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="universal-email-mcp",
-                    server_version="0.1.0",
-                    capabilities=ServerCapabilities(
-                        tools=ToolsCapability()
+        from mcp.types import LoggingCapability, ServerCapabilities, ToolsCapability
+
+        try:
+            await self.watchers.refresh()
+            self._start_spool_worker()
+            self.config_watcher.start()
+            if self.stall_monitor is not None:
+                self.stall_monitor.start()
+            async with stdio_server() as (read_stream, write_stream):
+                await self.server.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="universal-email-mcp",
+                        server_version="0.1.0",
+                        capabilities=ServerCapabilities(
+                            tools=ToolsCapability(),
+                            logging=LoggingCapability()
+                        ),
                     ),
-                ),
-            )
+                )
+        finally:
+            if self.stall_monitor is not None:
+                await self.stall_monitor.stop()
+            await self.config_watcher.stop()
+            await self._stop_spool_worker()
+            await self.watchers.stop_all()
+            await pool.close_all_pools()
+            parsing.shutdown()
+            blocking.shutdown()
 
     async def run_sse(self, host: str = "localhost", port: int = 8000):
         """Run server with Server-Sent Events transport."""
         import uvicorn
         from mcp.server.models import InitializationOptions
         from mcp.server.sse import SseServerTransport
-        from mcp.types import ServerCapabilities, ToolsCapability
+        from mcp.types import LoggingCapability, ServerCapabilities, ToolsCapability
         from starlette.applications import Starlette
         from starlette.responses import Response, JSONResponse
         from starlette.routing import Route
@@ -456,7 +1125,8 @@ class UniversalEmailServer:
                             server_name="universal-email-mcp",
                             server_version="0.1.0",
                             capabilities=ServerCapabilities(
-                                tools=ToolsCapability()
+                                tools=ToolsCapability(),
+                                logging=LoggingCapability()
                             ),
                         )
                     )
@@ -484,7 +1154,7 @@ class UniversalEmailServer:
                 )
             
             return JSONResponse({
-                "token": auth_manager.load_token(),
+                "token": await blocking.run(auth_manager.load_token),
                 "file_path": str(auth_manager.token_path),
                 "generated_at": auth_manager.get_token_info().get("created_at")
             })
@@ -504,7 +1174,22 @@ class UniversalEmailServer:
 
         config = uvicorn.Config(app, host=host, port=port, log_level="info")
         server = uvicorn.Server(config)
-        await server.serve()
+        try:
+            await self.watchers.refresh()
+            self._start_spool_worker()
+            self.config_watcher.start()
+            if self.stall_monitor is not None:
+                self.stall_monitor.start()
+            await server.serve()
+        finally:
+            if self.stall_monitor is not None:
+                await self.stall_monitor.stop()
+            await self.config_watcher.stop()
+            await self._stop_spool_worker()
+            await self.watchers.stop_all()
+            await pool.close_all_pools()
+            parsing.shutdown()
+            blocking.shutdown()
 
 
 def create_server() -> UniversalEmailServer:
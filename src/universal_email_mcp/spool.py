@@ -0,0 +1,396 @@
+"""Optional durable outbound spool with a background delivery worker.
+
+When ``UNIVERSAL_EMAIL_MCP_SPOOL_DIR`` names a directory, send_message
+writes the rendered message there and returns a queue ID instead of waiting
+for SMTP. Each entry is a ``<id>.eml`` file with the RFC 5322 bytes and a
+``<id>.json`` file with the envelope and delivery state. Both are written
+to a temporary file, fsynced and renamed into place, so a queued message
+survives a crash or power loss.
+
+SpoolWorker delivers due entries, retrying transient failures with
+exponential backoff. Several servers may share a spool directory (each
+stdio client starts its own); only the one holding the exclusive lock on
+``spool.lock`` delivers, the others retry the lock every
+SPOOL_POLL_SECONDS. Delivery is at-least-once: an entry that was being
+sent when its process died is sent again by the next lock holder.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+import aiosmtplib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from . import blocking
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR_ENV = "UNIVERSAL_EMAIL_MCP_SPOOL_DIR"
+SPOOL_MAX_ATTEMPTS = int(os.getenv("UNIVERSAL_EMAIL_MCP_SPOOL_MAX_ATTEMPTS", "8"))
+SPOOL_RETRY_BASE_SECONDS = float(
+    os.getenv("UNIVERSAL_EMAIL_MCP_SPOOL_RETRY_BASE_SECONDS", "30")
+)
+SPOOL_RETRY_MAX_SECONDS = 3600
+SPOOL_RETENTION_DAYS = float(os.getenv("UNIVERSAL_EMAIL_MCP_SPOOL_RETENTION_DAYS", "7"))
+# How often the directory is checked for entries queued by other processes,
+# and a standby worker retries the delivery lock.
+SPOOL_POLL_SECONDS = 5
+
+QUEUED = "queued"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+_QUEUE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+Deliver = Callable[[str, bytes, str, list[str]], Awaitable[dict[str, str]]]
+
+
+def _write_durably(path: Path, data: bytes) -> None:
+    """Replace path with data so either the old or the new content survives a crash."""
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def _fsync_directory(path: Path) -> None:
+    """Persist the directory entries created by renames, where the platform can."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def is_permanent(error: Exception) -> bool:
+    """Whether a delivery error is final (a 5xx reply) rather than worth retrying."""
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(e.code >= 500 for e in error.recipients)
+    if isinstance(error, aiosmtplib.SMTPResponseException):
+        return error.code >= 500
+    return isinstance(error, ValueError)
+
+
+class Spool:
+    """Directory of queued messages and their delivery state."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._wakeup = asyncio.Event()
+        # States by queue ID, loaded once; refresh() adds entries queued elsewhere.
+        self._index: dict[str, dict[str, Any]] | None = None
+        # Entries are saved from the blocking I/O threads.
+        self._index_lock = threading.Lock()
+        self._lock_fd: int | None = None
+
+    def try_lock(self) -> bool:
+        """Take the exclusive delivery lock without waiting; True if it was taken."""
+        if self._lock_fd is not None or fcntl is None:
+            return True
+        fd = os.open(self.path / "spool.lock", os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def unlock(self) -> None:
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def put(
+        self, account_name: str, message: bytes, sender: str, recipients: list[str]
+    ) -> str:
+        """enqueue() with the fsynced writes done off the event loop."""
+        queue_id = await blocking.run(
+            self._write_entry, account_name, message, sender, recipients
+        )
+        self._wakeup.set()
+        return queue_id
+
+    def enqueue(
+        self, account_name: str, message: bytes, sender: str, recipients: list[str]
+    ) -> str:
+        """Durably queue a rendered message; returns its queue ID."""
+        queue_id = self._write_entry(account_name, message, sender, recipients)
+        self._wakeup.set()
+        return queue_id
+
+    def _write_entry(
+        self, account_name: str, message: bytes, sender: str, recipients: list[str]
+    ) -> str:
+        queue_id = uuid.uuid4().hex
+        now = time.time()
+        _write_durably(self._message_path(queue_id), message)
+        # The state file is written last: an entry without one is never delivered.
+        self._save(
+            {
+                "queue_id": queue_id,
+                "account_name": account_name,
+                "sender": sender,
+                "recipients": recipients,
+                "status": QUEUED,
+                "attempts": 0,
+                "next_attempt": now,
+                "last_error": None,
+                "refused": {},
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+        _fsync_directory(self.path)
+        return queue_id
+
+    def get(self, queue_id: str) -> dict[str, Any] | None:
+        """The state of an entry, or None for unknown IDs."""
+        if not _QUEUE_ID_RE.match(queue_id):
+            return None
+        return self._load(self._state_path(queue_id))
+
+    def entries(self) -> list[dict[str, Any]]:
+        """All entries known to this process, oldest first."""
+        if self._index is None:
+            self.refresh()
+        with self._index_lock:
+            states = list(self._index.values())
+        return sorted(states, key=lambda s: s["created_at"])
+
+    def refresh(self) -> None:
+        """Index entries whose state files appeared since the last refresh."""
+        queue_ids = {path.stem for path in self.path.glob("*.json")}
+        with self._index_lock:
+            known = set(self._index or ())
+        loaded = {}
+        for queue_id in queue_ids - known:
+            state = self._load(self._state_path(queue_id))
+            if state is not None:
+                loaded[queue_id] = state
+        with self._index_lock:
+            index = self._index if self._index is not None else {}
+            for queue_id in known - queue_ids:
+                index.pop(queue_id, None)
+            for queue_id, state in loaded.items():
+                index.setdefault(queue_id, state)
+            self._index = index
+
+    def due(self, now: float | None = None) -> list[dict[str, Any]]:
+        """Queued entries whose next attempt is due."""
+        now = time.time() if now is None else now
+        return [
+            s
+            for s in self.entries()
+            if s["status"] == QUEUED and s["next_attempt"] <= now
+        ]
+
+    def next_due(self) -> float | None:
+        """When the earliest queued entry becomes due, if any."""
+        times = [s["next_attempt"] for s in self.entries() if s["status"] == QUEUED]
+        return min(times) if times else None
+
+    def message(self, queue_id: str) -> bytes:
+        return self._message_path(queue_id).read_bytes()
+
+    def recover(self) -> None:
+        """Requeue entries left in 'sending' by a process that died mid-delivery.
+
+        Only safe while holding the delivery lock: the previous holder, which
+        owned those entries, is gone.
+        """
+        for state in self.entries():
+            if state["status"] == SENDING:
+                logger.warning(
+                    f"Requeueing spooled message {state['queue_id']} "
+                    "interrupted during delivery"
+                )
+                state["status"] = QUEUED
+                self._save(state)
+
+    def mark_sending(self, state: dict[str, Any]) -> None:
+        state["status"] = SENDING
+        state["attempts"] += 1
+        self._save(state)
+
+    def mark_sent(self, state: dict[str, Any], refused: dict[str, str]) -> None:
+        state.update(status=SENT, refused=refused, last_error=None)
+        self._save(state)
+        self._message_path(state["queue_id"]).unlink(missing_ok=True)
+
+    def mark_failed(self, state: dict[str, Any], error: Exception) -> None:
+        """Schedule a retry with exponential backoff, or give up on permanent errors."""
+        state["last_error"] = str(error) or type(error).__name__
+        if is_permanent(error) or state["attempts"] >= SPOOL_MAX_ATTEMPTS:
+            state["status"] = FAILED
+            self._message_path(state["queue_id"]).unlink(missing_ok=True)
+        else:
+            delay = min(
+                SPOOL_RETRY_BASE_SECONDS * 2 ** (state["attempts"] - 1),
+                SPOOL_RETRY_MAX_SECONDS,
+            )
+            state["status"] = QUEUED
+            state["next_attempt"] = time.time() + delay
+        self._save(state)
+
+    def prune(self, now: float | None = None) -> None:
+        """Forget sent and failed entries older than SPOOL_RETENTION_DAYS."""
+        cutoff = (time.time() if now is None else now) - SPOOL_RETENTION_DAYS * 86400
+        for state in self.entries():
+            if state["status"] in (SENT, FAILED) and state["updated_at"] < cutoff:
+                self._state_path(state["queue_id"]).unlink(missing_ok=True)
+                self._message_path(state["queue_id"]).unlink(missing_ok=True)
+                with self._index_lock:
+                    self._index.pop(state["queue_id"], None)
+
+    async def wait(self, timeout: float | None) -> bool:
+        """Sleep until a message is queued here or timeout passes; True if woken."""
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except TimeoutError:
+            return False
+        self._wakeup.clear()
+        return True
+
+    def _save(self, state: dict[str, Any]) -> None:
+        state["updated_at"] = time.time()
+        _write_durably(self._state_path(state["queue_id"]), json.dumps(state).encode())
+        with self._index_lock:
+            if self._index is not None:
+                self._index[state["queue_id"]] = state
+
+    def _load(self, path: Path) -> dict[str, Any] | None:
+        try:
+            return json.loads(path.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _message_path(self, queue_id: str) -> Path:
+        return self.path / f"{queue_id}.eml"
+
+    def _state_path(self, queue_id: str) -> Path:
+        return self.path / f"{queue_id}.json"
+
+
+class SpoolWorker:
+    """Background task delivering due spool entries through deliver()."""
+
+    def __init__(self, spool: Spool, deliver: Deliver):
+        self.spool = spool
+        self.deliver = deliver
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run(), name="spool-delivery")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        self.spool.unlock()
+
+    async def _run(self) -> None:
+        if not await blocking.run(self.spool.try_lock):
+            logger.info(
+                f"Spool {self.spool.path} is delivered by another process; standing by"
+            )
+            while not await blocking.run(self.spool.try_lock):
+                await asyncio.sleep(SPOOL_POLL_SECONDS)
+        await blocking.run(self._prepare)
+
+        while True:
+            try:
+                await self.deliver_due()
+            except Exception as e:
+                logger.error(f"Spool delivery pass failed: {e}")
+
+            next_due = self.spool.next_due()
+            timeout = (
+                SPOOL_POLL_SECONDS
+                if next_due is None
+                else max(next_due - time.time(), 0)
+            )
+            if not await self.spool.wait(min(timeout, SPOOL_POLL_SECONDS)):
+                # Other processes may have queued messages in the meantime.
+                await blocking.run(self.spool.refresh)
+
+    def _prepare(self) -> None:
+        self.spool.refresh()
+        self.spool.recover()
+        self.spool.prune()
+
+    async def deliver_due(self) -> None:
+        """Attempt every entry that is due, oldest first."""
+        for state in self.spool.due():
+            try:
+                message = await blocking.run(self.spool.message, state["queue_id"])
+            except OSError as e:
+                await blocking.run(
+                    self.spool.mark_failed,
+                    state,
+                    ValueError(f"Spooled message is missing: {e}"),
+                )
+                continue
+
+            await blocking.run(self.spool.mark_sending, state)
+            try:
+                refused = await self.deliver(
+                    state["account_name"], message, state["sender"], state["recipients"]
+                )
+            except asyncio.CancelledError:
+                # Shutting down mid-delivery; recover() requeues it on the next start.
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"Delivery of spooled message {state['queue_id']} "
+                    f"(attempt {state['attempts']}) failed: {e}"
+                )
+                await blocking.run(self.spool.mark_failed, state, e)
+            else:
+                logger.info(f"Delivered spooled message {state['queue_id']}")
+                await blocking.run(self.spool.mark_sent, state, refused)
+
+
+_spool: Spool | None = None
+
+
+def get_spool() -> Spool | None:
+    """Return the process-wide spool, or None when spooling is disabled."""
+    global _spool
+
+    path = os.getenv(SPOOL_DIR_ENV)
+    if not path:
+        return None
+    if _spool is None:
+        _spool = Spool(Path(path).expanduser())
+    return _spool
+
+
+def reset_spool() -> None:
+    global _spool
+    _spool = None
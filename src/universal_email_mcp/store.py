@@ -0,0 +1,489 @@
+"""Optional on-disk SQLite store of per-mailbox message metadata.
+
+When ``UNIVERSAL_EMAIL_MCP_METADATA_DB`` points to a database file, listings
+and counts are answered from this store. EmailClient keeps it current with
+CONDSTORE/QRESYNC, so the server only sends what changed since the last
+sync. An FTS5 index over subjects, senders and decoded body text, kept in
+step with the messages table by triggers, backs full-text search.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections.abc import Iterable
+from datetime import datetime
+from email.header import decode_header, make_header
+from pathlib import Path
+from typing import NamedTuple
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+METADATA_DB_ENV = "UNIVERSAL_EMAIL_MCP_METADATA_DB"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS mailboxes (
+    account TEXT NOT NULL,
+    mailbox TEXT NOT NULL,
+    uidvalidity INTEGER NOT NULL,
+    highestmodseq INTEGER NOT NULL DEFAULT 0,
+    uidnext INTEGER,
+    PRIMARY KEY (account, mailbox)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    account TEXT NOT NULL,
+    mailbox TEXT NOT NULL,
+    uid INTEGER NOT NULL,
+    subject TEXT NOT NULL DEFAULT '',
+    sender TEXT NOT NULL DEFAULT '',
+    subject_text TEXT NOT NULL DEFAULT '',
+    sender_text TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL,
+    date_ts REAL NOT NULL,
+    flags TEXT NOT NULL DEFAULT '',
+    is_read INTEGER NOT NULL DEFAULT 0,
+    size INTEGER,
+    has_attachments INTEGER NOT NULL DEFAULT 0,
+    attachments TEXT NOT NULL DEFAULT '[]',
+    modseq INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account, mailbox, uid)
+);
+CREATE INDEX IF NOT EXISTS messages_by_date ON messages (account, mailbox, date_ts);
+"""
+
+# The FTS rowid is the rowid of the messages row; bodies live only in the index.
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, sender, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, subject, sender, body)
+    VALUES (new.rowid, new.subject_text, new.sender_text, '');
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_update
+AFTER UPDATE OF subject_text, sender_text ON messages BEGIN
+    UPDATE messages_fts SET subject = new.subject_text, sender = new.sender_text
+    WHERE rowid = new.rowid;
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    DELETE FROM messages_fts WHERE rowid = old.rowid;
+END;
+"""
+
+# bm25 column weights: subject, sender, body.
+_FTS_RANK = "bm25(messages_fts, 10.0, 5.0, 1.0)"
+
+
+class MailboxState(NamedTuple):
+    """Sync position of a mailbox in the store."""
+
+    uidvalidity: int
+    highestmodseq: int
+    uidnext: int | None
+
+
+def decode_header_text(value: str) -> str:
+    """Decode RFC 2047 encoded-words so filters match what users see."""
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+
+class MetadataStore:
+    """SQLite-backed metadata for synced mailboxes."""
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        if str(path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        # Callers run in the blocking I/O threads. Reads take the lock too, so
+        # they never see another thread's uncommitted transaction.
+        self._lock = threading.RLock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._add_missing_columns()
+        self.fts_enabled = self._create_fts_index()
+
+    def _add_missing_columns(self) -> None:
+        """Upgrade databases created before the attachments column existed."""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(messages)")}
+        if "attachments" not in columns:
+            with self._db:
+                self._db.execute(
+                    "ALTER TABLE messages"
+                    " ADD COLUMN attachments TEXT NOT NULL DEFAULT '[]'"
+                )
+
+    def _create_fts_index(self) -> bool:
+        try:
+            self._db.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite FTS5 unavailable, full-text search disabled: {e}")
+            return False
+
+        # Databases created before the index existed are backfilled once.
+        if self._db.execute(
+            "SELECT NOT EXISTS (SELECT 1 FROM messages_fts)"
+        ).fetchone()[0]:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO messages_fts (rowid, subject, sender, body)"
+                    " SELECT rowid, subject_text, sender_text, '' FROM messages"
+                )
+        return True
+
+    def close(self) -> None:
+        self._db.close()
+
+    def get_state(self, account: str, mailbox: str) -> MailboxState | None:
+        """The stored sync position of a mailbox, or None if never synced."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT uidvalidity, highestmodseq, uidnext FROM mailboxes"
+                " WHERE account = ? AND mailbox = ?",
+                (account, mailbox),
+            ).fetchone()
+        return MailboxState(*row) if row else None
+
+    def set_state(self, account: str, mailbox: str, state: MailboxState) -> None:
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO mailboxes"
+                " (account, mailbox, uidvalidity, highestmodseq, uidnext)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (
+                    account,
+                    mailbox,
+                    state.uidvalidity,
+                    state.highestmodseq,
+                    state.uidnext,
+                ),
+            )
+
+    def reset_mailbox(self, account: str, mailbox: str) -> None:
+        """Forget a mailbox, e.g. after its UIDVALIDITY changed."""
+        with self._lock, self._db:
+            self._db.execute(
+                "DELETE FROM messages WHERE account = ? AND mailbox = ?",
+                (account, mailbox),
+            )
+            self._db.execute(
+                "DELETE FROM mailboxes WHERE account = ? AND mailbox = ?",
+                (account, mailbox),
+            )
+
+    def reset_account(self, account: str) -> None:
+        """Forget every mailbox of an account."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM messages WHERE account = ?", (account,))
+            self._db.execute("DELETE FROM mailboxes WHERE account = ?", (account,))
+
+    def count(self, account: str, mailbox: str) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) FROM messages WHERE account = ? AND mailbox = ?",
+                (account, mailbox),
+            ).fetchone()
+        return row[0]
+
+    def max_uid(self, account: str, mailbox: str) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MAX(uid) FROM messages WHERE account = ? AND mailbox = ?",
+                (account, mailbox),
+            ).fetchone()
+        return row[0] or 0
+
+    def uids(self, account: str, mailbox: str) -> set[int]:
+        with self._lock:
+            return {
+                row[0]
+                for row in self._db.execute(
+                    "SELECT uid FROM messages WHERE account = ? AND mailbox = ?",
+                    (account, mailbox),
+                )
+            }
+
+    def delete_missing(self, account: str, mailbox: str, present: Iterable[int]) -> int:
+        """Delete stored messages whose UIDs are not in present; returns how many."""
+        present = set(present)
+        with self._lock, self._db:
+            gone = [uid for uid in self.uids(account, mailbox) if uid not in present]
+            self._db.executemany(
+                "DELETE FROM messages WHERE account = ? AND mailbox = ? AND uid = ?",
+                [(account, mailbox, uid) for uid in gone],
+            )
+        return len(gone)
+
+    def upsert_messages(
+        self,
+        account: str,
+        mailbox: str,
+        rows: Iterable[tuple[models.MessageSummary, list[str], int]],
+    ) -> None:
+        """Insert or update message summaries with their flags and MODSEQ.
+
+        A message's preview text, when present, is added to the full-text
+        index.
+        """
+        rows = list(rows)
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO messages (account, mailbox, uid, subject, sender,"
+                " subject_text, sender_text, date, date_ts, flags, is_read, size,"
+                " has_attachments, attachments, modseq)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (account, mailbox, uid) DO UPDATE SET"
+                " subject = excluded.subject, sender = excluded.sender,"
+                " subject_text = excluded.subject_text,"
+                " sender_text = excluded.sender_text,"
+                " date = excluded.date, date_ts = excluded.date_ts,"
+                " flags = excluded.flags,"
+                " is_read = excluded.is_read, size = excluded.size,"
+                " has_attachments = excluded.has_attachments,"
+                " attachments = excluded.attachments, modseq = excluded.modseq",
+                [
+                    (
+                        account,
+                        mailbox,
+                        int(message.uid),
+                        message.subject,
+                        message.sender,
+                        decode_header_text(message.subject),
+                        decode_header_text(message.sender),
+                        message.date.isoformat(),
+                        message.date.timestamp(),
+                        " ".join(flags),
+                        int("\\Seen" in flags),
+                        message.size,
+                        int(message.has_attachments),
+                        json.dumps([a.model_dump() for a in message.attachments]),
+                        modseq,
+                    )
+                    for message, flags, modseq in rows
+                ],
+            )
+            self._index_bodies(
+                account,
+                mailbox,
+                [
+                    (int(message.uid), message.preview)
+                    for message, _, _ in rows
+                    if message.preview
+                ],
+            )
+
+    def index_body(self, account: str, mailbox: str, uid: int, body: str) -> None:
+        """Replace the indexed body text of a stored message."""
+        with self._lock, self._db:
+            self._index_bodies(account, mailbox, [(uid, body)])
+
+    def _index_bodies(
+        self, account: str, mailbox: str, bodies: list[tuple[int, str]]
+    ) -> None:
+        if not self.fts_enabled or not bodies:
+            return
+        self._db.executemany(
+            "UPDATE messages_fts SET body = ? WHERE rowid ="
+            " (SELECT rowid FROM messages"
+            " WHERE account = ? AND mailbox = ? AND uid = ?)",
+            [(body, account, mailbox, uid) for uid, body in bodies],
+        )
+
+    def update_flags(
+        self, account: str, mailbox: str, changes: Iterable[tuple[int, list[str], int]]
+    ) -> None:
+        """Apply (uid, flags, modseq) changes to stored messages."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE messages SET flags = ?, is_read = ?, modseq = ?"
+                " WHERE account = ? AND mailbox = ? AND uid = ?",
+                [
+                    (
+                        " ".join(flags),
+                        int("\\Seen" in flags),
+                        modseq,
+                        account,
+                        mailbox,
+                        uid,
+                    )
+                    for uid, flags, modseq in changes
+                ],
+            )
+
+    def set_read(self, account: str, mailbox: str, uid: int, is_read: bool) -> None:
+        """Record a local read-state change until the next sync confirms it."""
+        self.set_read_ranges(account, mailbox, [(uid, uid)], is_read)
+
+    def set_read_ranges(
+        self,
+        account: str,
+        mailbox: str,
+        ranges: Iterable[tuple[int, int]],
+        is_read: bool,
+    ) -> None:
+        """Record a read-state change of the messages in inclusive UID ranges."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE messages SET is_read = ?"
+                " WHERE account = ? AND mailbox = ? AND uid BETWEEN ? AND ?",
+                [(int(is_read), account, mailbox, low, high) for low, high in ranges],
+            )
+
+    def delete_ranges(
+        self, account: str, mailbox: str, ranges: Iterable[tuple[int, int]]
+    ) -> None:
+        """Delete messages whose UIDs fall in the given inclusive ranges."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM messages"
+                " WHERE account = ? AND mailbox = ? AND uid BETWEEN ? AND ?",
+                [(account, mailbox, low, high) for low, high in ranges],
+            )
+
+    def search(
+        self,
+        account: str,
+        mailbox: str,
+        subject_filter: str | None = None,
+        sender_filter: str | None = None,
+        since: datetime | None = None,
+        before: datetime | None = None,
+        unread_only: bool = False,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> tuple[list[models.MessageSummary], int]:
+        """Return a newest-first page of matching summaries and the total match count.
+
+        Filters mirror _build_search_criteria: case-insensitive substring
+        matches on the decoded Subject/From and day-granular date bounds.
+        """
+        clauses = ["account = ?", "mailbox = ?"]
+        params: list = [account, mailbox]
+
+        if unread_only:
+            clauses.append("is_read = 0")
+        if subject_filter:
+            clauses.append("instr(lower(subject_text), lower(?)) > 0")
+            params.append(subject_filter)
+        if sender_filter:
+            clauses.append("instr(lower(sender_text), lower(?)) > 0")
+            params.append(sender_filter)
+        if since:
+            clauses.append("date_ts >= ?")
+            params.append(_day_start(since))
+        if before:
+            clauses.append("date_ts < ?")
+            params.append(_day_start(before))
+
+        where = " AND ".join(clauses)
+        query = (
+            "SELECT uid, subject, sender, date, is_read, size,"
+            " has_attachments, attachments"
+            f" FROM messages WHERE {where} ORDER BY uid DESC"
+        )
+        with self._lock:
+            total = self._db.execute(
+                f"SELECT COUNT(*) FROM messages WHERE {where}", params
+            ).fetchone()[0]
+            if limit is not None:
+                params = params + [limit, offset]
+                query += " LIMIT ? OFFSET ?"
+            rows = self._db.execute(query, params).fetchall()
+
+        return [_summary(*row) for row in rows], total
+
+    def full_text_search(
+        self, account: str, mailbox: str, query: str, limit: int = 20
+    ) -> list[models.MessageSummary]:
+        """Rank messages matching an FTS5 query, best first.
+
+        The query accepts FTS5 syntax ("exact phrase", OR, NOT, prefix*).
+        Input that is not valid FTS5 syntax is searched as plain words.
+        Each result's preview is a snippet around the match.
+        """
+        if not self.fts_enabled:
+            raise ValueError(
+                "Full-text search is unavailable: SQLite was built without FTS5"
+            )
+
+        sql = (
+            "SELECT m.uid, m.subject, m.sender, m.date, m.is_read, m.size,"
+            " m.has_attachments, m.attachments,"
+            " snippet(messages_fts, -1, '[', ']', '…', 16)"
+            " FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid"
+            " WHERE messages_fts MATCH ? AND m.account = ? AND m.mailbox = ?"
+            f" ORDER BY {_FTS_RANK} LIMIT ?"
+        )
+        with self._lock:
+            try:
+                cursor = self._db.execute(sql, (query, account, mailbox, limit))
+            except sqlite3.OperationalError:
+                quoted = _quote_fts_terms(query)
+                cursor = self._db.execute(sql, (quoted, account, mailbox, limit))
+            rows = cursor.fetchall()
+
+        return [_summary(*row) for row in rows]
+
+
+def _summary(
+    uid: int,
+    subject: str,
+    sender: str,
+    date: str,
+    is_read: int,
+    size: int,
+    has_attachments: int,
+    attachments: str,
+    preview: str | None = None,
+) -> models.MessageSummary:
+    """Build a summary from a ``messages`` row, optionally with an FTS snippet."""
+    return models.MessageSummary(
+        uid=str(uid),
+        subject=subject,
+        sender=sender,
+        date=datetime.fromisoformat(date),
+        is_read=bool(is_read),
+        has_attachments=bool(has_attachments),
+        attachments=json.loads(attachments),
+        size=size,
+        preview=preview,
+    )
+
+
+def _quote_fts_terms(query: str) -> str:
+    """Quote each word so FTS5 operators and punctuation are matched literally."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+def _day_start(value: datetime) -> float:
+    """IMAP date criteria ignore the time of day."""
+    return value.replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+
+
+_metadata_store: MetadataStore | None = None
+
+
+def get_metadata_store() -> MetadataStore | None:
+    """Return the process-wide store, or None when the store is disabled."""
+    global _metadata_store
+
+    path = os.getenv(METADATA_DB_ENV)
+    if not path:
+        return None
+    if _metadata_store is None:
+        _metadata_store = MetadataStore(Path(path).expanduser())
+    return _metadata_store
+
+
+def reset_metadata_store() -> None:
+    global _metadata_store
+    if _metadata_store is not None:
+        _metadata_store.close()
+    _metadata_store = None
@@ -1,12 +1,38 @@
 """Account management tools for Universal Email MCP Server."""
 
-from .. import config, models
+from .. import blocking, cache, config, models, pool, store
+
+
+def _build_account(data: models.AddAccountInput) -> config.EmailSettings:
+    """Account settings from the add_account input."""
+    return config.EmailSettings(
+        account_name=data.account_name,
+        full_name=data.full_name,
+        email_address=data.email_address,
+        incoming=config.EmailServer(
+            user_name=data.user_name,
+            password=data.password,
+            host=data.imap_host,
+            port=data.imap_port,
+            use_ssl=data.imap_use_ssl,
+            verify_ssl=data.imap_verify_ssl,
+            use_compression=data.imap_use_compression,
+        ),
+        outgoing=config.EmailServer(
+            user_name=data.user_name,
+            password=data.password,
+            host=data.smtp_host,
+            port=data.smtp_port,
+            use_ssl=data.smtp_use_ssl,
+            verify_ssl=data.smtp_verify_ssl,
+        ),
+    )
 
 
 async def add_account(data: models.AddAccountInput) -> models.StatusOutput:
     """Add a new email account configuration."""
     try:
-        settings = config.get_settings(reload=True)
+        settings = await config.load_settings()
 
         if settings.get_account(data.account_name):
             return models.StatusOutput(
@@ -14,30 +40,10 @@ async def add_account(data: models.AddAccountInput) -> models.StatusOutput:
                 details=f"Account '{data.account_name}' already exists. Use a different name or remove the existing account first."
             )
 
-        new_account = config.EmailSettings(
-            account_name=data.account_name,
-            full_name=data.full_name,
-            email_address=data.email_address,
-            incoming=config.EmailServer(
-                user_name=data.user_name,
-                password=data.password,
-                host=data.imap_host,
-                port=data.imap_port,
-                use_ssl=data.imap_use_ssl,
-                verify_ssl=data.imap_verify_ssl
-            ),
-            outgoing=config.EmailServer(
-                user_name=data.user_name,
-                password=data.password,
-                host=data.smtp_host,
-                port=data.smtp_port,
-                use_ssl=data.smtp_use_ssl,
-                verify_ssl=data.smtp_verify_ssl
-            )
-        )
+        new_account = _build_account(data)
 
         settings.add_account(new_account)
-        settings.store()
+        await blocking.run(settings.store)
 
         return models.StatusOutput(
             status="success",
@@ -45,18 +51,56 @@ async def add_account(data: models.AddAccountInput) -> models.StatusOutput:
         )
 
     except Exception as e:
+        # The cached settings may hold a change that never reached the disk.
+        config.reset_settings()
         return models.StatusOutput(
             status="error",
             details=f"Failed to add account: {str(e)}"
         )
 
 
+async def import_accounts(data: models.ImportAccountsInput) -> models.StatusOutput:
+    """Add or replace many accounts with a single write of the configuration."""
+    try:
+        settings = await config.load_settings()
+        new_accounts = [_build_account(item) for item in data.accounts]
+        existing = set(settings.account_names())
+        replaced = [acc for acc in new_accounts if acc.account_name in existing]
+        await blocking.run(settings.import_accounts, new_accounts)
+
+        for acc in replaced:
+            await pool.close_pool(acc.account_name)
+            cache.message_cache.invalidate_account(acc.account_name)
+
+        return models.StatusOutput(
+            status="success",
+            details=(
+                f"Imported {len(new_accounts)} accounts "
+                f"({len(new_accounts) - len(replaced)} added, "
+                f"{len(replaced)} replaced)."
+            ),
+        )
+
+    except Exception as e:
+        # The cached settings may hold changes that never reached the disk.
+        config.reset_settings()
+        return models.StatusOutput(
+            status="error", details=f"Failed to import accounts: {str(e)}"
+        )
+
+
 async def list_accounts() -> models.ListAccountsOutput:
     """List all configured email accounts."""
     try:
-        settings = config.get_settings(reload=True)
-        account_names = [acc.account_name for acc in settings.accounts]
-        return models.ListAccountsOutput(accounts=account_names)
+        settings = await config.load_settings()
+        # Names come from the plaintext index; no account record is decrypted.
+        names = settings.account_names()
+        compression = {
+            name: stats
+            for name in names
+            if (stats := pool.compression_stats(name)) is not None
+        }
+        return models.ListAccountsOutput(accounts=names, compression=compression)
     except Exception:
         return models.ListAccountsOutput(accounts=[])
 
@@ -64,7 +108,7 @@ async def list_accounts() -> models.ListAccountsOutput:
 async def remove_account(data: models.RemoveAccountInput) -> models.StatusOutput:
     """Remove an email account configuration."""
     try:
-        settings = config.get_settings(reload=True)
+        settings = await config.load_settings()
 
         if not settings.get_account(data.account_name):
             return models.StatusOutput(
@@ -74,7 +118,12 @@ async def remove_account(data: models.RemoveAccountInput) -> models.StatusOutput
 
         removed = settings.remove_account(data.account_name)
         if removed:
-            settings.store()
+            await blocking.run(settings.store)
+            await pool.close_pool(data.account_name)
+            cache.message_cache.invalidate_account(data.account_name)
+            metadata = store.get_metadata_store()
+            if metadata is not None:
+                metadata.reset_account(data.account_name)
             return models.StatusOutput(
                 status="success",
                 details=f"Account '{data.account_name}' removed successfully."
@@ -86,6 +135,8 @@ async def remove_account(data: models.RemoveAccountInput) -> models.StatusOutput
             )
 
     except Exception as e:
+        # The cached settings may hold a change that never reached the disk.
+        config.reset_settings()
         return models.StatusOutput(
             status="error",
             details=f"Failed to remove account: {str(e)}"
@@ -99,3 +150,17 @@ def get_account_settings(account_name: str) -> config.EmailSettings:
     if not account:
         raise ValueError(f"Account '{account_name}' not found")
     return account
+
+
+async def load_account_settings(account_name: str) -> config.EmailSettings:
+    """get_account_settings() for background tasks; reads changed files off the loop."""
+    await config.load_settings()
+    return get_account_settings(account_name)
+
+
+def resolve_account_names(selector: str | list[str]) -> list[str]:
+    """Expand '*' to every configured account; keep other names in order, once each."""
+    names = [selector] if isinstance(selector, str) else selector
+    if "*" in names:
+        return config.get_settings().account_names()
+    return list(dict.fromkeys(names))
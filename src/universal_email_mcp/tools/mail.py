@@ -1,132 +1,440 @@
 
 import asyncio
+import binascii
 import email
 import email.message
+import email.utils
 import logging
-import ssl
+import os
+import quopri
+import re
+import string
+from array import array
+from collections.abc import Awaitable, Callable
 from datetime import datetime
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import Optional
+from pathlib import Path
 
 import aioimaplib
 import aiosmtplib
 
-from .. import config, models
-from .account import get_account_settings
+from .. import (
+    attachments,
+    blocking,
+    cache,
+    config,
+    imap_utils,
+    models,
+    parsing,
+    pipelining,
+    pool,
+    spool,
+    store,
+)
+from .account import (
+    get_account_settings,
+    load_account_settings,
+    resolve_account_names,
+)
 
 logger = logging.getLogger(__name__)
 
+# Listings only need what handle_call_tool renders, never the message bodies.
+LISTING_FETCH_ITEMS = (
+    "UID FLAGS RFC822.SIZE BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (DATE FROM SUBJECT)]"
+)
+
+# UIDs per FETCH when filling the metadata store for a mailbox for the first time.
+SYNC_BATCH_SIZE = 1000
+
+# Extra octets fetched for previews to cover MIME boundaries and part headers.
+PREVIEW_FRAMING_OCTETS = 1024
+
+# Characters of decoded body text fetched per message for the full-text index
+# while syncing the metadata store. Off by default (0 indexes subjects and
+# senders only), since it adds a body fetch to every synced message.
+INDEX_BODY_CHARS = int(os.getenv("UNIVERSAL_EMAIL_MCP_INDEX_BODY_CHARS", "0"))
+
+# Accounts queried at once by multi-account tool calls, across all such calls.
+ACCOUNT_CONCURRENCY = int(os.getenv("UNIVERSAL_EMAIL_MCP_ACCOUNT_CONCURRENCY", "4"))
+
+_account_limit: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+# UID STORE data items for mark_messages actions.
+STORE_ACTIONS = {
+    "add": "+FLAGS.SILENT",
+    "remove": "-FLAGS.SILENT",
+    "replace": "FLAGS.SILENT",
+}
+
+# A system flag (\Seen) or keyword; atoms exclude list, quote and wildcard characters.
+_FLAG_RE = re.compile(r'^\\?[^\s(){%*"\\\]]+$')
+
+
+def _extract_preview(partial_text: bytes, structure, limit: int) -> str:
+    """Decode the start of a message's TEXT section into a short plain-text preview.
+
+    Multipart framing (boundaries and part headers) is skipped until the first
+    leaf part, whose transfer encoding and charset come from BODYSTRUCTURE.
+    """
+    part = imap_utils.first_leaf_part(structure)
+    if part is None or str(part[0]).upper() != "TEXT":
+        return ""
+
+    content = partial_text
+    if structure and isinstance(structure[0], list):
+        while True:
+            boundary = content.find(b"--")
+            headers_end = content.find(b"\r\n\r\n", boundary)
+            if boundary < 0 or headers_end < 0:
+                return ""
+            part_headers = content[boundary:headers_end].lower()
+            content = content[headers_end + 4 :]
+            if b"content-type: multipart/" not in part_headers:
+                break
+        next_boundary = content.find(b"\r\n--")
+        if next_boundary >= 0:
+            content = content[:next_boundary]
+
+    encoding, charset = imap_utils.part_encoding(part)
+    if encoding == "base64":
+        compact = b"".join(content.split())
+        content = binascii.a2b_base64(compact[: len(compact) // 4 * 4])
+    elif encoding == "quoted-printable":
+        content = quopri.decodestring(content)
+
+    try:
+        text = content.decode(charset, errors="replace")
+    except LookupError:
+        text = content.decode("utf-8", errors="replace")
+
+    if str(part[1]).upper() == "HTML":
+        text = re.sub(r"<[^>]*>", " ", text)
+
+    return " ".join(text.split())[:limit]
+
+
+def _modseq(fetch_item: dict) -> int:
+    """The MODSEQ of a FETCH item, reported as a one-element list."""
+    value = fetch_item.get("MODSEQ")
+    if isinstance(value, list) and value:
+        return int(value[0])
+    return 0
+
+
+def _find_attachment(structure, attachment: str | None) -> imap_utils.BodyPart:
+    """Pick an attachment part by section number or file name, or the first one."""
+    parts = imap_utils.parse_bodystructure(structure)
+    candidates = [part for part in parts if part.is_attachment]
+    if attachment is None:
+        if not candidates:
+            raise ValueError("Message has no attachments")
+        return candidates[0]
+
+    for part in parts:
+        if part.section == attachment:
+            return part
+    for part in candidates:
+        if part.filename == attachment:
+            return part
+    raise ValueError(f"No attachment '{attachment}' in message")
+
+
+def _attachment_info(parts: list[imap_utils.BodyPart]) -> list[models.AttachmentInfo]:
+    return [
+        models.AttachmentInfo(
+            section=part.section,
+            filename=part.filename,
+            content_type=part.content_type,
+            size=part.decoded_size,
+        )
+        for part in parts
+        if part.is_attachment
+    ]
+
+
+async def esearch(imap: aioimaplib.IMAP4, criteria: str, return_options: str) -> dict:
+    """UID SEARCH RETURN (...) (RFC 4731); only the requested result data is sent."""
+    # aioimaplib files untagged replies by name, so the command must expect ESEARCH.
+    command = aioimaplib.Command(
+        "SEARCH",
+        imap.protocol.new_tag(),
+        "RETURN",
+        f"({return_options})",
+        "CHARSET",
+        "utf-8",
+        criteria,
+        prefix="UID",
+        untagged_resp_name="ESEARCH",
+        loop=imap.protocol.loop,
+    )
+    response = await asyncio.wait_for(imap.protocol.execute(command), imap.timeout)
+    if response.result != "OK":
+        raise ValueError(f"Search failed: {criteria}")
+    return imap_utils.parse_esearch_response(response.lines)
+
+
+async def search_uids(imap: aioimaplib.IMAP4, criteria: str) -> array:
+    """All UIDs matching criteria in ascending order, as a compact array."""
+    if imap.has_capability("ESEARCH"):
+        # RETURN (ALL) answers with ranges such as 1:5000 instead of every UID.
+        result = await esearch(imap, criteria, "ALL")
+        return imap_utils.expand_message_set(result.get("ALL"))
+
+    response = await imap.uid_search(criteria)
+    if response.result != "OK":
+        raise ValueError(f"Search failed: {criteria}")
+    return imap_utils.parse_uid_list(response.lines[0])
+
 
 class EmailClient:
 
     def __init__(self, account_settings: config.EmailSettings):
         self.account_settings = account_settings
-        self._imap_client: Optional[aioimaplib.IMAP4_SSL] = None
-        self._smtp_client: Optional[aiosmtplib.SMTP] = None
+        self._imap_pool: pool.IMAPConnectionPool | None = None
+        self._imap_client: pool.PooledIMAPConnection | None = None
+        self._smtp_pool: pool.SMTPConnectionPool | None = None
+        self._smtp_client: pool.PooledSMTPConnection | None = None
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.close()
+        # A connection that saw an exception may be mid-command; don't reuse it.
+        await self.close(discard_imap=exc_type is not None)
 
-    async def close(self):
-        """Close all connections."""
+    async def close(self, discard_imap: bool = False):
+        """Return the IMAP and SMTP connections to their pools."""
         if self._imap_client:
-            try:
-                await self._imap_client.logout()
-            except Exception:
-                pass
+            await self._imap_pool.release(self._imap_client, discard=discard_imap)
             self._imap_client = None
+            self._imap_pool = None
 
         if self._smtp_client:
-            try:
-                await self._smtp_client.quit()
-            except Exception:
-                pass
-            self._smtp_client = None
+            await self._release_smtp(discard=discard_imap)
 
-    async def _get_imap_client(self):
-        """Get or create IMAP client connection."""
+    async def _get_imap_client(self, mailbox: str | None = None):
+        """Borrow an IMAP connection, preferring one that has mailbox selected."""
         if self._imap_client is None:
-            incoming = self.account_settings.incoming
-
-            ssl_context = None
-            if incoming.use_ssl:
-                ssl_context = ssl.create_default_context()
-                if not incoming.verify_ssl:
-                    import warnings
-                    warnings.warn(
-                        f"SSL verification disabled for {incoming.host}. "
-                        "This is insecure and should only be used for testing.",
-                        category=UserWarning,
-                        stacklevel=2
-                    )
-                    ssl_context = ssl.create_default_context()
-                    ssl_context.check_hostname = False
-                    ssl_context.verify_mode = ssl.CERT_NONE
-
-            if incoming.use_ssl:
-                self._imap_client = aioimaplib.IMAP4_SSL(
-                    host=incoming.host,
-                    port=incoming.port,
-                    ssl_context=ssl_context
-                )
-            else:
-                self._imap_client = aioimaplib.IMAP4(
-                    host=incoming.host,
-                    port=incoming.port
-                )
+            self._imap_pool = pool.get_imap_pool(self.account_settings)
+            self._imap_client = await self._imap_pool.acquire(mailbox)
 
-            await self._imap_client.wait_hello_from_server()
-            await self._imap_client.login(incoming.user_name, incoming.password)
-
-        return self._imap_client
+        return self._imap_client.client
 
     async def _get_smtp_client(self) -> aiosmtplib.SMTP:
-        """Get or create SMTP client connection."""
+        """Borrow an authenticated SMTP session from the account's pool."""
         if self._smtp_client is None:
-            outgoing = self.account_settings.outgoing
-
-            ssl_context = None
-            ssl_context = ssl.create_default_context()
-            if not outgoing.verify_ssl:
-                import warnings
-                warnings.warn(
-                    f"SSL verification disabled for {outgoing.host}. "
-                    "This is insecure and should only be used for testing.",
-                    category=UserWarning,
-                    stacklevel=2
+            self._smtp_pool = pool.get_smtp_pool(self.account_settings)
+            self._smtp_client = await self._smtp_pool.acquire()
+
+        return self._smtp_client.client
+
+    async def _release_smtp(self, discard: bool = False) -> None:
+        smtp_pool, conn = self._smtp_pool, self._smtp_client
+        self._smtp_pool = self._smtp_client = None
+        await smtp_pool.release(conn, discard=discard)
+
+    async def _reset_smtp(self) -> None:
+        """RSET the borrowed session after a refused message, dropping it on failure."""
+        if self._smtp_client is not None and not await self._smtp_client.reset():
+            await self._release_smtp(discard=True)
+
+    async def _select(
+        self, mailbox: str, modifier: str = "", readonly: bool = False
+    ) -> dict:
+        """Open a mailbox and return its parsed state, recording UIDVALIDITY.
+
+        Read-only callers use EXAMINE. The command is skipped when this
+        connection already has the mailbox open in a suitable mode, unless a
+        modifier such as (CONDSTORE) asks for fresh state.
+        """
+        imap = await self._get_imap_client(mailbox)
+        conn = self._imap_client
+        if (
+            conn is not None
+            and not modifier
+            and conn.selected_mailbox == mailbox
+            and (readonly or not conn.read_only)
+        ):
+            return conn.select_info
+
+        argument = f"{mailbox} {modifier}" if modifier else mailbox
+        response = await (imap.examine(argument) if readonly else imap.select(argument))
+        if response.result != "OK":
+            # A failed SELECT/EXAMINE leaves no mailbox selected (RFC 3501).
+            if conn is not None:
+                conn.selected_mailbox = None
+            raise ValueError(f"Cannot select mailbox '{mailbox}'")
+        if readonly:
+            # aioimaplib only tracks the SELECTED state for its own select().
+            imap.protocol.state = aioimaplib.SELECTED
+
+        info = imap_utils.parse_select_response(response.lines)
+        uidvalidity = info.get("UIDVALIDITY")
+        if uidvalidity is not None:
+            cache.message_cache.set_uidvalidity(
+                self.account_settings.account_name, mailbox, uidvalidity
+            )
+        if conn is not None:
+            conn.selected_mailbox = mailbox
+            conn.read_only = readonly
+            conn.select_info = info
+        return info
+
+    def highest_modseq(self, mailbox: str) -> int | None:
+        """HIGHESTMODSEQ reported when this client last opened the mailbox.
+
+        Listings return it so that a later mark_messages can pass it as
+        unchanged_since and skip messages changed since they were listed.
+        """
+        conn = self._imap_client
+        if conn is None or conn.selected_mailbox != mailbox:
+            return None
+        return conn.select_info.get("HIGHESTMODSEQ")
+
+    async def _sync_mailbox(self, metadata: store.MetadataStore, mailbox: str) -> bool:
+        """Bring the metadata store up to date for a mailbox and leave it selected.
+
+        Uses QRESYNC when available, otherwise CONDSTORE's CHANGEDSINCE, so only
+        flag changes, expunges and new messages since the last sync cross the
+        wire. Returns False when the server or mailbox has no MODSEQ support;
+        callers then query the server directly.
+        """
+        imap = await self._get_imap_client(mailbox)
+        if not (imap.has_capability("CONDSTORE") or imap.has_capability("QRESYNC")):
+            await self._select(mailbox, readonly=True)
+            return False
+
+        account_name = self.account_settings.account_name
+        state = await blocking.run(metadata.get_state, account_name, mailbox)
+        use_qresync = state is not None and imap.has_capability("QRESYNC")
+
+        if use_qresync:
+            info = await self._select(
+                mailbox,
+                f"(QRESYNC ({state.uidvalidity} {state.highestmodseq}))",
+                readonly=True,
+            )
+        else:
+            info = await self._select(mailbox, "(CONDSTORE)", readonly=True)
+
+        uidvalidity = info.get("UIDVALIDITY")
+        highestmodseq = info.get("HIGHESTMODSEQ")
+        if uidvalidity is None or highestmodseq is None:
+            return False
+
+        if state is not None and state.uidvalidity != uidvalidity:
+            logger.info(f"UIDVALIDITY changed for {account_name}/{mailbox}; resyncing")
+            await blocking.run(metadata.reset_mailbox, account_name, mailbox)
+            state = None
+            use_qresync = False
+
+        if state is None:
+            await self._sync_all_messages(metadata, mailbox)
+        elif state.highestmodseq != highestmodseq or info.get("EXISTS") != (
+            await blocking.run(metadata.count, account_name, mailbox)
+        ):
+            if use_qresync:
+                await blocking.run(
+                    metadata.delete_ranges, account_name, mailbox, info["VANISHED"]
+                )
+                changes = info["FETCH"]
+            else:
+                response = await imap.uid(
+                    "fetch", "1:*", f"(UID FLAGS) (CHANGEDSINCE {state.highestmodseq})"
+                )
+                changes = (
+                    imap_utils.parse_fetch_response(response.lines)
+                    if response.result == "OK"
+                    else []
                 )
-                ssl_context = ssl.create_default_context()
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
 
-            smtp_kwargs = {
-                "hostname": outgoing.host,
-                "port": outgoing.port,
-            }
+            known_max = await blocking.run(metadata.max_uid, account_name, mailbox)
+            await blocking.run(
+                metadata.update_flags,
+                account_name,
+                mailbox,
+                [
+                    (int(item["UID"]), item.get("FLAGS") or [], _modseq(item))
+                    for item in changes
+                    if "UID" in item and int(item["UID"]) <= known_max
+                ],
+            )
 
-            if outgoing.use_ssl:
-                smtp_kwargs["use_tls"] = True
-                smtp_kwargs["tls_context"] = ssl_context
-            else:
-                smtp_kwargs["use_tls"] = False
-                smtp_kwargs["start_tls"] = True
-                smtp_kwargs["tls_context"] = ssl_context
+            uidnext = info.get("UIDNEXT")
+            if uidnext is None or uidnext > known_max + 1:
+                await self._store_summaries(
+                    metadata, mailbox, f"{known_max + 1}:*", known_max + 1
+                )
 
-            self._smtp_client = aiosmtplib.SMTP(**smtp_kwargs)
+            if not use_qresync and info.get("EXISTS") != await blocking.run(
+                metadata.count, account_name, mailbox
+            ):
+                await self._reconcile_expunged(metadata, mailbox)
 
-            await self._smtp_client.connect()
-            await self._smtp_client.login(outgoing.user_name, outgoing.password)
+        await blocking.run(
+            metadata.set_state,
+            account_name,
+            mailbox,
+            store.MailboxState(uidvalidity, highestmodseq, info.get("UIDNEXT")),
+        )
+        return True
+
+    async def sync_mailbox(self, mailbox: str = "INBOX") -> bool:
+        """Sync a mailbox into the metadata store; False if the store is unusable."""
+        metadata = store.get_metadata_store()
+        if metadata is None:
+            return False
+        return await self._sync_mailbox(metadata, mailbox)
+
+    async def _sync_all_messages(
+        self, metadata: store.MetadataStore, mailbox: str
+    ) -> None:
+        """Initial sync: fetch summaries for every message in batches."""
+        uids = await self._search_uids("ALL")
+        for start in range(0, len(uids), SYNC_BATCH_SIZE):
+            batch = uids[start : start + SYNC_BATCH_SIZE]
+            await self._store_summaries(
+                metadata, mailbox, imap_utils.format_message_set(batch)
+            )
 
-        return self._smtp_client
+    async def _store_summaries(
+        self,
+        metadata: store.MetadataStore,
+        mailbox: str,
+        uid_set: str,
+        min_uid: int = 0,
+    ) -> None:
+        """Fetch summaries for a UID set into the store, skipping UIDs below min_uid."""
+        fetched = await self._fetch_summaries(
+            uid_set, INDEX_BODY_CHARS, extra_items="MODSEQ"
+        )
+        await blocking.run(
+            metadata.upsert_messages,
+            self.account_settings.account_name,
+            mailbox,
+            [
+                (message, fetch_item.get("FLAGS") or [], _modseq(fetch_item))
+                for message, fetch_item in fetched
+                # "n:*" always matches the highest UID, even when it is below n.
+                if int(message.uid) >= min_uid
+            ],
+        )
+
+    async def _reconcile_expunged(
+        self, metadata: store.MetadataStore, mailbox: str
+    ) -> None:
+        """Without QRESYNC, expunges are found by comparing the full UID list."""
+        account_name = self.account_settings.account_name
+        server_uids = await self._search_uids("ALL")
+        # Comparing hundreds of thousands of UIDs is done in the I/O threads.
+        await blocking.run(metadata.delete_missing, account_name, mailbox, server_uids)
 
     async def list_mailboxes(self) -> list[str]:
         """List available mailboxes."""
         imap = await self._get_imap_client()
-        response = await imap.list()
+        response = await imap.list('""', "*")
 
         mailboxes = []
         for line in response.lines:
@@ -139,14 +447,33 @@ class EmailClient:
 
     async def get_message_count(self, mailbox: str = "INBOX", search_criteria: str = "ALL") -> int:
         """Get count of messages matching criteria."""
-        imap = await self._get_imap_client()
-        await imap.select(mailbox)
+        metadata = store.get_metadata_store()
+        if (
+            metadata is not None
+            and search_criteria in ("ALL", "UNSEEN")
+            and await self._sync_mailbox(metadata, mailbox)
+        ):
+            _, total = await blocking.run(
+                metadata.search,
+                self.account_settings.account_name,
+                mailbox,
+                unread_only=search_criteria == "UNSEEN",
+                limit=0,
+            )
+            return total
 
-        response = await imap.search(search_criteria)
-        if response.result == "OK":
-            message_ids = response.lines[0].decode().split()
-            return len(message_ids)
-        return 0
+        imap = await self._get_imap_client(mailbox)
+        await self._select(mailbox, readonly=True)
+
+        if imap.has_capability("ESEARCH"):
+            return (await self._esearch(search_criteria, "COUNT")).get("COUNT", 0)
+        return len(await self._search_uids(search_criteria))
+
+    async def _esearch(self, criteria: str, return_options: str) -> dict:
+        return await esearch(await self._get_imap_client(), criteria, return_options)
+
+    async def _search_uids(self, criteria: str) -> array:
+        return await search_uids(await self._get_imap_client(), criteria)
 
     def _build_search_criteria(
         self,
@@ -185,130 +512,554 @@ class EmailClient:
         sender_filter: str | None = None,
         since: datetime | None = None,
         before: datetime | None = None,
-        unread_only: bool = False
-    ) -> tuple[list[models.EmailMessage], int]:
-        """Get paginated list of messages."""
-        imap = await self._get_imap_client()
-        await imap.select(mailbox)
+        unread_only: bool = False,
+        preview_chars: int = 0,
+    ) -> tuple[list[models.MessageSummary], int]:
+        """Get a paginated list of message summaries without downloading bodies."""
+        metadata = store.get_metadata_store()
+        if metadata is not None and await self._sync_mailbox(metadata, mailbox):
+            messages, total_count = await blocking.run(
+                metadata.search,
+                self.account_settings.account_name,
+                mailbox,
+                subject_filter,
+                sender_filter,
+                since,
+                before,
+                unread_only,
+                limit=page_size,
+                offset=(page - 1) * page_size,
+            )
+            if preview_chars and messages:
+                fetched = {
+                    message.uid: message
+                    for message, _ in await self._fetch_summaries(
+                        imap_utils.format_message_set(m.uid for m in messages),
+                        preview_chars,
+                    )
+                }
+                messages = [fetched.get(m.uid, m) for m in messages]
+            return self._with_body_loaders(messages, mailbox), total_count
+
+        imap = await self._get_imap_client(mailbox)
+        # CONDSTORE servers only report HIGHESTMODSEQ once asked to; without
+        # it this is a no-op when the sync attempt above opened the mailbox.
+        condstore = "(CONDSTORE)" if imap.has_capability("CONDSTORE") else ""
+        await self._select(mailbox, modifier=condstore, readonly=True)
 
         search_criteria = self._build_search_criteria(
             subject_filter, sender_filter, since, before, unread_only
         )
-
-        response = await imap.search(search_criteria)
-        if response.result != "OK":
-            return [], 0
-
-        message_ids = response.lines[0].decode().split()
-        total_count = len(message_ids)
-
-        if not message_ids:
-            return [], 0
-
         start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
 
-        page_message_ids = list(reversed(message_ids))[start_idx:end_idx]
+        if imap.has_capability("ESEARCH") and imap.has_capability("PARTIAL"):
+            # Negative PARTIAL ranges (RFC 9394) count from the newest match.
+            result = await self._esearch(
+                search_criteria,
+                f"COUNT PARTIAL -{start_idx + 1}:-{start_idx + page_size}",
+            )
+            total_count = result.get("COUNT", 0)
+            page_uids = imap_utils.expand_message_set(result.get("PARTIAL"))[::-1]
+        else:
+            uids = await self._search_uids(search_criteria)
+            total_count = len(uids)
+            end_idx = total_count - start_idx
+            page_uids = uids[max(end_idx - page_size, 0) : max(end_idx, 0)][::-1]
+
+        if not page_uids:
+            return [], total_count
+
+        page_message_ids = [str(uid) for uid in page_uids]
+        parsed = {
+            message.uid: message
+            for message, _ in await self._fetch_summaries(
+                imap_utils.format_message_set(page_message_ids), preview_chars
+            )
+        }
+
+        # The server answers in mailbox order; keep the page's newest-first order.
+        messages = [parsed[msg_id] for msg_id in page_message_ids if msg_id in parsed]
+
+        return self._with_body_loaders(messages, mailbox), total_count
+
+    def _with_body_loaders(
+        self, messages: list[models.MessageSummary], mailbox: str
+    ) -> list[models.MessageSummary]:
+        """Let listed summaries fetch their body on first load_body()."""
+        for message in messages:
+            message.set_body_loader(self._body_loader(mailbox, message.uid))
+        return messages
+
+    def _body_loader(self, mailbox: str, uid: str):
+        """Resolve one body from the message cache or with a single-UID FETCH.
+
+        Listings outlive the client that produced them, so the loader borrows
+        its own pooled connection.
+        """
+        account_settings = self.account_settings
+
+        async def load() -> str:
+            async with EmailClient(account_settings) as client:
+                message = await client.get_message_by_uid(uid, mailbox)
+            if message is None:
+                raise ValueError(f"Message with UID {uid} not found")
+            return message.body
+
+        return load
+
+    async def _fetch_summaries(
+        self, uid_set: str, preview_chars: int = 0, extra_items: str = ""
+    ) -> list[tuple[models.MessageSummary, dict]]:
+        """UID FETCH listing items for a UID set; returns (summary, raw items) pairs."""
+        imap = await self._get_imap_client()
 
-        messages = []
-        for msg_id in page_message_ids:
-            try:
-                fetch_response = await imap.fetch(
-                    msg_id, "(UID RFC822.HEADER RFC822.TEXT FLAGS)"
-                )
+        fetch_items = LISTING_FETCH_ITEMS
+        if extra_items:
+            fetch_items += f" {extra_items}"
+        if preview_chars:
+            fetch_items += (
+                f" BODY.PEEK[TEXT]<0.{preview_chars + PREVIEW_FRAMING_OCTETS}>"
+            )
 
-                if fetch_response.result == "OK":
-                    message = self._parse_message(fetch_response.lines, msg_id)
-                    if message:
-                        messages.append(message)
+        fetch_response = await imap.uid("fetch", uid_set, f"({fetch_items})")
+        if fetch_response.result != "OK":
+            return []
 
-            except Exception:
+        summaries = []
+        for fetch_item in imap_utils.parse_fetch_response(fetch_response.lines):
+            if "UID" not in fetch_item:
                 continue
-
-        return messages, total_count
-
-    def _parse_message(self, fetch_lines: list[bytes], msg_id: str) -> models.EmailMessage | None:
-        """Parse IMAP fetch response into EmailMessage."""
+            message = self._parse_summary(fetch_item, fetch_item["UID"], preview_chars)
+            if message:
+                summaries.append((message, fetch_item))
+        return summaries
+
+    def _parse_summary(
+        self, fetch_item: dict, msg_id: str, preview_chars: int = 0
+    ) -> models.MessageSummary | None:
+        """Parse a header-only FETCH into a MessageSummary."""
         try:
-            raw_message = b"\r\n".join(fetch_lines)
-            msg = email.message_from_bytes(raw_message)
-
-            subject = msg.get("Subject", "")
-            sender = msg.get("From", "")
-            date_str = msg.get("Date", "")
+            headers = imap_utils.as_bytes(
+                imap_utils.find_item(fetch_item, "BODY[HEADER.FIELDS")
+            )
+            msg = email.message_from_bytes(headers)
 
             try:
-                date = email.utils.parsedate_to_datetime(date_str)
+                date = email.utils.parsedate_to_datetime(msg.get("Date", ""))
             except (ValueError, TypeError):
                 date = datetime.now()
 
-            body = ""
-            if msg.is_multipart():
-                for part in msg.walk():
-                    if part.get_content_type() == "text/plain":
-                        payload = part.get_payload(decode=True)
-                        if payload:
-                            body = payload.decode("utf-8", errors="ignore")
-                            break
-            else:
-                payload = msg.get_payload(decode=True)
-                if payload:
-                    body = payload.decode("utf-8", errors="ignore")
+            structure = fetch_item.get("BODYSTRUCTURE")
+            attachment_list = _attachment_info(
+                imap_utils.parse_bodystructure(structure)
+            )
+            preview = None
+            if preview_chars:
+                partial = imap_utils.find_item(fetch_item, "BODY[TEXT]")
+                preview = _extract_preview(
+                    imap_utils.as_bytes(partial), structure, preview_chars
+                )
 
-            is_read = "\\Seen" in str(fetch_lines)
-            has_attachments = msg.get_content_maintype() == "multipart"
+            size = fetch_item.get("RFC822.SIZE")
 
-            return models.EmailMessage(
+            return models.MessageSummary(
                 uid=msg_id,
-                subject=subject,
-                sender=sender,
-                body=body,
+                subject=msg.get("Subject", ""),
+                sender=msg.get("From", ""),
                 date=date,
-                is_read=is_read,
-                has_attachments=has_attachments
+                is_read="\\Seen" in (fetch_item.get("FLAGS") or []),
+                has_attachments=bool(attachment_list),
+                attachments=attachment_list,
+                size=int(size) if size is not None else None,
+                preview=preview,
+            )
+
+        except Exception as e:
+            logger.error(f"Error parsing message summary: {e}")
+            return None
+
+    async def _parse_message(
+        self, fetch_item: dict, msg_id: str
+    ) -> models.EmailMessage | None:
+        """Parse one message's FETCH data items into EmailMessage."""
+        try:
+            raw_message = imap_utils.as_bytes(fetch_item.get("BODY[]"))
+            fields = await parsing.parse_message(raw_message)
+
+            return models.EmailMessage(
+                uid=msg_id,
+                is_read="\\Seen" in (fetch_item.get("FLAGS") or []),
+                size=len(raw_message),
+                **fields,
             )
 
         except Exception as e:
             logger.error(f"Error parsing message: {e}")
             return None
 
-    async def get_message_by_uid(self, uid: str, mailbox: str = "INBOX") -> models.EmailMessage | None:
-        """Get a specific message by UID."""
-        imap = await self._get_imap_client()
-        await imap.select(mailbox)
+    async def search_messages(
+        self, query: str, mailbox: str = "INBOX", limit: int = 20
+    ) -> list[models.MessageSummary]:
+        """Full-text search of a mailbox through the local FTS5 index."""
+        metadata = store.get_metadata_store()
+        if metadata is None:
+            raise ValueError(
+                f"Full-text search requires {store.METADATA_DB_ENV}"
+                " to point to a metadata database"
+            )
+        if not await self._sync_mailbox(metadata, mailbox):
+            raise ValueError(
+                f"Mailbox '{mailbox}' cannot be indexed:"
+                " the server does not support CONDSTORE"
+            )
+        account_name = self.account_settings.account_name
+        messages = await blocking.run(
+            metadata.full_text_search, account_name, mailbox, query, limit
+        )
+        return self._with_body_loaders(messages, mailbox)
+
+    async def get_message_by_uid(
+        self, uid: str, mailbox: str = "INBOX"
+    ) -> models.EmailMessage | None:
+        """Get a specific message by UID, from the message cache when possible."""
+        account_name = self.account_settings.account_name
+        uidvalidity = cache.message_cache.uidvalidity(account_name, mailbox)
+        if uidvalidity is not None:
+            cached = cache.message_cache.get(account_name, mailbox, uidvalidity, uid)
+            if cached is not None:
+                return cached
+
+        imap = await self._get_imap_client(mailbox)
+        uidvalidity = (await self._select(mailbox, readonly=True)).get("UIDVALIDITY")
 
         try:
-            fetch_response = await imap.fetch(uid, "(UID RFC822.HEADER RFC822.TEXT FLAGS)")
+            # BODY.PEEK leaves \Seen alone; get_message marks read explicitly.
+            fetch_response = await imap.uid("fetch", uid, "(UID FLAGS BODY.PEEK[])")
             if fetch_response.result == "OK":
-                return self._parse_message(fetch_response.lines, uid)
+                for fetch_item in imap_utils.parse_fetch_response(fetch_response.lines):
+                    if fetch_item.get("UID") != uid:
+                        continue
+                    message = await self._parse_message(fetch_item, uid)
+                    if message and uidvalidity is not None:
+                        cache.message_cache.put(
+                            account_name, mailbox, uidvalidity, message
+                        )
+                    metadata = store.get_metadata_store()
+                    if message and metadata is not None:
+                        await blocking.run(
+                            metadata.index_body,
+                            account_name,
+                            mailbox,
+                            int(uid),
+                            message.body,
+                        )
+                    return message
         except Exception as e:
             logger.error(f"Error getting message by UID: {e}")
 
         return None
 
+    async def download_attachment(
+        self,
+        uid: str,
+        mailbox: str = "INBOX",
+        attachment: str | None = None,
+        directory: Path | None = None,
+    ) -> models.DownloadAttachmentOutput:
+        """Stream one attachment to a file in ranged chunks, resuming earlier attempts.
+
+        attachment is a section number such as "2" or "1.3" or a file name;
+        the first attachment is used when it is omitted. Only one chunk of
+        the encoded part is held in memory at a time.
+        """
+        imap = await self._get_imap_client(mailbox)
+        uidvalidity = (await self._select(mailbox, readonly=True)).get("UIDVALIDITY")
+
+        response = await imap.uid("fetch", uid, "(UID BODYSTRUCTURE)")
+        structure = None
+        if response.result == "OK":
+            for fetch_item in imap_utils.parse_fetch_response(response.lines):
+                if fetch_item.get("UID") == uid:
+                    structure = fetch_item.get("BODYSTRUCTURE")
+        if structure is None:
+            raise ValueError(f"Message with UID {uid} not found")
+
+        part = _find_attachment(structure, attachment)
+        section = part.section
+        filename = attachments.safe_filename(part.filename, f"{uid}-{section}")
+
+        download = attachments.ResumableDownload(
+            (directory or attachments.DOWNLOAD_DIR) / filename,
+            key={
+                "account": self.account_settings.account_name,
+                "mailbox": mailbox,
+                "uidvalidity": uidvalidity,
+                "uid": uid,
+                "section": section,
+            },
+        )
+        # The partial file and its state are written from the blocking I/O threads.
+        await blocking.run(download.open)
+        try:
+            decoder = attachments.make_decoder(part.encoding, download.carry)
+            chunk_size = attachments.ATTACHMENT_CHUNK_BYTES
+            while True:
+                response = await imap.uid(
+                    "fetch",
+                    uid,
+                    f"(BODY.PEEK[{section}]<{download.offset}.{chunk_size}>)",
+                )
+                if response.result != "OK":
+                    raise ValueError(f"Failed to fetch part {section} of UID {uid}")
+                chunk = b""
+                for fetch_item in imap_utils.parse_fetch_response(response.lines):
+                    chunk = imap_utils.as_bytes(
+                        imap_utils.find_item(fetch_item, f"BODY[{section}]")
+                    )
+                await blocking.run(
+                    download.write,
+                    decoder.feed(chunk),
+                    download.offset + len(chunk),
+                    decoder.carry,
+                )
+                if len(chunk) < chunk_size:
+                    break
+            await blocking.run(download.write, decoder.flush(), download.offset, b"")
+            size = await blocking.run(download.complete)
+        finally:
+            await blocking.run(download.close)
+
+        return models.DownloadAttachmentOutput(
+            account_name=self.account_settings.account_name,
+            message_uid=uid,
+            section=section,
+            filename=filename,
+            content_type=part.content_type,
+            path=str(download.path),
+            size=size,
+            resumed=download.resumed,
+        )
+
+    async def get_messages_by_uid(
+        self,
+        uids: list[str],
+        mailbox: str = "INBOX",
+        max_total_bytes: int | None = None,
+        on_message: Callable[[models.EmailMessage], Awaitable[None]] | None = None,
+    ) -> tuple[list[models.EmailMessage], list[str]]:
+        """Get several messages with one UID FETCH, serving cached ones locally.
+
+        With max_total_bytes, sizes are looked up first and messages that
+        would exceed the budget are skipped rather than downloaded. Each
+        message is passed to on_message as soon as it is parsed. Returns the
+        messages in request order and the UIDs skipped for the budget.
+        """
+        uids = list(dict.fromkeys(str(uid) for uid in uids))
+        for uid in uids:
+            if not uid.isdigit():
+                raise ValueError(f"Invalid UID: '{uid}'")
+
+        account_name = self.account_settings.account_name
+        found: dict[str, models.EmailMessage] = {}
+        skipped: list[str] = []
+        remaining = max_total_bytes
+
+        async def deliver(message: models.EmailMessage) -> None:
+            found[message.uid] = message
+            if on_message is not None:
+                await on_message(message)
+
+        uidvalidity = cache.message_cache.uidvalidity(account_name, mailbox)
+        if uidvalidity is not None:
+            for uid in uids:
+                cached = cache.message_cache.get(
+                    account_name, mailbox, uidvalidity, uid
+                )
+                if cached is None:
+                    continue
+                size = cached.size or cache.estimate_size(cached)
+                if remaining is not None:
+                    if size > remaining:
+                        skipped.append(uid)
+                        continue
+                    remaining -= size
+                await deliver(cached)
+
+        wanted = [uid for uid in uids if uid not in found and uid not in skipped]
+        if wanted:
+            imap = await self._get_imap_client(mailbox)
+            info = await self._select(mailbox, readonly=True)
+            uidvalidity = info.get("UIDVALIDITY")
+
+            if remaining is not None:
+                sizes = await self._fetch_sizes(imap_utils.format_message_set(wanted))
+                fitting = []
+                for uid in wanted:
+                    size = sizes.get(uid)
+                    if size is None:
+                        continue
+                    if size > remaining:
+                        skipped.append(uid)
+                        continue
+                    remaining -= size
+                    fitting.append(uid)
+                wanted = fitting
+
+        if wanted:
+            imap = await self._get_imap_client(mailbox)
+            # BODY.PEEK leaves \Seen alone, as in get_message_by_uid.
+            response = await imap.uid(
+                "fetch",
+                imap_utils.format_message_set(wanted),
+                "(UID FLAGS BODY.PEEK[])",
+            )
+            if response.result != "OK":
+                raise ValueError(
+                    f"Failed to fetch UIDs {imap_utils.format_message_set(wanted)}"
+                )
+
+            items = {
+                item["UID"]: item
+                for item in imap_utils.parse_fetch_response(response.lines)
+                if item.get("UID") in wanted
+            }
+            del response
+            parses = [
+                asyncio.create_task(self._parse_message(item, uid))
+                for uid, item in items.items()
+            ]
+            items.clear()
+
+            metadata = store.get_metadata_store()
+            for parse in asyncio.as_completed(parses):
+                message = await parse
+                if message is None:
+                    continue
+                if uidvalidity is not None:
+                    cache.message_cache.put(account_name, mailbox, uidvalidity, message)
+                if metadata is not None:
+                    await blocking.run(
+                        metadata.index_body,
+                        account_name,
+                        mailbox,
+                        int(message.uid),
+                        message.body,
+                    )
+                await deliver(message)
+
+        return [found[uid] for uid in uids if uid in found], skipped
+
+    async def _fetch_sizes(self, uid_set: str) -> dict[str, int]:
+        """RFC822.SIZE of each message in a UID set."""
+        imap = await self._get_imap_client()
+        response = await imap.uid("fetch", uid_set, "(UID RFC822.SIZE)")
+        if response.result != "OK":
+            raise ValueError(f"Failed to fetch sizes of UIDs {uid_set}")
+        return {
+            item["UID"]: int(item["RFC822.SIZE"])
+            for item in imap_utils.parse_fetch_response(response.lines)
+            if "UID" in item and "RFC822.SIZE" in item
+        }
+
     async def mark_message(self, uid: str, mark_as_read: bool, mailbox: str = "INBOX"):
         """Mark a message as read or unread."""
-        imap = await self._get_imap_client()
-        await imap.select(mailbox)
+        imap = await self._get_imap_client(mailbox)
+        await self._select(mailbox)
 
-        flag = "\\Seen"
-        command = "FLAGS.SILENT" if mark_as_read else "-FLAGS.SILENT"
+        command = "+FLAGS.SILENT" if mark_as_read else "-FLAGS.SILENT"
 
-        await imap.store(uid, command, flag)
+        response = await imap.uid("store", uid, command, "(\\Seen)")
+        if response.result != "OK":
+            raise ValueError(f"Failed to update flags for UID {uid}")
 
-    async def send_message(
+        cache.message_cache.update_flags(
+            self.account_settings.account_name, mailbox, uid, mark_as_read
+        )
+        metadata = store.get_metadata_store()
+        if metadata is not None:
+            await blocking.run(
+                metadata.set_read,
+                self.account_settings.account_name,
+                mailbox,
+                int(uid),
+                mark_as_read,
+            )
+
+    async def mark_messages(
+        self,
+        uids: list[str],
+        flags: list[str],
+        action: str = "add",
+        mailbox: str = "INBOX",
+        unchanged_since: int | None = None,
+    ) -> list[int]:
+        """Add, remove or replace flags on many messages with a single UID STORE.
+
+        uids holds UIDs and 'low:high' ranges. Given unchanged_since, usually
+        the HIGHESTMODSEQ returned with a listing, the STORE is conditional on
+        UNCHANGEDSINCE so flags another client changed since are not
+        overwritten. Returns the UIDs skipped for that reason.
+        """
+        if action not in STORE_ACTIONS:
+            raise ValueError(f"Unknown flag action '{action}'")
+        for flag in flags:
+            if not _FLAG_RE.match(flag):
+                raise ValueError(f"Invalid flag: '{flag}'")
+        uid_set = imap_utils.normalize_uid_set(uids)
+
+        imap = await self._get_imap_client(mailbox)
+        condstore = imap.has_capability("CONDSTORE")
+        if unchanged_since is not None and not condstore:
+            raise ValueError(
+                "The server does not support CONDSTORE; unchanged_since cannot be used"
+            )
+        await self._select(mailbox)
+
+        arguments = [uid_set]
+        if unchanged_since is not None:
+            arguments.append(f"(UNCHANGEDSINCE {unchanged_since})")
+        arguments += [STORE_ACTIONS[action], f"({' '.join(flags)})"]
+
+        response = await imap.uid("store", *arguments)
+        if response.result != "OK":
+            raise ValueError(f"Failed to update flags for UIDs {uid_set}")
+        skipped = imap_utils.parse_modified(response.lines)
+
+        seen = any(flag.lower() == "\\seen" for flag in flags)
+        if seen or action == "replace":
+            is_read = seen and action != "remove"
+            # Caller ranges may span billions of UIDs that do not exist; they
+            # are applied as ranges, never expanded.
+            changed = imap_utils.subtract_uids(
+                imap_utils.parse_message_set(uid_set), skipped
+            )
+            account_name = self.account_settings.account_name
+            cache.message_cache.update_flags_in_ranges(
+                account_name, mailbox, changed, is_read
+            )
+            metadata = store.get_metadata_store()
+            if metadata is not None:
+                await blocking.run(
+                    metadata.set_read_ranges, account_name, mailbox, changed, is_read
+                )
+
+        return list(skipped)
+
+    def compose_message(
         self,
         recipients: list[str],
         subject: str,
         body: str,
         cc: list[str] | None = None,
         bcc: list[str] | None = None,
-        is_html: bool = False
-    ):
-        """Send an email message."""
-        smtp = await self._get_smtp_client()
-
-        msg = MIMEMultipart() if cc or bcc else MIMEText(body, "html" if is_html else "plain")
+        is_html: bool = False,
+    ) -> tuple[email.message.Message, list[str]]:
+        """Build a message from this account; returns it and its envelope recipients."""
+        msg = (
+            MIMEMultipart()
+            if cc or bcc
+            else MIMEText(body, "html" if is_html else "plain")
+        )
 
         if isinstance(msg, MIMEMultipart):
             msg.attach(MIMEText(body, "html" if is_html else "plain"))
@@ -316,6 +1067,10 @@ class EmailClient:
         msg["From"] = f"{self.account_settings.full_name} <{self.account_settings.email_address}>"
         msg["To"] = ", ".join(recipients)
         msg["Subject"] = subject
+        msg["Date"] = email.utils.formatdate(localtime=True)
+        msg["Message-ID"] = email.utils.make_msgid(
+            domain=self.account_settings.email_address.rpartition("@")[2] or None
+        )
 
         if cc:
             msg["Cc"] = ", ".join(cc)
@@ -326,13 +1081,105 @@ class EmailClient:
         if bcc:
             all_recipients.extend(bcc)
 
-        await smtp.send_message(msg, recipients=all_recipients)
+        return msg, all_recipients
 
+    async def send_message(
+        self,
+        recipients: list[str],
+        subject: str,
+        body: str,
+        cc: list[str] | None = None,
+        bcc: list[str] | None = None,
+        is_html: bool = False,
+    ) -> dict[str, str]:
+        """Send an email message; returns the recipients the server refused."""
+        msg, all_recipients = self.compose_message(
+            recipients, subject, body, cc, bcc, is_html
+        )
+        return await self.deliver(msg, all_recipients)
+
+    async def deliver(
+        self,
+        msg: email.message.Message | bytes,
+        recipients: list[str],
+        sender: str | None = None,
+    ) -> dict[str, str]:
+        """Hand a composed or rendered message to SMTP; returns refused recipients.
+
+        The envelope sender defaults to the account's address.
+        """
+        sender = sender or self.account_settings.email_address
+        # Throttle before borrowing a session, so waiting senders don't hold one.
+        smtp_pool = self._smtp_pool or pool.get_smtp_pool(self.account_settings)
+        await smtp_pool.rate_limiter.wait()
+        while True:
+            smtp = await self._get_smtp_client()
+            reused = self._smtp_client.last_used > self._smtp_client.created_at
+            try:
+                refused = await pipelining.send_message(smtp, msg, sender, recipients)
+                break
+            except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+                # The server answered, so the session is still usable, but it
+                # may be mid-transaction; leave none for the next message.
+                await self._reset_smtp()
+                raise
+            except Exception as e:
+                # The session may be mid-transaction, so it is never reused.
+                await self._release_smtp(discard=True)
+                # A pooled session the server dropped while idle fails on MAIL
+                # FROM, before anything was accepted; retry on a fresh session.
+                if not (reused and isinstance(e, aiosmtplib.SMTPServerDisconnected)):
+                    raise
+                logger.info(
+                    f"SMTP session for {self.account_settings.account_name} dropped; "
+                    "reconnecting"
+                )
+
+        return {recipient: response.message for recipient, response in refused.items()}
+
+
+def _account_semaphore() -> asyncio.Semaphore:
+    """The process-wide limit on concurrently queried accounts, for this event loop."""
+    global _account_limit
+
+    loop = asyncio.get_running_loop()
+    if _account_limit is None or _account_limit[0] is not loop:
+        _account_limit = (loop, asyncio.Semaphore(max(ACCOUNT_CONCURRENCY, 1)))
+    return _account_limit[1]
+
+
+async def _for_each_account(selector: str | list[str], operation) -> list:
+    """Run operation(account_name) for the selected accounts concurrently, in order."""
+    semaphore = _account_semaphore()
+
+    async def run(account_name: str):
+        async with semaphore:
+            return await operation(account_name)
+
+    return list(
+        await asyncio.gather(*(run(name) for name in resolve_account_names(selector)))
+    )
 
-async def list_messages(data: models.ListMessagesInput) -> models.ListMessagesOutput:
-    """List email messages from specified account."""
+
+async def list_messages(
+    data: models.ListMessagesInput,
+) -> models.ListMessagesOutput | models.MultiAccountListMessagesOutput:
+    """List email messages from one account, or from several concurrently."""
+    if isinstance(data.account_name, str) and data.account_name != "*":
+        return await _list_account_messages(data, data.account_name)
+
+    results = await _for_each_account(
+        data.account_name,
+        lambda account_name: _list_account_messages(data, account_name),
+    )
+    return models.MultiAccountListMessagesOutput(results=results)
+
+
+async def _list_account_messages(
+    data: models.ListMessagesInput, account_name: str
+) -> models.ListMessagesOutput:
     try:
-        account_settings = get_account_settings(data.account_name)
+        account_settings = get_account_settings(account_name)
         async with EmailClient(account_settings) as client:
             messages, total = await client.get_messages(
                 mailbox=data.mailbox,
@@ -342,58 +1189,288 @@ async def list_messages(data: models.ListMessagesInput) -> models.ListMessagesOu
                 sender_filter=data.sender_filter,
                 since=data.since,
                 before=data.before,
-                unread_only=data.unread_only
+                unread_only=data.unread_only,
+                preview_chars=data.preview_chars,
             )
 
             return models.ListMessagesOutput(
-                account_name=data.account_name,
+                account_name=account_name,
                 mailbox=data.mailbox,
                 page=data.page,
                 page_size=data.page_size,
                 total_messages=total,
-                messages=messages
+                messages=messages,
+                highestmodseq=client.highest_modseq(data.mailbox),
             )
 
     except Exception as e:
-        logger.error(f"Error listing messages: {e}")
+        logger.error(f"Error listing messages for {account_name}: {e}")
         return models.ListMessagesOutput(
-            account_name=data.account_name,
+            account_name=account_name,
             mailbox=data.mailbox,
             page=data.page,
             page_size=data.page_size,
             total_messages=0,
-            messages=[]
+            messages=[],
+            error=str(e),
+        )
+
+
+async def count_messages(
+    data: models.CountMessagesInput,
+) -> models.CountMessagesOutput | models.MultiAccountCountMessagesOutput:
+    """Count messages of one account, or of several concurrently."""
+    if isinstance(data.account_name, str) and data.account_name != "*":
+        return await _count_account_messages(data, data.account_name)
+
+    results = await _for_each_account(
+        data.account_name,
+        lambda account_name: _count_account_messages(data, account_name),
+    )
+    return models.MultiAccountCountMessagesOutput(results=results)
+
+
+async def _count_account_messages(
+    data: models.CountMessagesInput, account_name: str
+) -> models.CountMessagesOutput:
+    try:
+        account_settings = get_account_settings(account_name)
+        async with EmailClient(account_settings) as client:
+            total = await client.get_message_count(
+                data.mailbox, "UNSEEN" if data.unread_only else "ALL"
+            )
+            return models.CountMessagesOutput(
+                account_name=account_name, mailbox=data.mailbox, total_messages=total
+            )
+
+    except Exception as e:
+        logger.error(f"Error counting messages for {account_name}: {e}")
+        return models.CountMessagesOutput(
+            account_name=account_name, mailbox=data.mailbox, error=str(e)
         )
 
 
-async def send_message(data: models.SendMessageInput) -> models.StatusOutput:
-    """Send an email message."""
+async def search_messages(
+    data: models.SearchMessagesInput,
+) -> models.SearchMessagesOutput:
+    """Search messages by subject, sender and body text, best matches first."""
+    try:
+        account_settings = get_account_settings(data.account_name)
+
+        async with EmailClient(account_settings) as client:
+            messages = await client.search_messages(
+                data.query, data.mailbox, data.limit
+            )
+
+            return models.SearchMessagesOutput(
+                account_name=data.account_name,
+                mailbox=data.mailbox,
+                query=data.query,
+                messages=messages,
+            )
+
+    except Exception as e:
+        logger.error(f"Error searching messages: {e}")
+        raise ValueError(f"Failed to search messages: {str(e)}")
+
+
+async def send_message(data: models.SendMessageInput) -> models.SendMessageOutput:
+    """Send an email message, or queue it in the outbound spool."""
     try:
         account_settings = get_account_settings(data.account_name)
+        outbound = spool.get_spool()
+        if data.queue and outbound is None:
+            raise ValueError(
+                f"The outbound spool is not configured; set {spool.SPOOL_DIR_ENV}"
+            )
 
         async with EmailClient(account_settings) as client:
+            if outbound is not None and data.queue is not False:
+                msg, all_recipients = client.compose_message(
+                    data.recipients,
+                    data.subject,
+                    data.body,
+                    data.cc,
+                    data.bcc,
+                    data.is_html,
+                )
+                queue_id = await outbound.put(
+                    data.account_name,
+                    msg.as_bytes(),
+                    account_settings.email_address,
+                    all_recipients,
+                )
+                return models.SendMessageOutput(
+                    status="queued",
+                    details=(
+                        f"Email to {len(data.recipients)} recipients "
+                        "queued for delivery"
+                    ),
+                    queue_id=queue_id,
+                )
+
             await client.send_message(
                 recipients=data.recipients,
                 subject=data.subject,
                 body=data.body,
                 cc=data.cc,
                 bcc=data.bcc,
-                is_html=data.is_html
+                is_html=data.is_html,
             )
 
-            return models.StatusOutput(
+            return models.SendMessageOutput(
                 status="success",
-                details=f"Email sent successfully to {len(data.recipients)} recipients"
+                details=f"Email sent successfully to {len(data.recipients)} recipients",
             )
 
     except Exception as e:
         logger.error(f"Error sending message: {e}")
-        return models.StatusOutput(
-            status="error",
-            details=f"Failed to send email: {str(e)}"
+        return models.SendMessageOutput(
+            status="error", details=f"Failed to send email: {str(e)}"
         )
 
 
+async def deliver_spooled(
+    account_name: str, message: bytes, sender: str, recipients: list[str]
+) -> dict[str, str]:
+    """Delivery callback of the spool worker; keeps the envelope that was queued."""
+    async with EmailClient(await load_account_settings(account_name)) as client:
+        return await client.deliver(message, recipients, sender)
+
+
+async def get_send_status(data: models.GetSendStatusInput) -> models.SendStatusOutput:
+    """Report the delivery state of a spooled message."""
+    outbound = spool.get_spool()
+    if outbound is None:
+        raise ValueError(
+            f"The outbound spool is not configured; set {spool.SPOOL_DIR_ENV}"
+        )
+
+    state = await blocking.run(outbound.get, data.queue_id)
+    if state is None:
+        raise ValueError(f"No queued message with ID '{data.queue_id}'")
+
+    return models.SendStatusOutput(
+        queue_id=state["queue_id"],
+        account_name=state["account_name"],
+        status=state["status"],
+        recipients=state["recipients"],
+        attempts=state["attempts"],
+        last_error=state["last_error"],
+        refused=state["refused"],
+        created_at=datetime.fromtimestamp(state["created_at"]),
+        updated_at=datetime.fromtimestamp(state["updated_at"]),
+        next_attempt=(
+            datetime.fromtimestamp(state["next_attempt"])
+            if state["status"] == spool.QUEUED
+            else None
+        ),
+    )
+
+
+def _expand_messages(data: models.SendMessagesInput) -> list[models.OutgoingMessage]:
+    """The messages of a bulk send, with a merge template filled in per recipient."""
+    if data.template is None:
+        if data.merge:
+            raise ValueError("merge recipients need a template")
+        return data.messages
+    if data.messages:
+        raise ValueError(
+            "Pass either messages or a template with merge recipients, not both"
+        )
+
+    subject = string.Template(data.template.subject)
+    body = string.Template(data.template.body)
+    messages = []
+    for index, recipient in enumerate(data.merge):
+        variables = {"email": recipient.email, **recipient.variables}
+        try:
+            messages.append(
+                models.OutgoingMessage(
+                    recipients=[recipient.email],
+                    subject=subject.substitute(variables),
+                    body=body.substitute(variables),
+                    is_html=data.template.is_html,
+                )
+            )
+        except (KeyError, ValueError) as e:
+            raise ValueError(
+                f"merge entry {index} ({recipient.email}): "
+                f"bad or missing placeholder {e}"
+            )
+    return messages
+
+
+async def send_messages(
+    data: models.SendMessagesInput,
+    on_message: Callable[[models.SendResult], Awaitable[None]] | None = None,
+) -> models.SendMessagesOutput:
+    """Send many messages over a few pooled SMTP sessions.
+
+    Each worker holds one session for its share of the messages; the
+    account's rate limit is shared by all of them. A failed message does
+    not stop the others.
+    """
+    try:
+        account_settings = get_account_settings(data.account_name)
+        messages = _expand_messages(data)
+        if not messages:
+            raise ValueError("no messages or merge recipients given")
+    except Exception as e:
+        logger.error(f"Error preparing bulk send: {e}")
+        raise ValueError(f"Failed to send messages: {str(e)}")
+
+    results: list[models.SendResult | None] = [None] * len(messages)
+    pending = iter(enumerate(messages))
+
+    async def worker() -> None:
+        async with EmailClient(account_settings) as client:
+            for index, message in pending:
+                recipients = (
+                    message.recipients + (message.cc or []) + (message.bcc or [])
+                )
+                try:
+                    refused = await client.send_message(
+                        recipients=message.recipients,
+                        subject=message.subject,
+                        body=message.body,
+                        cc=message.cc,
+                        bcc=message.bcc,
+                        is_html=message.is_html,
+                    )
+                    details = "; ".join(
+                        f"{rcpt} refused: {reply}" for rcpt, reply in refused.items()
+                    )
+                    result = models.SendResult(
+                        index=index,
+                        recipients=recipients,
+                        status="success",
+                        details=details or None,
+                    )
+                except Exception as e:
+                    logger.warning(f"Bulk send of message {index} failed: {e}")
+                    result = models.SendResult(
+                        index=index,
+                        recipients=recipients,
+                        status="error",
+                        details=str(e),
+                    )
+                results[index] = result
+                if on_message is not None:
+                    await on_message(result)
+
+    workers = max(min(pool.SMTP_POOL_SIZE, len(messages)), 1)
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+    sent = sum(result.status == "success" for result in results)
+    return models.SendMessagesOutput(
+        account_name=data.account_name,
+        sent=sent,
+        failed=len(results) - sent,
+        results=results,
+    )
+
+
 async def get_message(data: models.GetMessageInput) -> models.GetMessageOutput:
     """Get a specific email message."""
     try:
@@ -416,6 +1493,93 @@ async def get_message(data: models.GetMessageInput) -> models.GetMessageOutput:
         raise ValueError(f"Failed to get message: {str(e)}")
 
 
+async def download_attachment(
+    data: models.DownloadAttachmentInput,
+) -> models.DownloadAttachmentOutput:
+    """Download an attachment of a message to a local file."""
+    try:
+        account_settings = get_account_settings(data.account_name)
+
+        async with EmailClient(account_settings) as client:
+            return await client.download_attachment(
+                data.message_uid,
+                data.mailbox,
+                data.attachment,
+                Path(data.directory).expanduser() if data.directory else None,
+            )
+
+    except Exception as e:
+        logger.error(f"Error downloading attachment: {e}")
+        raise ValueError(f"Failed to download attachment: {str(e)}")
+
+
+async def mark_messages(data: models.MarkMessagesInput) -> models.MarkMessagesOutput:
+    """Change flags on several messages with a single UID STORE."""
+    try:
+        account_settings = get_account_settings(data.account_name)
+
+        async with EmailClient(account_settings) as client:
+            skipped = await client.mark_messages(
+                data.message_uids,
+                data.flags,
+                data.action,
+                data.mailbox,
+                data.unchanged_since,
+            )
+
+            details = f"Flags {' '.join(data.flags)} {data.action}: done"
+            if skipped:
+                details += (
+                    f"; {len(skipped)} messages skipped"
+                    " because they changed concurrently"
+                )
+            return models.MarkMessagesOutput(
+                status="success",
+                details=details,
+                skipped_uids=[str(uid) for uid in skipped],
+            )
+
+    except Exception as e:
+        logger.error(f"Error marking messages: {e}")
+        return models.MarkMessagesOutput(
+            status="error", details=f"Failed to mark messages: {str(e)}"
+        )
+
+
+async def get_messages(
+    data: models.GetMessagesInput,
+    on_message: Callable[[models.EmailMessage], Awaitable[None]] | None = None,
+) -> models.GetMessagesOutput:
+    """Get several email messages at once, within a total size budget."""
+    try:
+        account_settings = get_account_settings(data.account_name)
+
+        async with EmailClient(account_settings) as client:
+            messages, skipped = await client.get_messages_by_uid(
+                data.message_uids,
+                data.mailbox,
+                data.max_total_kb * 1024 if data.max_total_kb else None,
+                on_message,
+            )
+
+            returned = {message.uid for message in messages} | set(skipped)
+            return models.GetMessagesOutput(
+                account_name=data.account_name,
+                mailbox=data.mailbox,
+                messages=messages,
+                skipped_uids=skipped,
+                missing_uids=[
+                    uid
+                    for uid in dict.fromkeys(data.message_uids)
+                    if uid not in returned
+                ],
+            )
+
+    except Exception as e:
+        logger.error(f"Error getting messages: {e}")
+        raise ValueError(f"Failed to get messages: {str(e)}")
+
+
 async def mark_message(data: models.MarkMessageInput) -> models.StatusOutput:
     """Mark a message as read or unread."""
     try:
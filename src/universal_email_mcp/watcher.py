@@ -0,0 +1,319 @@
+"""IMAP IDLE watchers for Universal Email MCP Server.
+
+One background task per account and watched mailbox holds a dedicated IMAP
+connection in IDLE. Untagged EXISTS/EXPUNGE/VANISHED/FETCH responses are
+applied to the message cache and metadata store, and reported as events
+that the server forwards to MCP clients as notifications.
+
+Watching is opt-in: nothing is watched unless
+``UNIVERSAL_EMAIL_MCP_WATCH_MAILBOXES`` names mailboxes, and
+``UNIVERSAL_EMAIL_MCP_WATCH_ACCOUNTS`` can limit it to some accounts.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from array import array
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from typing import Any
+
+from aioimaplib import SELECTED, STOP_WAIT_SERVER_PUSH
+
+from . import blocking, cache, config, imap_utils, pool, store
+from .tools.mail import EmailClient, search_uids
+
+logger = logging.getLogger(__name__)
+
+
+def _env_list(name: str) -> list[str]:
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
+# Each watched mailbox holds an IMAP connection of its own, so none by default.
+WATCH_MAILBOXES = _env_list("UNIVERSAL_EMAIL_MCP_WATCH_MAILBOXES")
+# Accounts whose mailboxes are watched; empty means every configured account.
+WATCH_ACCOUNTS = _env_list("UNIVERSAL_EMAIL_MCP_WATCH_ACCOUNTS")
+# RFC 2177 asks clients to re-issue IDLE at least every 29 minutes.
+IDLE_RENEW_SECONDS = float(
+    os.getenv("UNIVERSAL_EMAIL_MCP_IDLE_RENEW_SECONDS", str(29 * 60))
+)
+WATCH_RETRY_MAX_SECONDS = 300
+
+_UNTAGGED_RE = re.compile(rb"^(\d+) (EXISTS|EXPUNGE|FETCH)\b", re.IGNORECASE)
+_VANISHED_RE = re.compile(rb"^VANISHED ([\d:,]+)", re.IGNORECASE)
+
+Notify = Callable[[dict[str, Any]], Awaitable[None]]
+
+
+class MailboxWatcher:
+    """Keeps one mailbox of one account under IDLE."""
+
+    def __init__(
+        self, account_settings: config.EmailSettings, mailbox: str, notify: Notify
+    ):
+        self.account_settings = account_settings
+        self.mailbox = mailbox
+        self.notify = notify
+        # UIDs by message sequence number, to resolve EXPUNGE and FETCH responses.
+        self._uids = array("I")
+        self._client = None
+        self._task: asyncio.Task | None = None
+        self._established = False
+
+    @property
+    def account_name(self) -> str:
+        return self.account_settings.account_name
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(
+            self._run(), name=f"idle-{self.account_name}-{self.mailbox}"
+        )
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        delay = 1
+        while True:
+            self._established = False
+            try:
+                await self._watch()
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    f"IDLE watcher for {self.account_name}/{self.mailbox} failed: {e}; "
+                    f"retrying in {delay}s"
+                )
+            finally:
+                await self._logout()
+
+            if self._established:
+                delay = 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WATCH_RETRY_MAX_SECONDS)
+
+    async def _watch(self) -> None:
+        """Select the mailbox and loop in IDLE; returns if the server lacks IDLE."""
+        client = await pool.connect_imap(self.account_settings.incoming)
+        self._client = client
+
+        if not client.has_capability("IDLE"):
+            await client.protocol.capability()
+        if not client.has_capability("IDLE"):
+            logger.warning(
+                f"{self.account_name} does not support IDLE; "
+                f"not watching {self.mailbox}"
+            )
+            return
+
+        await self._load_uids()
+        self._established = True
+        logger.info(f"Watching {self.account_name}/{self.mailbox} with IDLE")
+
+        while True:
+            idle = await client.idle_start(timeout=IDLE_RENEW_SECONDS)
+            pushed: list[bytes] = []
+            while client.has_pending_idle():
+                lines = await client.wait_server_push(timeout=IDLE_RENEW_SECONDS + 60)
+                if lines == STOP_WAIT_SERVER_PUSH:
+                    break
+                pushed.extend(lines)
+                # Leave IDLE to act on changes; otherwise the server may batch forever.
+                if any(_is_change(line) for line in lines):
+                    break
+            client.idle_done()
+            await asyncio.wait_for(idle, timeout=60)
+
+            if pushed:
+                await self._apply(pushed)
+
+    async def _load_uids(self) -> None:
+        # EXAMINE: watching must not clear \Recent or otherwise change the mailbox.
+        response = await self._client.examine(self.mailbox)
+        if response.result != "OK":
+            raise ValueError(f"Cannot select mailbox '{self.mailbox}'")
+        # aioimaplib only tracks the SELECTED state for its own select().
+        self._client.protocol.state = SELECTED
+
+        info = imap_utils.parse_select_response(response.lines)
+        uidvalidity = info.get("UIDVALIDITY")
+        if uidvalidity is not None:
+            cache.message_cache.set_uidvalidity(
+                self.account_name, self.mailbox, uidvalidity
+            )
+
+        self._uids = await search_uids(self._client, "ALL")
+
+    async def _apply(self, lines: list[bytes]) -> None:
+        """Apply pushed responses to the caches and notify clients."""
+        exists = None
+        removed: list[int] = []
+        flag_changes: dict[int, list[str]] = {}
+
+        for line in lines:
+            if not isinstance(line, bytes):
+                continue
+            vanished = _VANISHED_RE.match(line)
+            if vanished:
+                ranges = imap_utils.parse_message_set(vanished.group(1).decode())
+                gone = {
+                    uid
+                    for uid in self._uids
+                    if any(low <= uid <= high for low, high in ranges)
+                }
+                removed.extend(gone)
+                self._uids = array("I", (uid for uid in self._uids if uid not in gone))
+                continue
+
+            match = _UNTAGGED_RE.match(line)
+            if not match:
+                continue
+            number, kind = int(match.group(1)), match.group(2).upper()
+            if kind == b"EXISTS":
+                exists = number
+            elif kind == b"EXPUNGE" and 0 < number <= len(self._uids):
+                removed.append(self._uids.pop(number - 1))
+            elif kind == b"FETCH":
+                for item in imap_utils.parse_fetch_response([line]):
+                    uid = item.get("UID")
+                    if uid is None and 0 < number <= len(self._uids):
+                        uid = self._uids[number - 1]
+                    if uid is not None and "FLAGS" in item:
+                        flag_changes[int(uid)] = item["FLAGS"] or []
+
+        added = []
+        if exists is not None and exists > len(self._uids):
+            added = await self._fetch_new_uids()
+
+        for uid in removed:
+            cache.message_cache.discard(self.account_name, self.mailbox, str(uid))
+        for uid, flags in flag_changes.items():
+            cache.message_cache.update_flags(
+                self.account_name, self.mailbox, str(uid), "\\Seen" in flags
+            )
+
+        metadata = store.get_metadata_store()
+        if metadata is not None and await blocking.run(
+            metadata.get_state, self.account_name, self.mailbox
+        ):
+            try:
+                async with EmailClient(self.account_settings) as client:
+                    await client.sync_mailbox(self.mailbox)
+            except Exception as e:
+                logger.warning(f"Metadata sync after IDLE update failed: {e}")
+
+        for event, uids in (
+            ("new_messages", added),
+            ("messages_removed", removed),
+            ("flags_changed", list(flag_changes)),
+        ):
+            if uids:
+                await self.notify(
+                    {
+                        "event": event,
+                        "account_name": self.account_name,
+                        "mailbox": self.mailbox,
+                        "uids": [str(uid) for uid in sorted(uids)],
+                        "total_messages": len(self._uids),
+                    }
+                )
+
+    async def _fetch_new_uids(self) -> list[int]:
+        last = self._uids[-1] if self._uids else 0
+        response = await self._client.uid_search(f"UID {last + 1}:*")
+        if response.result != "OK":
+            return []
+        # "n:*" always matches the highest UID, even when it is below n.
+        added = [
+            uid for uid in imap_utils.parse_uid_list(response.lines[0]) if uid > last
+        ]
+        self._uids.extend(added)
+        return added
+
+    async def _logout(self) -> None:
+        client, self._client = self._client, None
+        if client is None:
+            return
+        try:
+            if client.has_pending_idle():
+                client.idle_done()
+            await asyncio.wait_for(client.logout(), timeout=10)
+        except Exception as e:
+            logger.debug(f"Error closing IDLE connection: {e}")
+
+
+def _is_change(line: Any) -> bool:
+    if not isinstance(line, bytes):
+        return False
+    return bool(_UNTAGGED_RE.match(line) or _VANISHED_RE.match(line))
+
+
+class WatcherManager:
+    """Runs a MailboxWatcher for every watched account and mailbox."""
+
+    def __init__(
+        self,
+        notify: Notify,
+        mailboxes: list[str] | None = None,
+        accounts: list[str] | None = None,
+    ):
+        self.notify = notify
+        self.mailboxes = WATCH_MAILBOXES if mailboxes is None else mailboxes
+        self.accounts = WATCH_ACCOUNTS if accounts is None else accounts
+        self._watchers: dict[tuple[str, str], MailboxWatcher] = {}
+
+    @property
+    def watched(self) -> list[tuple[str, str]]:
+        return sorted(self._watchers)
+
+    async def refresh(self) -> None:
+        """Start watchers for new accounts and stop those of removed or changed ones."""
+        if not self.mailboxes:
+            return
+        try:
+            settings = await config.load_settings()
+            accounts = await blocking.run(self._watched_accounts, settings)
+        except Exception as e:
+            logger.warning(f"Cannot load accounts for IDLE watchers: {e}")
+            return
+
+        wanted = {
+            (account.account_name, mailbox): account
+            for account in accounts
+            for mailbox in self.mailboxes
+        }
+
+        for key, watcher in list(self._watchers.items()):
+            if wanted.get(key) != watcher.account_settings:
+                await watcher.stop()
+                del self._watchers[key]
+
+        for key, account_settings in wanted.items():
+            if key not in self._watchers:
+                watcher = MailboxWatcher(account_settings, key[1], self.notify)
+                watcher.start()
+                self._watchers[key] = watcher
+
+    def _watched_accounts(
+        self, settings: config.Settings
+    ) -> list[config.EmailSettings]:
+        # Only the watched accounts' records are decrypted.
+        names = self.accounts or settings.account_names()
+        return [
+            account
+            for name in names
+            if (account := settings.get_account(name)) is not None
+        ]
+
+    async def stop_all(self) -> None:
+        for watcher in self._watchers.values():
+            await watcher.stop()
+        self._watchers.clear()
@@ -6,7 +6,7 @@ from unittest.mock import patch
 
 import pytest
 
-from universal_email_mcp import config, models
+from universal_email_mcp import compress, config, models, pool
 from universal_email_mcp.tools import account
 
 
@@ -135,6 +135,49 @@ async def test_list_accounts_with_data(clean_settings):
     assert "account2" in result.accounts
 
 
+@pytest.mark.asyncio
+async def test_list_accounts_reports_compression(clean_settings):
+    """Accounts whose IMAP login has compressed report their byte counters."""
+    await account.add_account(
+        models.AddAccountInput(
+            account_name="zipped",
+            full_name="Zip User",
+            email_address="zip@example.com",
+            user_name="zip",
+            password="pass",
+            imap_host="imap.zip.example.com",
+            smtp_host="smtp.zip.example.com",
+        )
+    )
+    pool.get_imap_pool(clean_settings.get_account("zipped"))
+    counters = compress.get_counters("zip@imap.zip.example.com")
+    counters.raw_in, counters.wire_in = 1000, 300
+    try:
+        result = await account.list_accounts()
+    finally:
+        compress._counters.pop("zip@imap.zip.example.com")
+        pool._imap_pools.pop("zipped")
+
+    assert result.compression["zipped"]["saved"] == 700
+
+
+def test_outgoing_server_ignores_compression():
+    """SMTP has no COMPRESS extension, so the flag never sticks to outgoing servers."""
+    server = config.EmailServer(
+        user_name="u", password="p", host="smtp.example.com", port=587
+    )
+    settings = config.EmailSettings(
+        account_name="a",
+        full_name="A",
+        email_address="a@example.com",
+        incoming=server.model_copy(update={"host": "imap.example.com", "port": 993}),
+        outgoing=server,
+    )
+
+    assert settings.incoming.use_compression is True
+    assert settings.outgoing.use_compression is False
+
+
 @pytest.mark.asyncio
 async def test_remove_account_success(clean_settings):
     """Test successfully removing an account."""
@@ -0,0 +1,75 @@
+"""Tests for incremental attachment decoding and resumable downloads."""
+
+import base64
+import quopri
+
+from universal_email_mcp import attachments
+
+
+def feed_in_chunks(decoder, encoded: bytes, size: int) -> bytes:
+    out = b"".join(
+        decoder.feed(encoded[i : i + size]) for i in range(0, len(encoded), size)
+    )
+    return out + decoder.flush()
+
+
+class TestDecoders:
+    """Test that decoders handle chunk boundaries anywhere."""
+
+    def test_base64_split_mid_quantum_and_line(self):
+        data = bytes(range(256)) * 40
+        encoded = base64.encodebytes(data).replace(b"\n", b"\r\n")
+
+        for size in (1, 7, 76, 1000):
+            assert feed_in_chunks(attachments.Base64Decoder(), encoded, size) == data
+
+    def test_quoted_printable_split_inside_escape(self):
+        data = ("Grüße aus Köln = ok " * 50).encode("utf-8")
+        encoded = quopri.encodestring(data)
+
+        for size in (1, 2, 3, 50):
+            decoder = attachments.QuotedPrintableDecoder()
+            assert feed_in_chunks(decoder, encoded, size) == data
+
+    def test_safe_filename_strips_paths(self):
+        assert attachments.safe_filename("../../etc/passwd", "x") == "passwd"
+        assert attachments.safe_filename("a<b>:c.txt", "x") == "a_b__c.txt"
+        assert attachments.safe_filename(None, "7-2") == "7-2"
+
+
+class TestResumableDownload:
+    """Test that partial downloads pick up where they stopped."""
+
+    KEY = {"uid": "7", "section": "2", "uidvalidity": 42}
+
+    def test_resume_continues_from_saved_offset(self, tmp_path):
+        first = attachments.ResumableDownload(tmp_path / "a.bin", self.KEY)
+        first.open()
+        first.write(b"hello ", 8, b"d2")
+        first.close()
+
+        second = attachments.ResumableDownload(tmp_path / "a.bin", self.KEY)
+        second.open()
+
+        assert second.resumed
+        assert (second.offset, second.carry) == (8, b"d2")
+        second.write(b"world", 20, b"")
+        assert second.complete() == 11
+        assert (tmp_path / "a.bin").read_bytes() == b"hello world"
+        assert not second.state_path.exists()
+        assert not second.partial_path.exists()
+
+    def test_state_for_another_part_starts_over(self, tmp_path):
+        first = attachments.ResumableDownload(tmp_path / "a.bin", self.KEY)
+        first.open()
+        first.write(b"stale", 8, b"")
+        first.close()
+
+        second = attachments.ResumableDownload(
+            tmp_path / "a.bin", {**self.KEY, "uidvalidity": 43}
+        )
+        second.open()
+        second.write(b"new", 4, b"")
+
+        assert not second.resumed
+        assert second.complete() == 3
@@ -0,0 +1,37 @@
+"""Tests for the blocking I/O thread pool and the loop stall monitor."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from universal_email_mcp import blocking
+
+
+@pytest.mark.asyncio
+async def test_run_uses_dedicated_threads():
+    """Calls run in the blocking-io pool and their exceptions reach the caller."""
+    name = await blocking.run(lambda: threading.current_thread().name)
+    assert name.startswith("blocking-io")
+
+    with pytest.raises(ValueError, match="bad"):
+        await blocking.run(int, "bad")
+
+
+@pytest.mark.asyncio
+async def test_monitor_measures_stalls():
+    """A blocking call on the loop shows up; the same call through run() does not."""
+    monitor = blocking.LoopStallMonitor(interval=0.01)
+    monitor.start()
+    try:
+        await asyncio.sleep(0.02)
+        await blocking.run(time.sleep, 0.1)
+        await asyncio.sleep(0.02)
+        assert monitor.max_stall_ms < 50
+
+        time.sleep(0.1)
+        await asyncio.sleep(0.02)
+        assert monitor.max_stall_ms >= 80
+    finally:
+        await monitor.stop()
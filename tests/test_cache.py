@@ -0,0 +1,67 @@
+"""Tests for the in-memory message cache."""
+
+from datetime import datetime
+
+from universal_email_mcp import cache, models
+
+
+def make_message(uid, body="body"):
+    """Build a message with a body of the given content."""
+    return models.EmailMessage(
+        uid=uid,
+        subject="Subject",
+        sender="sender@example.com",
+        body=body,
+        date=datetime(2024, 1, 15, 10, 30, 0),
+    )
+
+
+class TestMessageCache:
+    """Test LRU behaviour and UIDVALIDITY handling of MessageCache."""
+
+    def test_get_returns_cached_copy(self):
+        message_cache = cache.MessageCache()
+        message_cache.put("acc", "INBOX", 7, make_message("1"))
+
+        cached = message_cache.get("acc", "INBOX", 7, "1")
+        cached.is_read = True
+
+        assert cached.uid == "1"
+        assert message_cache.get("acc", "INBOX", 7, "1").is_read is False
+
+    def test_other_uidvalidity_misses(self):
+        message_cache = cache.MessageCache()
+        message_cache.put("acc", "INBOX", 7, make_message("1"))
+
+        assert message_cache.get("acc", "INBOX", 8, "1") is None
+
+    def test_evicts_least_recently_used_by_size(self):
+        entry_size = cache.estimate_size(make_message("1", body="x" * 1000))
+        message_cache = cache.MessageCache(max_bytes=entry_size * 2)
+
+        message_cache.put("acc", "INBOX", 7, make_message("1", body="x" * 1000))
+        message_cache.put("acc", "INBOX", 7, make_message("2", body="x" * 1000))
+        message_cache.get("acc", "INBOX", 7, "1")
+        message_cache.put("acc", "INBOX", 7, make_message("3", body="x" * 1000))
+
+        assert message_cache.get("acc", "INBOX", 7, "2") is None
+        assert message_cache.get("acc", "INBOX", 7, "1") is not None
+        assert message_cache.current_bytes <= message_cache.max_bytes
+
+    def test_oversized_message_not_cached(self):
+        message_cache = cache.MessageCache(max_bytes=100)
+        message_cache.put("acc", "INBOX", 7, make_message("1", body="x" * 1000))
+
+        assert len(message_cache) == 0
+
+    def test_uidvalidity_change_invalidates_mailbox(self):
+        message_cache = cache.MessageCache()
+        message_cache.set_uidvalidity("acc", "INBOX", 7)
+        message_cache.put("acc", "INBOX", 7, make_message("1"))
+        message_cache.put("acc", "Sent", 3, make_message("1"))
+
+        message_cache.set_uidvalidity("acc", "INBOX", 8)
+
+        assert message_cache.get("acc", "INBOX", 7, "1") is None
+        assert message_cache.get("acc", "Sent", 3, "1") is not None
+        assert message_cache.uidvalidity("acc", "INBOX") == 8
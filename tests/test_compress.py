@@ -0,0 +1,71 @@
+"""Tests for COMPRESS=DEFLATE negotiation."""
+
+import zlib
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from universal_email_mcp import compress
+
+
+def make_client(result="OK", capabilities=("COMPRESS=DEFLATE",)):
+    """A mock aioimaplib client with a real-looking protocol."""
+    client = MagicMock()
+    client.timeout = 10
+    client.has_capability = MagicMock(side_effect=lambda name: name in capabilities)
+    client.protocol.execute = AsyncMock(
+        return_value=MagicMock(result=result, lines=[b"done"])
+    )
+    client.protocol.new_tag.return_value = "A1"
+    client.protocol.data_received = MagicMock()
+    return client
+
+
+class TestEnableDeflate:
+    """Test wrapping of an IMAP connection in a deflate stream."""
+
+    @pytest.mark.asyncio
+    async def test_streams_are_compressed_both_ways(self):
+        client = make_client()
+        wire = client.protocol.transport
+        receive = client.protocol.data_received
+        counters = compress.CompressionCounters()
+
+        assert await compress.enable_deflate(client, counters) is True
+        assert str(client.protocol.execute.await_args.args[0]) == "A1 COMPRESS DEFLATE"
+
+        command = b"A2 UID FETCH 1:100 (FLAGS)\r\n"
+        client.protocol.transport.write(command)
+        sent = wire.write.call_args.args[0]
+        assert zlib.decompressobj(wbits=-15).decompress(sent) == command
+
+        reply = b"* 1 FETCH (FLAGS (\\Seen))\r\n" * 50
+        deflate = zlib.compressobj(wbits=-15)
+        client.protocol.data_received(
+            deflate.compress(reply) + deflate.flush(zlib.Z_SYNC_FLUSH)
+        )
+        receive.assert_called_once_with(reply)
+
+        assert counters.raw_in == len(reply)
+        assert counters.wire_in < counters.raw_in
+        assert counters.raw_out == len(command)
+        assert counters.saved > 0
+
+    @pytest.mark.asyncio
+    async def test_not_negotiated_without_capability(self):
+        client = make_client(capabilities=())
+        transport = client.protocol.transport
+
+        counters = compress.CompressionCounters()
+        assert await compress.enable_deflate(client, counters) is False
+        client.protocol.execute.assert_not_awaited()
+        assert client.protocol.transport is transport
+
+    @pytest.mark.asyncio
+    async def test_refusal_leaves_connection_untouched(self):
+        client = make_client(result="NO")
+        transport = client.protocol.transport
+
+        counters = compress.CompressionCounters()
+        assert await compress.enable_deflate(client, counters) is False
+        assert client.protocol.transport is transport
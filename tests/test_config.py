@@ -0,0 +1,292 @@
+"""Tests for the cached settings layer."""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from universal_email_mcp import blocking, config, reloader
+from universal_email_mcp.tools import account
+
+
+class PlainStore:
+    """Stands in for SecureConfigStore without touching keyring or key files."""
+
+    def __init__(self):
+        self.encrypted = 0
+        self.decrypted = 0
+
+    def encrypt_data(self, data: dict) -> str:
+        self.encrypted += 1
+        return json.dumps(data)
+
+    def decrypt_data(self, encrypted_data: str) -> dict:
+        self.decrypted += 1
+        return json.loads(encrypted_data)
+
+
+def make_account(name: str) -> config.EmailSettings:
+    server = config.EmailServer(
+        user_name="u", password="p", host="mail.example.com", port=993
+    )
+    return config.EmailSettings(
+        account_name=name,
+        full_name="Test",
+        email_address=f"{name}@example.com",
+        incoming=server,
+        outgoing=server,
+    )
+
+
+@pytest.fixture
+def config_path(tmp_path):
+    """Point CONFIG_PATH at a temporary file and start with an empty cache."""
+    path = tmp_path / "config.toml"
+    with (
+        patch.object(config, "CONFIG_PATH", path),
+        patch.object(config.SecureSettings, "_secure_store", PlainStore()),
+        patch.object(config.SecureSettings, "_decrypted", {}),
+    ):
+        config.reset_settings()
+        yield path
+        config.reset_settings()
+
+
+def write_config(path, *names):
+    """Write a configuration in the legacy single-blob format."""
+    data = {"accounts": [make_account(name).model_dump() for name in names]}
+    path.write_text(json.dumps({"encrypted": True, "data": json.dumps(data)}))
+
+
+def read_index(path) -> dict[str, str]:
+    index = json.loads(path.read_text())
+    assert index["version"] == config.CONFIG_INDEX_VERSION
+    return index["accounts"]
+
+
+def test_unchanged_file_is_not_read_again(config_path):
+    """Repeated calls reuse the decrypted settings."""
+    write_config(config_path, "work")
+
+    with patch.object(
+        config.SecureSettings, "load_secure", wraps=config.SecureSettings.load_secure
+    ) as load:
+        first = config.get_settings()
+        second = config.get_settings()
+
+    assert first is second
+    assert load.call_count == 1
+
+
+def test_changed_file_is_reloaded(config_path):
+    """An edit by another process is picked up on the next call."""
+    write_config(config_path, "work")
+    assert config.get_settings().get_account("home") is None
+
+    # Another process rewrites the index; this one's cache is left alone.
+    with patch.object(config, "_remember"):
+        other_process = config.SecureSettings.load_secure()
+        other_process.add_account(make_account("home"))
+        other_process.store()
+
+    assert config.get_settings().get_account("home") is not None
+
+
+def test_store_updates_cache(config_path):
+    """Settings written by this process are served without reading them back."""
+    settings = config.get_settings()
+    settings.add_account(make_account("work"))
+    settings.store()
+
+    with patch.object(config.SecureSettings, "load_secure") as load:
+        assert config.get_settings().get_account("work") is not None
+    load.assert_not_called()
+
+
+def test_account_index_follows_changes():
+    """get_account sees accounts added and removed after the first lookup."""
+    settings = config.Settings()
+    settings.add_account(make_account("work"))
+    assert settings.get_account("work").account_name == "work"
+
+    settings.add_account(make_account("home"))
+    settings.remove_account("work")
+
+    assert settings.get_account("work") is None
+    assert settings.get_account("home") is not None
+
+
+def test_legacy_blob_is_migrated_to_records(config_path):
+    """The single encrypted blob becomes a plaintext index and per-account records."""
+    write_config(config_path, "work", "home")
+
+    settings = config.get_settings()
+
+    records = read_index(config_path)
+    assert sorted(records) == ["home", "work"]
+    assert all(
+        (config_path.parent / "accounts" / record).exists()
+        for record in records.values()
+    )
+    assert settings.account_names() == ["work", "home"]
+
+
+def test_adding_an_account_encrypts_only_that_account(config_path):
+    """Saving re-encrypts changed accounts only and drops replaced records."""
+    settings = config.get_settings()
+    settings.import_accounts([make_account(f"box{i}") for i in range(20)])
+    old_record = read_index(config_path)["box3"]
+    secure_store = config.SecureSettings._secure_store
+    secure_store.encrypted = 0
+
+    settings.add_account(make_account("extra"))
+    settings.add_account(
+        make_account("box3").model_copy(update={"full_name": "Renamed"})
+    )
+    settings.store()
+
+    assert secure_store.encrypted == 2
+    assert not (config_path.parent / "accounts" / old_record).exists()
+    reloaded = config.SecureSettings.load_secure()
+    assert reloaded.get_account("box3").full_name == "Renamed"
+    assert len(reloaded.accounts) == 21
+
+
+@pytest.mark.asyncio
+async def test_records_are_decrypted_on_demand(config_path):
+    """Listing names reads the index only; get_account decrypts just its record."""
+    accounts = [make_account(name) for name in ("a", "b", "c")]
+    config.get_settings().import_accounts(accounts)
+    config.reset_settings()
+    config.SecureSettings._decrypted.clear()
+    secure_store = config.SecureSettings._secure_store
+    secure_store.decrypted = 0
+
+    result = await account.list_accounts()
+    assert result.accounts == ["a", "b", "c"]
+    assert secure_store.decrypted == 0
+
+    settings = config.get_settings()
+    assert settings.get_account("b").email_address == "b@example.com"
+    assert settings.get_account("b") is settings.get_account("b")
+    assert settings.get_account("missing") is None
+    assert secure_store.decrypted == 1
+
+    assert [acc.account_name for acc in settings.accounts] == ["a", "b", "c"]
+    assert secure_store.decrypted == 3
+
+
+def test_bulk_import_fsyncs_only_what_it_wrote(config_path):
+    """Importing syncs each new record and the directories, never the whole host."""
+    settings = config.get_settings()
+
+    with (
+        patch.object(config.os, "sync") as sync,
+        patch.object(config.os, "fsync") as fsync,
+    ):
+        settings.import_accounts([make_account(f"box{i}") for i in range(50)])
+
+    sync.assert_not_called()
+    # The 50 records, the index file and the two directories.
+    assert fsync.call_count == 53
+    assert len(read_index(config_path)) == 50
+
+
+@pytest.mark.asyncio
+async def test_load_settings_reads_off_the_loop(config_path):
+    """A slow read, e.g. the key from a D-Bus keyring, does not stall the event loop."""
+    write_config(config_path, "work")
+    read = config.SecureSettings.read
+
+    def slow_read():
+        time.sleep(0.1)
+        return read()
+
+    monitor = blocking.LoopStallMonitor(interval=0.01)
+    monitor.start()
+    try:
+        with patch.object(config.SecureSettings, "read", side_effect=slow_read):
+            settings = await config.load_settings()
+    finally:
+        await monitor.stop()
+
+    assert settings.get_account("work") is not None
+    assert monitor.max_stall_ms < 50
+
+
+def store_elsewhere(*accounts: config.EmailSettings) -> None:
+    """Rewrite the configuration the way another process would."""
+    with patch.object(config, "_remember"):
+        other_process = config.SecureSettings.load_secure()
+        other_process.accounts = list(accounts)
+        other_process.store()
+
+
+class TestConfigWatcher:
+
+    @pytest.fixture
+    def close_pool(self):
+        with patch.object(
+            reloader.pool, "close_pool", new_callable=AsyncMock
+        ) as close_pool:
+            yield close_pool
+
+    @pytest.mark.asyncio
+    async def test_only_changed_accounts_are_drained(self, config_path, close_pool):
+        """Changed and removed accounts get new pools; display-name edits do not."""
+        store_elsewhere(make_account("work"), make_account("home"), make_account("old"))
+        on_change = AsyncMock()
+        watcher = reloader.ConfigWatcher(on_change)
+        watcher._applied = config.get_settings()
+
+        moved = make_account("work")
+        moved.incoming = moved.incoming.model_copy(update={"host": "imap.example.org"})
+        store_elsewhere(
+            moved, make_account("home").model_copy(update={"full_name": "Renamed"})
+        )
+
+        assert await watcher.check()
+        closed = sorted(call.args[0] for call in close_pool.await_args_list)
+        assert closed == ["old", "work"]
+        on_change.assert_awaited_once()
+        work = config.get_settings().get_account("work")
+        assert work.incoming.host == "imap.example.org"
+
+        # Nothing changed since.
+        assert not await watcher.check()
+
+    @pytest.mark.asyncio
+    async def test_invalid_file_keeps_current_settings(self, config_path, close_pool):
+        """A broken write is ignored instead of dropping every account."""
+        store_elsewhere(make_account("work"))
+        watcher = reloader.ConfigWatcher()
+        watcher._applied = config.get_settings()
+
+        config_path.write_text("{not json")
+
+        assert not await watcher.check()
+        close_pool.assert_not_awaited()
+        assert config.get_settings() is watcher._applied
+
+    @pytest.mark.asyncio
+    async def test_change_is_picked_up_in_background(self, config_path, close_pool):
+        """The running watcher notices a rewrite, through inotify or polling."""
+        store_elsewhere(make_account("work"))
+        changed = asyncio.Event()
+
+        async def on_change():
+            changed.set()
+
+        watcher = reloader.ConfigWatcher(on_change)
+        with patch.object(reloader, "CONFIG_POLL_SECONDS", 0.05):
+            watcher.start()
+            try:
+                await asyncio.sleep(0.05)
+                store_elsewhere(make_account("home"))
+                await asyncio.wait_for(changed.wait(), 5)
+            finally:
+                await watcher.stop()
+
+        close_pool.assert_awaited_once_with("work")
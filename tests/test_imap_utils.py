@@ -0,0 +1,186 @@
+"""Tests for IMAP command and response helpers."""
+
+import pytest
+
+from universal_email_mcp import imap_utils
+
+
+class TestFormatMessageSet:
+    """Test sequence set formatting."""
+
+    def test_consecutive_ids_collapse_to_range(self):
+        assert imap_utils.format_message_set(["1203", "1201", "1202"]) == "1201:1203"
+
+    def test_mixed_ranges_and_singles(self):
+        assert imap_utils.format_message_set([1, 2, 3, 7, 9, 10]) == "1:3,7,9:10"
+
+    def test_empty_set_rejected(self):
+        with pytest.raises(ValueError):
+            imap_utils.format_message_set([])
+
+
+class TestParseFetchResponse:
+    """Test splitting and parsing of multi-message FETCH responses."""
+
+    def test_multiple_messages_with_literals(self):
+        header1 = b"Subject: First\r\n\r\n"
+        header2 = b"Subject: Second\r\n\r\n"
+        lines = [
+            b"1 FETCH (UID 101 FLAGS (\\Seen) RFC822.HEADER {%d}" % len(header1),
+            bytearray(header1),
+            b")",
+            b"2 FETCH (UID 102 FLAGS () RFC822.HEADER {%d}" % len(header2),
+            bytearray(header2),
+            b")",
+            b"Fetch completed.",
+        ]
+
+        messages = imap_utils.parse_fetch_response(lines)
+
+        assert [m["SEQ"] for m in messages] == ["1", "2"]
+        assert messages[0]["UID"] == "101"
+        assert messages[0]["FLAGS"] == ["\\Seen"]
+        assert messages[0]["RFC822.HEADER"] == header1
+        assert messages[1]["FLAGS"] == []
+        assert messages[1]["RFC822.HEADER"] == header2
+
+    def test_section_names_with_spaces(self):
+        fields = b"From: a@example.com\r\n\r\n"
+        lines = [
+            b"5 FETCH (BODY[HEADER.FIELDS (FROM)] {%d}" % len(fields),
+            bytearray(fields),
+            b' BODY[TEXT]<0> "hi" UID 9)',
+            b"OK",
+        ]
+
+        (message,) = imap_utils.parse_fetch_response(lines)
+
+        assert message["BODY[HEADER.FIELDS (FROM)]"] == fields
+        assert message["BODY[TEXT]<0>"] == "hi"
+        assert message["UID"] == "9"
+
+    def test_nil_and_nested_lists(self):
+        value = imap_utils.parse_imap_value(b'(NIL "a \\"quoted\\" b" (1 2))')
+
+        assert value == [None, 'a "quoted" b', ["1", "2"]]
+
+
+class TestAttachmentParts:
+    """Test section numbering and attachment detection in BODYSTRUCTURE."""
+
+    STRUCTURE = imap_utils.parse_imap_value(
+        b'((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 10 1)'
+        b'("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 20 1) "ALTERNATIVE")'
+        b'("APPLICATION" "PDF" NIL NIL NIL "BASE64" 4000 NIL'
+        b' ("ATTACHMENT" ("FILENAME" "report.pdf")) NIL)'
+        b'("IMAGE" "PNG" ("NAME" "logo.png") NIL NIL "BASE64" 300) "MIXED")'
+    )
+
+    def test_section_numbers(self):
+        sections = [
+            section for section, _ in imap_utils.iter_numbered_parts(self.STRUCTURE)
+        ]
+
+        assert sections == ["1.1", "1.2", "2", "3"]
+
+    def test_single_part_message_is_section_one(self):
+        structure = imap_utils.parse_imap_value(
+            b'("TEXT" "PLAIN" NIL NIL NIL "7BIT" 5 1)'
+        )
+
+        assert [s for s, _ in imap_utils.iter_numbered_parts(structure)] == ["1"]
+
+    def test_parse_bodystructure(self):
+        parts = imap_utils.parse_bodystructure(self.STRUCTURE)
+
+        assert [(p.section, p.content_type, p.is_attachment) for p in parts] == [
+            ("1.1", "text/plain", False),
+            ("1.2", "text/html", False),
+            ("2", "application/pdf", True),
+            ("3", "image/png", True),
+        ]
+        pdf = parts[2]
+        assert (pdf.filename, pdf.disposition, pdf.encoding, pdf.size) == (
+            "report.pdf",
+            "attachment",
+            "base64",
+            4000,
+        )
+        assert pdf.decoded_size == 4000 * 57 // 78
+        assert parts[0].charset == "utf-8"
+        assert parts[3].filename == "logo.png"
+
+    def test_attached_message_is_one_part(self):
+        parts = imap_utils.parse_bodystructure(
+            b'(("TEXT" "PLAIN" NIL NIL NIL "7BIT" 5 1)'
+            b'("MESSAGE" "RFC822" NIL NIL NIL "7BIT" 900'
+            b' (NIL "Fwd" NIL NIL NIL NIL NIL NIL NIL NIL)'
+            b' ("TEXT" "PLAIN" NIL NIL NIL "7BIT" 10 1) 20 NIL'
+            b' ("ATTACHMENT" ("FILENAME" "fwd.eml")) NIL)'
+            b' "MIXED")'
+        )
+
+        assert [(p.section, p.filename, p.is_attachment) for p in parts] == [
+            ("1", None, False),
+            ("2", "fwd.eml", True),
+        ]
+
+
+class TestParseSelectResponse:
+    """Test extraction of mailbox state from SELECT responses."""
+
+    def test_qresync_select(self):
+        lines = [
+            b"FLAGS (\\Answered \\Seen)",
+            b"120 EXISTS",
+            b"OK [UIDVALIDITY 3857529045] UIDs valid",
+            b"OK [UIDNEXT 4392] Predicted next UID",
+            b"OK [HIGHESTMODSEQ 715194045007] Highest",
+            b"VANISHED (EARLIER) 41,43:116,118",
+            b"49 FETCH (UID 117 FLAGS (\\Seen) MODSEQ (90060115205545))",
+            b"[READ-WRITE] SELECT completed",
+        ]
+
+        info = imap_utils.parse_select_response(lines)
+
+        assert info["UIDVALIDITY"] == 3857529045
+        assert info["UIDNEXT"] == 4392
+        assert info["HIGHESTMODSEQ"] == 715194045007
+        assert info["EXISTS"] == 120
+        assert info["VANISHED"] == [(41, 41), (43, 116), (118, 118)]
+        assert info["FETCH"][0]["UID"] == "117"
+        assert info["FETCH"][0]["MODSEQ"] == ["90060115205545"]
+
+
+class TestParseEsearchResponse:
+    """Test ESEARCH return data parsing."""
+
+    def test_count_and_partial(self):
+        lines = [
+            b'ESEARCH (TAG "A7") UID COUNT 17 PARTIAL (-1:-3 15:17)',
+            b"SEARCH completed",
+        ]
+
+        result = imap_utils.parse_esearch_response(lines)
+
+        assert result == {"COUNT": 17, "PARTIAL": "15:17"}
+        assert list(imap_utils.expand_message_set(result["PARTIAL"])) == [15, 16, 17]
+
+    def test_empty_partial_and_all(self):
+        assert imap_utils.parse_esearch_response(
+            [b'ESEARCH (TAG "A7") UID COUNT 0 PARTIAL (-1:-3 NIL)']
+        ) == {"COUNT": 0, "PARTIAL": None}
+        assert list(imap_utils.expand_message_set(None)) == []
+
+    def test_all_expands_to_sorted_array(self):
+        result = imap_utils.parse_esearch_response(
+            [b"ESEARCH UID ALL 7,1:3 MIN 1 MAX 7"]
+        )
+
+        assert list(imap_utils.expand_message_set(result["ALL"])) == [1, 2, 3, 7]
+        assert (result["MIN"], result["MAX"]) == (1, 7)
+
+    def test_subtract_uids_keeps_ranges(self):
+        assert imap_utils.subtract_uids(
+            [(1, 4000000000), (4000000005, 4000000005)], [1, 7, 4000000000, 4000000005]
+        ) == [(2, 6), (8, 3999999999)]
@@ -1,11 +1,16 @@
 """Tests for email operation tools."""
 
+import asyncio
+import base64
+import re
+import threading
 from datetime import datetime
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import aiosmtplib
 import pytest
 
-from universal_email_mcp import config, models
+from universal_email_mcp import cache, config, models, pool, spool, store
 from universal_email_mcp.tools import mail
 
 
@@ -72,6 +77,802 @@ class TestEmailClient:
         assert client._smtp_client is None
 
 
+class TestGetMessages:
+    """Test EmailClient.get_messages against a mocked IMAP connection."""
+
+    @staticmethod
+    def fetch_lines(
+        seq,
+        subject,
+        bodystructure=b'("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "7BIT" 4 1)',
+        text=None,
+    ):
+        header = f"Subject: {subject}\r\nFrom: a@example.com\r\n\r\n".encode()
+        lines = [
+            b"%d FETCH (UID %d FLAGS () RFC822.SIZE 1234 BODYSTRUCTURE %s "
+            b"BODY[HEADER.FIELDS (DATE FROM SUBJECT)] {%d}"
+            % (seq, seq, bodystructure, len(header)),
+            bytearray(header),
+        ]
+        if text is not None:
+            lines += [b" BODY[TEXT]<0> {%d}" % len(text), bytearray(text)]
+        return lines + [b")"]
+
+    @staticmethod
+    def imap_with(fetch_lines, ids=b"1 2 3 4 5", capabilities=()):
+        imap = AsyncMock()
+        imap.has_capability = MagicMock(side_effect=lambda name: name in capabilities)
+        imap.select.return_value = imap.examine.return_value = MagicMock(
+            result="OK", lines=[b"OK [UIDVALIDITY 42] UIDs valid", b"SELECT completed"]
+        )
+        imap.uid_search.return_value = MagicMock(
+            result="OK", lines=[ids, b"Search done"]
+        )
+        imap.uid.return_value = MagicMock(
+            result="OK", lines=fetch_lines + [b"Fetch done"]
+        )
+        return imap
+
+    @pytest.mark.asyncio
+    async def test_page_fetched_in_one_command(self, mock_account_settings):
+        """A page of messages is fetched with a single FETCH over a message set."""
+        imap = self.imap_with(
+            self.fetch_lines(4, "Fourth") + self.fetch_lines(5, "Fifth")
+        )
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            messages, total = await client.get_messages(page_size=2)
+
+        assert total == 5
+        imap.uid.assert_awaited_once()
+        assert imap.uid.call_args[0][1] == "4:5"
+        assert [m.subject for m in messages] == ["Fifth", "Fourth"]
+
+    @pytest.mark.asyncio
+    async def test_listing_reports_highest_modseq(self, mock_account_settings):
+        """CONDSTORE servers are asked for the HIGHESTMODSEQ the client reports."""
+        imap = self.imap_with(
+            self.fetch_lines(1, "Hello"), ids=b"1", capabilities=("CONDSTORE",)
+        )
+        imap.examine.return_value = MagicMock(
+            result="OK",
+            lines=[
+                b"OK [UIDVALIDITY 42] UIDs valid",
+                b"OK [HIGHESTMODSEQ 9000] Highest",
+                b"EXAMINE completed",
+            ],
+        )
+
+        client = mail.EmailClient(mock_account_settings)
+        client._imap_client = pool.PooledIMAPConnection(imap)
+        await client.get_messages()
+
+        imap.examine.assert_awaited_once_with("INBOX (CONDSTORE)")
+        assert client.highest_modseq("INBOX") == 9000
+        assert client.highest_modseq("Archive") is None
+
+    @pytest.mark.asyncio
+    async def test_listing_is_header_only(self, mock_account_settings):
+        """Listings never request message bodies and report size and attachments."""
+        structure = (
+            b'(("TEXT" "PLAIN" NIL NIL NIL "7BIT" 10 1)'
+            b'("IMAGE" "PNG" ("NAME" "a.png") NIL NIL "BASE64" 2000000) "MIXED")'
+        )
+        imap = self.imap_with(self.fetch_lines(1, "Newsletter", structure), ids=b"1")
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            (message,), _ = await client.get_messages()
+
+        assert "RFC822.TEXT" not in imap.uid.call_args[0][2]
+        assert "BODY.PEEK[TEXT]" not in imap.uid.call_args[0][2]
+        assert not isinstance(message, models.EmailMessage)
+        assert message.size == 1234
+        assert message.has_attachments is True
+        assert message.attachments == [
+            models.AttachmentInfo(
+                section="2",
+                filename="a.png",
+                content_type="image/png",
+                size=2000000 * 57 // 78,
+            )
+        ]
+
+    @pytest.mark.asyncio
+    async def test_listed_body_loaded_on_first_access(self, mock_account_settings):
+        """A listed message fetches its body with one UID FETCH, only once."""
+        cache.message_cache.clear()
+        imap = self.imap_with(self.fetch_lines(1, "Hello"), ids=b"1")
+
+        with patch.object(mail.EmailClient, "_get_imap_client", return_value=imap):
+            (message,), _ = await mail.EmailClient(mock_account_settings).get_messages()
+            assert imap.uid.await_count == 1
+
+            raw = b"Subject: Hello\r\nFrom: a@example.com\r\n\r\nBody text"
+            imap.uid.return_value = MagicMock(
+                result="OK",
+                lines=[
+                    b"1 FETCH (UID 1 FLAGS () BODY[] {%d}" % len(raw),
+                    bytearray(raw),
+                    b")",
+                    b"Fetch done",
+                ],
+            )
+            assert await message.load_body() == "Body text"
+            assert await message.load_body() == "Body text"
+
+        assert imap.uid.await_count == 2
+        assert imap.uid.call_args[0][1:] == ("1", "(UID FLAGS BODY.PEEK[])")
+        cache.message_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_alternative_is_not_an_attachment(self, mock_account_settings):
+        """multipart/alternative plain+HTML is not flagged as having attachments."""
+        structure = (
+            b'(("TEXT" "PLAIN" NIL NIL NIL "7BIT" 10 1)'
+            b'("TEXT" "HTML" NIL NIL NIL "7BIT" 20 1) "ALTERNATIVE")'
+        )
+        imap = self.imap_with(self.fetch_lines(1, "Hello", structure), ids=b"1")
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            (message,), _ = await client.get_messages()
+
+        assert message.has_attachments is False
+
+    @pytest.mark.asyncio
+    async def test_preview_skips_mime_framing(self, mock_account_settings):
+        """A partial TEXT fetch yields a decoded preview of the first text part."""
+        structure = (
+            b'(("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 10 1)'
+            b'("TEXT" "HTML" NIL NIL NIL "7BIT" 20 1) "ALTERNATIVE")'
+        )
+        text = (
+            b"preamble\r\n--b1\r\nContent-Type: text/plain; charset=utf-8\r\n"
+            b"Content-Transfer-Encoding: quoted-printable\r\n\r\n"
+            b"Caf=C3=A9 opens at nine\r\n"
+            b"--b1\r\nContent-Type: text/html\r\n\r\n<p>x</p>"
+        )
+        imap = self.imap_with(self.fetch_lines(1, "Hello", structure, text), ids=b"1")
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            (message,), _ = await client.get_messages(preview_chars=9)
+
+        assert "BODY.PEEK[TEXT]<0." in imap.uid.call_args[0][2]
+        assert message.preview == "Café open"
+
+    @pytest.mark.asyncio
+    async def test_esearch_partial_fetches_only_the_page(self, mock_account_settings):
+        """With ESEARCH and PARTIAL the server returns the page UIDs and a count."""
+        imap = self.imap_with(
+            self.fetch_lines(14, "Fourteen") + self.fetch_lines(15, "Fifteen"),
+            capabilities=("ESEARCH", "PARTIAL"),
+        )
+        imap.protocol = MagicMock()
+        imap.protocol.new_tag.return_value = "A1"
+        imap.protocol.execute = AsyncMock(
+            return_value=MagicMock(
+                result="OK",
+                lines=[
+                    b'ESEARCH (TAG "A1") UID COUNT 40 PARTIAL (-11:-12 14:15)',
+                    b"done",
+                ],
+            )
+        )
+        imap.timeout = 10
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            messages, total = await client.get_messages(page=6, page_size=2)
+
+        command = str(imap.protocol.execute.await_args.args[0])
+        assert "UID SEARCH RETURN (COUNT PARTIAL -11:-12)" in command
+        imap.uid_search.assert_not_awaited()
+        assert total == 40
+        assert [m.uid for m in messages] == ["15", "14"]
+
+    @pytest.mark.asyncio
+    async def test_fallback_pages_from_the_end(self, mock_account_settings):
+        """Without ESEARCH the UID list is paged newest first."""
+        imap = self.imap_with(self.fetch_lines(1, "First"), ids=b"1 2 3 4 5")
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            _, total = await client.get_messages(page=3, page_size=2)
+
+        assert total == 5
+        assert imap.uid.call_args[0][1] == "1"
+
+
+class TestMetadataSync:
+    """Test listings served from the metadata store with incremental sync."""
+
+    @pytest.fixture(autouse=True)
+    def metadata_db(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(store.METADATA_DB_ENV, str(tmp_path / "metadata.db"))
+        store.reset_metadata_store()
+        yield
+        store.reset_metadata_store()
+
+    @staticmethod
+    def select_response(modseq, uidnext=4, exists=3, extra=()):
+        return MagicMock(
+            result="OK",
+            lines=[
+                b"%d EXISTS" % exists,
+                b"OK [UIDVALIDITY 42] UIDs valid",
+                b"OK [UIDNEXT %d] Predicted next UID" % uidnext,
+                b"OK [HIGHESTMODSEQ %d] Highest" % modseq,
+                *extra,
+                b"SELECT completed",
+            ],
+        )
+
+    @staticmethod
+    def summary_lines(*uids):
+        lines = []
+        for uid in uids:
+            lines += [
+                (
+                    line.replace(b"FLAGS ()", b"FLAGS () MODSEQ (5)")
+                    if isinstance(line, bytes)
+                    else line
+                )
+                for line in TestGetMessages.fetch_lines(uid, f"Message {uid}")
+            ]
+        return MagicMock(result="OK", lines=lines + [b"Fetch done"])
+
+    @staticmethod
+    def imap_with(capabilities):
+        imap = AsyncMock()
+        imap.has_capability = MagicMock(side_effect=lambda name: name in capabilities)
+        imap.uid_search.return_value = MagicMock(
+            result="OK", lines=[b"1 2 3", b"Search done"]
+        )
+        return imap
+
+    async def initial_sync(self, client, imap):
+        imap.examine.return_value = self.select_response(10)
+        imap.uid.return_value = self.summary_lines(1, 2, 3)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            return await client.get_messages(page=1, page_size=10)
+
+    @pytest.mark.asyncio
+    async def test_initial_sync_fills_store(self, mock_account_settings):
+        """The first listing fetches every summary once, then pages come from SQLite."""
+        imap = self.imap_with({"CONDSTORE"})
+        client = mail.EmailClient(mock_account_settings)
+
+        messages, total = await self.initial_sync(client, imap)
+
+        assert total == 3
+        assert [m.uid for m in messages] == ["3", "2", "1"]
+        imap.examine.assert_awaited_once_with("INBOX (CONDSTORE)")
+        assert "MODSEQ" in imap.uid.await_args.args[2]
+
+        imap.uid.reset_mock()
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            assert await client.get_message_count(search_criteria="ALL") == 3
+        imap.uid.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_condstore_fetches_only_changes(self, mock_account_settings):
+        """Without QRESYNC, CHANGEDSINCE brings just the changed flags."""
+        imap = self.imap_with({"CONDSTORE"})
+        client = mail.EmailClient(mock_account_settings)
+        await self.initial_sync(client, imap)
+
+        imap.examine.return_value = self.select_response(12)
+        changed = MagicMock(
+            result="OK", lines=[b"2 FETCH (UID 2 FLAGS (\\Seen) MODSEQ (12))", b"Done"]
+        )
+        imap.uid.reset_mock()
+        imap.uid.return_value = changed
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            messages, total = await client.get_messages(
+                page=1, page_size=10, unread_only=True
+            )
+
+        # UIDNEXT is unchanged, so no new messages are fetched.
+        imap.uid.assert_awaited_once_with(
+            "fetch", "1:*", "(UID FLAGS) (CHANGEDSINCE 10)"
+        )
+        assert total == 2
+        assert [m.uid for m in messages] == ["3", "1"]
+
+    @pytest.mark.asyncio
+    async def test_qresync_applies_vanished(self, mock_account_settings):
+        """A QRESYNC SELECT reports expunged UIDs and flag changes inline."""
+        imap = self.imap_with({"CONDSTORE", "QRESYNC"})
+        client = mail.EmailClient(mock_account_settings)
+        await self.initial_sync(client, imap)
+
+        imap.examine.return_value = self.select_response(
+            15,
+            exists=2,
+            extra=[
+                b"VANISHED (EARLIER) 1",
+                b"3 FETCH (UID 3 FLAGS (\\Seen) MODSEQ (15))",
+            ],
+        )
+        imap.uid.return_value = self.summary_lines(3)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            messages, total = await client.get_messages(page=1, page_size=10)
+
+        imap.examine.assert_awaited_with("INBOX (QRESYNC (42 10))")
+        assert total == 2
+        assert [(m.uid, m.is_read) for m in messages] == [("3", True), ("2", False)]
+
+
+class TestSearchMessages:
+    """Test the search_messages tool."""
+
+    @pytest.mark.asyncio
+    async def test_search_messages_success(
+        self, mock_account_settings, mock_email_message
+    ):
+        """Test that ranked matches are returned."""
+        with (
+            patch(
+                "universal_email_mcp.tools.mail.get_account_settings",
+                return_value=mock_account_settings,
+            ),
+            patch("universal_email_mcp.tools.mail.EmailClient") as mock_client_class,
+        ):
+
+            mock_client = mock_client_class.return_value.__aenter__.return_value
+            mock_client.search_messages = AsyncMock(return_value=[mock_email_message])
+
+            input_data = models.SearchMessagesInput(
+                account_name="test_account", query='"test email"'
+            )
+            result = await mail.search_messages(input_data)
+
+            assert result.messages == [mock_email_message]
+            mock_client.search_messages.assert_called_once_with(
+                '"test email"', "INBOX", 20
+            )
+
+    @pytest.mark.asyncio
+    async def test_search_requires_metadata_store(
+        self, mock_account_settings, monkeypatch
+    ):
+        """Without a metadata database there is no index to search."""
+        monkeypatch.delenv(store.METADATA_DB_ENV, raising=False)
+        client = mail.EmailClient(mock_account_settings)
+
+        with pytest.raises(ValueError, match=store.METADATA_DB_ENV):
+            await client.search_messages("anything")
+
+
+class TestGetMessageByUid:
+    """Test UID FETCH and caching in EmailClient.get_message_by_uid."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.message_cache.clear()
+        yield
+        cache.message_cache.clear()
+
+    @staticmethod
+    def imap_with_message(uid=b"77"):
+        raw = b"Subject: Cached\r\nFrom: a@example.com\r\n\r\nHello"
+        imap = AsyncMock()
+        imap.select.return_value = imap.examine.return_value = MagicMock(
+            result="OK", lines=[b"OK [UIDVALIDITY 42] UIDs valid", b"SELECT completed"]
+        )
+        imap.uid.return_value = MagicMock(
+            result="OK",
+            lines=[
+                b"3 FETCH (UID %s FLAGS () BODY[] {%d}" % (uid, len(raw)),
+                bytearray(raw),
+                b")",
+                b"Fetch done",
+            ],
+        )
+        return imap
+
+    @pytest.mark.asyncio
+    async def test_second_read_served_from_cache(self, mock_account_settings):
+        """A repeated get_message for the same UID does not touch the server."""
+        imap = self.imap_with_message()
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            first = await client.get_message_by_uid("77")
+            second = await client.get_message_by_uid("77")
+
+        assert first.body == second.body == "Hello"
+        assert imap.uid.call_args[0][:2] == ("fetch", "77")
+        assert "BODY.PEEK[]" in imap.uid.call_args[0][2]
+        imap.uid.assert_awaited_once()
+        imap.examine.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_mark_updates_cached_flags(self, mock_account_settings):
+        """UID STORE adds \\Seen and the cached copy reflects it."""
+        imap = self.imap_with_message()
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            await client.get_message_by_uid("77")
+            imap.uid.return_value = MagicMock(result="OK", lines=[b"Store done"])
+            await client.mark_message("77", True)
+            cached = await client.get_message_by_uid("77")
+
+        imap.uid.assert_awaited_with("store", "77", "+FLAGS.SILENT", "(\\Seen)")
+        assert cached.is_read is True
+
+
+class TestGetMessagesByUid:
+    """Test bulk fetching of full messages."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        cache.message_cache.clear()
+        yield
+        cache.message_cache.clear()
+
+    @staticmethod
+    def raw(uid, body_size=10):
+        return b"Subject: Message %d\r\nFrom: a@example.com\r\n\r\n%s" % (
+            uid,
+            b"x" * body_size,
+        )
+
+    def imap_with(self, bodies):
+        async def uid(command, uid_set, items):
+            wanted = [int(u) for u in mail.imap_utils.expand_message_set(uid_set)]
+            lines = []
+            for number in wanted:
+                raw = bodies[number]
+                if items == "(UID RFC822.SIZE)":
+                    lines.append(
+                        b"%d FETCH (UID %d RFC822.SIZE %d)" % (number, number, len(raw))
+                    )
+                else:
+                    lines += [
+                        b"%d FETCH (UID %d FLAGS () BODY[] {%d}"
+                        % (number, number, len(raw)),
+                        bytearray(raw),
+                        b")",
+                    ]
+            return MagicMock(result="OK", lines=lines + [b"Fetch done"])
+
+        imap = AsyncMock()
+        imap.examine.return_value = MagicMock(
+            result="OK", lines=[b"OK [UIDVALIDITY 42] UIDs valid", b"EXAMINE completed"]
+        )
+        imap.uid.side_effect = uid
+        return imap
+
+    @pytest.mark.asyncio
+    async def test_one_fetch_for_all_uncached(self, mock_account_settings):
+        imap = self.imap_with({1: self.raw(1), 2: self.raw(2), 3: self.raw(3)})
+        streamed = []
+
+        async def on_message(message):
+            streamed.append(message.uid)
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            await client.get_messages_by_uid(["2"])
+            messages, skipped = await client.get_messages_by_uid(
+                ["3", "1", "2"], on_message=on_message
+            )
+
+        assert [m.uid for m in messages] == ["3", "1", "2"]
+        assert skipped == []
+        assert sorted(streamed) == ["1", "2", "3"]
+        assert [c.args[1] for c in imap.uid.await_args_list] == ["2", "1,3"]
+
+    @pytest.mark.asyncio
+    async def test_size_budget_skips_large_messages(self, mock_account_settings):
+        imap = self.imap_with({1: self.raw(1), 2: self.raw(2, 5000), 3: self.raw(3)})
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            messages, skipped = await client.get_messages_by_uid(
+                ["1", "2", "3"], max_total_bytes=1000
+            )
+
+        assert [m.uid for m in messages] == ["1", "3"]
+        assert skipped == ["2"]
+        assert imap.uid.await_args_list[-1].args[1:] == (
+            "1,3",
+            "(UID FLAGS BODY.PEEK[])",
+        )
+
+
+class TestDownloadAttachment:
+    """Test ranged, resumable attachment downloads."""
+
+    PAYLOAD = bytes(range(256)) * 64
+
+    def imap_serving(self, fail_after=None):
+        """An IMAP mock answering BODYSTRUCTURE and ranged BODY.PEEK[2] fetches."""
+        encoded = base64.encodebytes(self.PAYLOAD).replace(b"\n", b"\r\n")
+        structure = (
+            b'(("TEXT" "PLAIN" NIL NIL NIL "7BIT" 4 1)'
+            b'("APPLICATION" "OCTET-STREAM" NIL NIL NIL "BASE64" %d NIL'
+            b' ("ATTACHMENT" ("FILENAME" "data.bin")) NIL) "MIXED")' % len(encoded)
+        )
+        ranges = []
+
+        async def uid(command, uid_set, items):
+            if "BODYSTRUCTURE" in items:
+                return MagicMock(
+                    result="OK",
+                    lines=[
+                        b"1 FETCH (UID 7 BODYSTRUCTURE %s)" % structure,
+                        b"Fetch done",
+                    ],
+                )
+            if fail_after is not None and len(ranges) >= fail_after:
+                raise ConnectionError("connection lost")
+            offset, length = map(int, re.search(r"<(\d+)\.(\d+)>", items).groups())
+            ranges.append(offset)
+            chunk = encoded[offset : offset + length]
+            return MagicMock(
+                result="OK",
+                lines=[
+                    b"1 FETCH (UID 7 BODY[2]<%d> {%d}" % (offset, len(chunk)),
+                    bytearray(chunk),
+                    b")",
+                    b"Fetch done",
+                ],
+            )
+
+        imap = AsyncMock()
+        imap.examine.return_value = MagicMock(
+            result="OK", lines=[b"OK [UIDVALIDITY 42] UIDs valid", b"EXAMINE completed"]
+        )
+        imap.uid.side_effect = uid
+        return imap, ranges
+
+    @pytest.mark.asyncio
+    async def test_streams_in_chunks_and_resumes(
+        self, mock_account_settings, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(mail.attachments, "ATTACHMENT_CHUNK_BYTES", 4000)
+
+        imap, ranges = self.imap_serving(fail_after=2)
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            with pytest.raises(ConnectionError):
+                await client.download_attachment("7", directory=tmp_path)
+        assert ranges == [0, 4000]
+        assert not (tmp_path / "data.bin").exists()
+
+        imap, ranges = self.imap_serving()
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            result = await client.download_attachment("7", directory=tmp_path)
+
+        assert ranges[0] == 8000
+        assert result.resumed is True
+        assert (result.section, result.filename, result.content_type) == (
+            "2",
+            "data.bin",
+            "application/octet-stream",
+        )
+        assert result.size == len(self.PAYLOAD)
+        assert (tmp_path / "data.bin").read_bytes() == self.PAYLOAD
+        assert list(tmp_path.iterdir()) == [tmp_path / "data.bin"]
+
+    @pytest.mark.asyncio
+    async def test_file_writes_leave_the_event_loop(
+        self, mock_account_settings, tmp_path
+    ):
+        """Chunks and resume state are written from the blocking I/O threads."""
+        threads = []
+        write = mail.attachments.ResumableDownload.write
+
+        def recording_write(download, *args):
+            threads.append(threading.current_thread())
+            write(download, *args)
+
+        imap, _ = self.imap_serving()
+        client = mail.EmailClient(mock_account_settings)
+        with (
+            patch.object(client, "_get_imap_client", return_value=imap),
+            patch.object(mail.attachments.ResumableDownload, "write", recording_write),
+        ):
+            await client.download_attachment("7", directory=tmp_path)
+
+        assert threads and threading.main_thread() not in threads
+
+    @pytest.mark.asyncio
+    async def test_unknown_attachment(self, mock_account_settings, tmp_path):
+        imap, _ = self.imap_serving()
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            with pytest.raises(ValueError, match="No attachment"):
+                await client.download_attachment(
+                    "7", attachment="other.pdf", directory=tmp_path
+                )
+
+
+class TestMarkMessages:
+    """Test bulk flag changes with a single UID STORE."""
+
+    @staticmethod
+    def imap_with(capabilities, store_lines=(b"STORE completed",)):
+        imap = AsyncMock()
+        imap.has_capability = MagicMock(side_effect=lambda name: name in capabilities)
+        imap.protocol = MagicMock()
+        imap.select.return_value = MagicMock(
+            result="OK",
+            lines=[
+                b"OK [UIDVALIDITY 42] UIDs valid",
+                b"OK [HIGHESTMODSEQ 9000] Highest",
+                b"SELECT completed",
+            ],
+        )
+        imap.uid.return_value = MagicMock(result="OK", lines=list(store_lines))
+        return imap
+
+    @pytest.mark.asyncio
+    async def test_conditional_store_over_uid_set(self, mock_account_settings):
+        imap = self.imap_with(
+            ("CONDSTORE",), [b"OK [MODIFIED 7] Conditional STORE failed"]
+        )
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            skipped = await client.mark_messages(
+                ["5", "6", "7", "10:12"], ["\\Seen", "\\Flagged"], unchanged_since=9000
+            )
+
+        imap.select.assert_awaited_once_with("INBOX")
+        imap.uid.assert_awaited_once_with(
+            "store",
+            "5:7,10:12",
+            "(UNCHANGEDSINCE 9000)",
+            "+FLAGS.SILENT",
+            "(\\Seen \\Flagged)",
+        )
+        assert skipped == [7]
+
+    @pytest.mark.asyncio
+    async def test_store_is_unconditional_without_unchanged_since(
+        self, mock_account_settings
+    ):
+        """No guard is invented from a SELECT taken just before the STORE."""
+        imap = self.imap_with(("CONDSTORE",))
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            await client.mark_messages(["5"], ["\\Flagged"])
+
+        imap.select.assert_awaited_once_with("INBOX")
+        imap.uid.assert_awaited_once_with("store", "5", "+FLAGS.SILENT", "(\\Flagged)")
+
+    @pytest.mark.asyncio
+    async def test_plain_store_updates_local_read_state(
+        self, mock_account_settings, tmp_path
+    ):
+        metadata = store.MetadataStore(tmp_path / "metadata.db")
+        imap = self.imap_with(())
+
+        client = mail.EmailClient(mock_account_settings)
+        with (
+            patch.object(client, "_get_imap_client", return_value=imap),
+            patch.object(store, "get_metadata_store", return_value=metadata),
+            patch.object(metadata, "set_read_ranges") as set_read_ranges,
+        ):
+            skipped = await client.mark_messages(
+                ["3", "1:2"], ["\\Seen"], action="remove"
+            )
+
+        imap.select.assert_awaited_once_with("INBOX")
+        imap.uid.assert_awaited_once_with("store", "3,1:2", "-FLAGS.SILENT", "(\\Seen)")
+        set_read_ranges.assert_called_once_with(
+            "test_account", "INBOX", [(3, 3), (1, 2)], False
+        )
+        assert skipped == []
+        metadata.close()
+
+    @pytest.mark.asyncio
+    async def test_huge_range_is_not_expanded(self, mock_account_settings, tmp_path):
+        """Only messages known locally are touched by a range covering every UID."""
+        metadata = store.MetadataStore(tmp_path / "metadata.db")
+        metadata.upsert_messages(
+            "test_account",
+            "INBOX",
+            [
+                (
+                    models.EmailMessage(
+                        uid=str(uid),
+                        subject="s",
+                        sender="a@example.com",
+                        date=datetime.now(),
+                        body="",
+                    ),
+                    [],
+                    1,
+                )
+                for uid in (5, 7, 9)
+            ],
+        )
+        imap = self.imap_with(
+            ("CONDSTORE",), [b"OK [MODIFIED 7] Conditional STORE failed"]
+        )
+
+        client = mail.EmailClient(mock_account_settings)
+        with (
+            patch.object(client, "_get_imap_client", return_value=imap),
+            patch.object(store, "get_metadata_store", return_value=metadata),
+            patch.object(
+                mail.imap_utils,
+                "expand_message_set",
+                wraps=mail.imap_utils.expand_message_set,
+            ) as expand,
+        ):
+            skipped = await client.mark_messages(
+                ["1:4000000000"], ["\\Seen"], unchanged_since=9000
+            )
+
+        # Only the server's MODIFIED set is expanded, never the caller's range.
+        assert [call.args for call in expand.call_args_list] == [("7",)]
+        assert skipped == [7]
+        messages, _ = metadata.search("test_account", "INBOX")
+        assert sorted((int(m.uid), m.is_read) for m in messages) == [
+            (5, True),
+            (7, False),
+            (9, True),
+        ]
+        metadata.close()
+
+    @pytest.mark.asyncio
+    async def test_rejects_malformed_input(self, mock_account_settings):
+        imap = self.imap_with(())
+
+        client = mail.EmailClient(mock_account_settings)
+        with patch.object(client, "_get_imap_client", return_value=imap):
+            with pytest.raises(ValueError, match="Invalid UID"):
+                await client.mark_messages(["1 OR 2"], ["\\Seen"])
+            with pytest.raises(ValueError, match="Invalid flag"):
+                await client.mark_messages(["1"], ["\\Seen) (x"])
+            with pytest.raises(ValueError, match="CONDSTORE"):
+                await client.mark_messages(["1"], ["\\Seen"], unchanged_since=5)
+
+        imap.uid.assert_not_awaited()
+
+
+class TestSelectTracking:
+    """Test that connections remember their selected mailbox."""
+
+    @pytest.mark.asyncio
+    async def test_redundant_select_is_skipped(self, mock_account_settings):
+        """Read-only calls EXAMINE once; a write upgrades to SELECT once."""
+        imap = AsyncMock()
+        imap.has_capability = MagicMock(return_value=False)
+        imap.select.return_value = imap.examine.return_value = MagicMock(
+            result="OK", lines=[b"OK [UIDVALIDITY 42] UIDs valid", b"done"]
+        )
+        imap.uid_search.return_value = MagicMock(result="OK", lines=[b"1 2", b"done"])
+        imap.uid.return_value = MagicMock(result="OK", lines=[b"done"])
+
+        client = mail.EmailClient(mock_account_settings)
+        client._imap_client = pool.PooledIMAPConnection(imap)
+
+        assert await client.get_message_count() == 2
+        assert await client.get_message_count() == 2
+        imap.examine.assert_awaited_once_with("INBOX")
+
+        await client.mark_message("1", True)
+        await client.mark_message("2", True)
+        await client.get_message_count()
+        imap.select.assert_awaited_once_with("INBOX")
+        imap.examine.assert_awaited_once()
+
+        await client.get_message_count(mailbox="Archive")
+        imap.examine.assert_awaited_with("Archive")
+
+
 class TestListMessages:
     """Test the list_messages tool."""
 
@@ -83,6 +884,7 @@ class TestListMessages:
                 # Setup mock client
                 mock_client = AsyncMock()
                 mock_client.get_messages.return_value = ([mock_email_message], 1)
+                mock_client.highest_modseq = MagicMock(return_value=9000)
                 mock_client_class.return_value.__aenter__.return_value = mock_client
 
                 input_data = models.ListMessagesInput(account_name="test_account")
@@ -95,6 +897,7 @@ class TestListMessages:
                 assert result.total_messages == 1
                 assert len(result.messages) == 1
                 assert result.messages[0].uid == "12345"
+                assert result.highestmodseq == 9000
 
     @pytest.mark.asyncio
     async def test_list_messages_with_filters(self, mock_account_settings):
@@ -103,6 +906,7 @@ class TestListMessages:
             with patch.object(mail, 'EmailClient') as mock_client_class:
                 mock_client = AsyncMock()
                 mock_client.get_messages.return_value = ([], 0)
+                mock_client.highest_modseq = MagicMock(return_value=None)
                 mock_client_class.return_value.__aenter__.return_value = mock_client
 
                 input_data = models.ListMessagesInput(
@@ -130,6 +934,94 @@ class TestListMessages:
 
             assert result.total_messages == 0
             assert len(result.messages) == 0
+            assert result.error == "Account not found"
+
+
+class TestMultiAccount:
+    """Test concurrent fan-out of list_messages and count_messages over accounts."""
+
+    @staticmethod
+    def settings_for(mock_account_settings):
+        def get(account_name):
+            if account_name == "broken":
+                raise ValueError(f"Account '{account_name}' not found")
+            return mock_account_settings.model_copy(
+                update={"account_name": account_name}
+            )
+
+        return get
+
+    @pytest.mark.asyncio
+    async def test_list_runs_concurrently_under_limit(
+        self, mock_account_settings, monkeypatch
+    ):
+        monkeypatch.setattr(mail, "ACCOUNT_CONCURRENCY", 2)
+        monkeypatch.setattr(mail, "_account_limit", None)
+        running, peak = 0, 0
+
+        async def get_messages(self, **kwargs):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return [], int(self.account_settings.account_name[1:])
+
+        with (
+            patch.object(
+                mail,
+                "get_account_settings",
+                side_effect=self.settings_for(mock_account_settings),
+            ),
+            patch.object(mail.EmailClient, "get_messages", get_messages),
+        ):
+            result = await mail.list_messages(
+                models.ListMessagesInput(
+                    account_name=["a1", "a2", "broken", "a4", "a5"]
+                )
+            )
+
+        assert isinstance(result, models.MultiAccountListMessagesOutput)
+        assert [r.account_name for r in result.results] == [
+            "a1",
+            "a2",
+            "broken",
+            "a4",
+            "a5",
+        ]
+        assert [r.total_messages for r in result.results] == [1, 2, 0, 4, 5]
+        assert result.results[2].error == "Account 'broken' not found"
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_count_all_accounts(self, mock_account_settings):
+        settings = config.Settings(
+            accounts=[
+                mock_account_settings.model_copy(update={"account_name": name})
+                for name in ("a", "b")
+            ]
+        )
+
+        with (
+            patch.object(config, "get_settings", return_value=settings),
+            patch.object(
+                mail,
+                "get_account_settings",
+                side_effect=self.settings_for(mock_account_settings),
+            ),
+            patch.object(
+                mail.EmailClient,
+                "get_message_count",
+                AsyncMock(side_effect=[3, ConnectionError("down")]),
+            ),
+        ):
+            result = await mail.count_messages(
+                models.CountMessagesInput(account_name="*", unread_only=True)
+            )
+
+        assert [
+            (r.account_name, r.total_messages, r.error) for r in result.results
+        ] == [("a", 3, None), ("b", None, "down")]
 
 
 class TestSendMessage:
@@ -207,6 +1099,200 @@ class TestSendMessage:
                 assert result.status == "error"
                 assert "SMTP Error" in result.details
 
+    @pytest.mark.asyncio
+    async def test_send_message_is_spooled(
+        self, mock_account_settings, tmp_path, monkeypatch
+    ):
+        """With a spool configured the message is queued instead of sent."""
+        monkeypatch.setenv(spool.SPOOL_DIR_ENV, str(tmp_path))
+        spool.reset_spool()
+        try:
+            with (
+                patch(
+                    "universal_email_mcp.tools.mail.get_account_settings",
+                    return_value=mock_account_settings,
+                ),
+                patch.object(pool, "get_smtp_pool") as get_smtp_pool,
+            ):
+                result = await mail.send_message(
+                    models.SendMessageInput(
+                        account_name="test_account",
+                        recipients=["recipient@example.com"],
+                        subject="Queued",
+                        body="Test body",
+                        bcc=["hidden@example.com"],
+                    )
+                )
+                status = await mail.get_send_status(
+                    models.GetSendStatusInput(queue_id=result.queue_id)
+                )
+
+            get_smtp_pool.assert_not_called()
+            assert result.status == "queued"
+            assert status.status == "queued"
+            assert status.recipients == ["recipient@example.com", "hidden@example.com"]
+            raw = spool.get_spool().message(result.queue_id)
+            assert b"Subject: Queued" in raw and b"hidden@example.com" not in raw
+        finally:
+            spool.reset_spool()
+
+    @pytest.mark.asyncio
+    async def test_spooled_message_keeps_its_queued_sender(self, mock_account_settings):
+        """A retry uses the envelope sender stored with the entry, not the current."""
+        client = AsyncMock()
+        client.deliver.return_value = {}
+        with (
+            patch.object(
+                mail,
+                "load_account_settings",
+                AsyncMock(return_value=mock_account_settings),
+            ),
+            patch.object(mail, "EmailClient") as client_class,
+        ):
+            client_class.return_value.__aenter__.return_value = client
+            await mail.deliver_spooled(
+                "test_account", b"raw", "old@example.com", ["to@example.com"]
+            )
+
+        client.deliver.assert_awaited_once_with(
+            b"raw", ["to@example.com"], "old@example.com"
+        )
+
+    @pytest.mark.asyncio
+    async def test_dropped_pooled_session_is_retried(self, mock_account_settings):
+        """A reused SMTP session the server dropped is replaced transparently."""
+        stale = pool.PooledSMTPConnection(MagicMock())
+        stale.last_used += 1
+        stale.client.supports_extension.return_value = False
+        stale.client.is_ehlo_or_helo_needed = False
+        stale.client.send_message = AsyncMock(
+            side_effect=aiosmtplib.SMTPServerDisconnected("gone")
+        )
+        fresh = pool.PooledSMTPConnection(MagicMock())
+        fresh.client.supports_extension.return_value = False
+        fresh.client.is_ehlo_or_helo_needed = False
+        fresh.client.send_message = AsyncMock(return_value=({}, "OK"))
+        smtp_pool = MagicMock()
+        smtp_pool.rate_limiter = pool.RateLimiter(0)
+        smtp_pool.acquire = AsyncMock(side_effect=[stale, fresh])
+        smtp_pool.release = AsyncMock()
+
+        with patch.object(pool, "get_smtp_pool", return_value=smtp_pool):
+            async with mail.EmailClient(mock_account_settings) as client:
+                await client.send_message(["to@example.com"], "Hi", "Body")
+
+        fresh.client.send_message.assert_awaited_once()
+        smtp_pool.release.assert_any_await(stale, discard=True)
+        smtp_pool.release.assert_any_await(fresh, discard=False)
+
+
+class TestSendMessages:
+    """Test the send_messages bulk tool."""
+
+    @pytest.mark.asyncio
+    async def test_mail_merge_reports_each_message(self, mock_account_settings):
+        """Each merge entry becomes one message; failures don't stop the rest."""
+        sent = []
+
+        async def send(self, recipients, subject, body, **kwargs):
+            if recipients == ["bad@example.com"]:
+                raise aiosmtplib.SMTPRecipientsRefused([])
+            sent.append((recipients, subject, body))
+            return {}
+
+        data = models.SendMessagesInput(
+            account_name="test_account",
+            template=models.MessageTemplate(
+                subject="Hi $name", body="Dear ${name}, see $email"
+            ),
+            merge=[
+                models.MergeRecipient(
+                    email="ann@example.com", variables={"name": "Ann"}
+                ),
+                models.MergeRecipient(
+                    email="bad@example.com", variables={"name": "Bad"}
+                ),
+                models.MergeRecipient(
+                    email="bob@example.com", variables={"name": "Bob"}
+                ),
+            ],
+        )
+        with (
+            patch(
+                "universal_email_mcp.tools.mail.get_account_settings",
+                return_value=mock_account_settings,
+            ),
+            patch.object(mail.EmailClient, "send_message", send),
+        ):
+            result = await mail.send_messages(data)
+
+        assert (result.sent, result.failed) == (2, 1)
+        assert [r.status for r in result.results] == ["success", "error", "success"]
+        assert (["ann@example.com"], "Hi Ann", "Dear Ann, see ann@example.com") in sent
+
+    @pytest.mark.asyncio
+    async def test_session_is_reset_after_a_failed_message(self, mock_account_settings):
+        """RSET follows a refused message; throttling precedes borrowing a session."""
+        events = []
+        conn = pool.PooledSMTPConnection(MagicMock())
+        conn.reset = AsyncMock(side_effect=lambda: events.append("reset") or True)
+        smtp_pool = MagicMock()
+        smtp_pool.rate_limiter.wait = AsyncMock(
+            side_effect=lambda: events.append("wait")
+        )
+        smtp_pool.acquire = AsyncMock(
+            side_effect=lambda: events.append("acquire") or conn
+        )
+        smtp_pool.release = AsyncMock()
+        replies = [aiosmtplib.SMTPSenderRefused(550, "denied", "me@example.com"), {}]
+
+        async def send_message(client, message, sender, recipients):
+            reply = replies.pop(0)
+            if isinstance(reply, Exception):
+                raise reply
+            return reply
+
+        data = models.SendMessagesInput(
+            account_name="test_account",
+            messages=[
+                models.OutgoingMessage(
+                    recipients=["a@example.com"], subject="1", body="x"
+                ),
+                models.OutgoingMessage(
+                    recipients=["b@example.com"], subject="2", body="y"
+                ),
+            ],
+        )
+        with (
+            patch(
+                "universal_email_mcp.tools.mail.get_account_settings",
+                return_value=mock_account_settings,
+            ),
+            patch.object(pool, "SMTP_POOL_SIZE", 1),
+            patch.object(pool, "get_smtp_pool", return_value=smtp_pool),
+            patch.object(mail.pipelining, "send_message", send_message),
+        ):
+            result = await mail.send_messages(data)
+
+        assert [r.status for r in result.results] == ["error", "success"]
+        assert events == ["wait", "acquire", "reset", "wait"]
+        smtp_pool.release.assert_awaited_once_with(conn, discard=False)
+
+    @pytest.mark.asyncio
+    async def test_missing_placeholder_is_rejected(self, mock_account_settings):
+        """A template variable without a value fails before anything is sent."""
+        data = models.SendMessagesInput(
+            account_name="test_account",
+            template=models.MessageTemplate(subject="Hi $name", body="Body"),
+            merge=[models.MergeRecipient(email="ann@example.com")],
+        )
+        with patch(
+            "universal_email_mcp.tools.mail.get_account_settings",
+            return_value=mock_account_settings,
+        ):
+            with pytest.raises(ValueError, match="name"):
+                await mail.send_messages(data)
+
 
 class TestGetMessage:
     """Test the get_message tool."""
@@ -0,0 +1,75 @@
+"""Tests for inline and process-pool MIME parsing."""
+
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from universal_email_mcp import parsing
+
+MULTIPART = (
+    b"Subject: Report\r\nFrom: a@example.com\r\n"
+    b"Date: Mon, 01 Jan 2024 10:00:00 +0000\r\n"
+    b"MIME-Version: 1.0\r\nContent-Type: multipart/mixed; boundary=b1\r\n\r\n"
+    b"--b1\r\nContent-Type: text/plain\r\nContent-Transfer-Encoding: base64\r\n\r\n"
+    b"SGVsbG8gd29ybGQ=\r\n--b1\r\nContent-Type: application/pdf\r\n"
+    b"Content-Disposition: attachment; filename=r.pdf\r\n\r\nxx\r\n--b1--\r\n"
+)
+
+
+class TestParseMessage:
+    """Test routing between the inline path and the worker pool."""
+
+    @pytest.mark.asyncio
+    async def test_small_message_parsed_inline(self):
+        with patch.object(parsing, "_get_executor") as get_executor:
+            fields = await parsing.parse_message(MULTIPART)
+
+        get_executor.assert_not_called()
+        assert fields["subject"] == "Report"
+        assert fields["body"] == "Hello world"
+        assert fields["has_attachments"] is True
+        assert fields["date"].year == 2024
+        assert fields["attachments"] == [
+            {
+                "section": "2",
+                "filename": "r.pdf",
+                "content_type": "application/pdf",
+                "size": 2,
+            }
+        ]
+
+    @pytest.mark.asyncio
+    async def test_alternative_parts_are_not_attachments(self):
+        raw = (
+            b"Subject: Hi\r\nContent-Type: multipart/alternative; boundary=b1\r\n\r\n"
+            b"--b1\r\nContent-Type: text/plain\r\n\r\nHi\r\n"
+            b"--b1\r\nContent-Type: text/html\r\n\r\n<p>Hi</p>\r\n--b1--\r\n"
+        )
+        assert (await parsing.parse_message(raw))["has_attachments"] is False
+
+    @pytest.mark.asyncio
+    async def test_large_message_parsed_in_worker(self, monkeypatch):
+        monkeypatch.setattr(parsing, "PARSE_INLINE_MAX_BYTES", 16)
+        try:
+            fields = await parsing.parse_message(MULTIPART)
+        finally:
+            parsing.shutdown()
+
+        assert fields == parsing.parse_raw_message(MULTIPART)
+
+    @pytest.mark.asyncio
+    async def test_dead_worker_is_reported_and_pool_replaced(self, monkeypatch):
+        monkeypatch.setattr(parsing, "PARSE_INLINE_MAX_BYTES", 16)
+        broken = Future()
+        broken.set_exception(BrokenProcessPool("worker killed"))
+        executor = MagicMock()
+        executor.submit.return_value = broken
+        monkeypatch.setattr(parsing, "_executor", executor)
+
+        with pytest.raises(ValueError, match="resource limits"):
+            await parsing.parse_message(MULTIPART)
+
+        executor.shutdown.assert_called_once()
+        assert parsing._executor is None
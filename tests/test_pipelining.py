@@ -0,0 +1,129 @@
+"""Tests for SMTP PIPELINING against a minimal in-process server."""
+
+import asyncio
+from email.mime.text import MIMEText
+from unittest.mock import patch
+
+import aiosmtplib
+import pytest
+
+from universal_email_mcp import pipelining
+
+
+class FakeSMTPServer:
+    """Speaks just enough SMTP; replies to a pipelined batch arrive in one write."""
+
+    def __init__(self, pipelining: bool = True):
+        self.pipelining = pipelining
+        self.commands: list[bytes] = []
+        self.messages: list[bytes] = []
+
+    async def handle(self, reader, writer):
+        writer.write(b"220 fake ready\r\n")
+        while line := await reader.readline():
+            self.commands.append(line.rstrip())
+            verb = line[:4].upper()
+            if verb == b"EHLO":
+                extensions = b"250-PIPELINING\r\n" if self.pipelining else b""
+                writer.write(b"250-fake\r\n" + extensions + b"250 8BITMIME\r\n")
+            elif verb == b"RCPT" and b"refused" in line:
+                writer.write(b"550 no such user\r\n")
+            elif verb == b"DATA":
+                writer.write(b"354 go ahead\r\n")
+                await writer.drain()
+                content = b""
+                while (data_line := await reader.readline()) != b".\r\n":
+                    content += data_line
+                self.messages.append(content)
+                writer.write(b"250 queued\r\n")
+            elif verb == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                break
+            else:
+                writer.write(b"250 OK\r\n")
+            await writer.drain()
+        writer.close()
+
+
+@pytest.fixture
+async def smtp_server():
+    """Start a FakeSMTPServer and connect an aiosmtplib client to it."""
+
+    async def start(server: FakeSMTPServer):
+        listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        client = aiosmtplib.SMTP(
+            hostname="127.0.0.1", port=port, use_tls=False, start_tls=False
+        )
+        await client.connect()
+        listeners.append((listener, client))
+        return client
+
+    listeners = []
+    yield start
+    for listener, client in listeners:
+        if client.is_connected:
+            await client.quit()
+        listener.close()
+        await listener.wait_closed()
+
+
+def make_message(body: str = "Hello") -> MIMEText:
+    msg = MIMEText(body)
+    msg["From"] = "me@example.com"
+    msg["Subject"] = "Test"
+    return msg
+
+
+@pytest.mark.asyncio
+async def test_envelope_is_pipelined(smtp_server):
+    """MAIL, RCPT and DATA travel together and refused recipients are reported."""
+    server = FakeSMTPServer()
+    client = await smtp_server(server)
+
+    await client.ehlo()
+    with patch.object(client.protocol, "write", wraps=client.protocol.write) as write:
+        refused = await pipelining.send_message(
+            client,
+            make_message(".leading dot"),
+            "me@example.com",
+            ["a@example.com", "refused@example.com", "b@example.com"],
+        )
+
+    # One write for the envelope, one for the content.
+    assert write.call_count == 2
+    assert list(refused) == ["refused@example.com"]
+    assert refused["refused@example.com"].code == 550
+    assert b"\r\n..leading dot\r\n" in server.messages[0]
+
+    # The session is still in step with the server afterwards.
+    assert (await client.noop()).code == 250
+
+
+@pytest.mark.asyncio
+async def test_all_recipients_refused(smtp_server):
+    """DATA is completed empty and SMTPRecipientsRefused raised."""
+    server = FakeSMTPServer()
+    client = await smtp_server(server)
+
+    with pytest.raises(aiosmtplib.SMTPRecipientsRefused):
+        await pipelining.send_message(
+            client, make_message(), "me@example.com", ["refused@example.com"]
+        )
+
+    assert server.messages == [b""]
+    assert (await client.noop()).code == 250
+
+
+@pytest.mark.asyncio
+async def test_without_pipelining_falls_back(smtp_server):
+    """Servers not advertising PIPELINING get one command at a time."""
+    server = FakeSMTPServer(pipelining=False)
+    client = await smtp_server(server)
+
+    refused = await pipelining.send_message(
+        client, make_message(), "me@example.com", ["a@example.com"]
+    )
+
+    assert refused == {}
+    assert len(server.messages) == 1
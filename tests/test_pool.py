@@ -0,0 +1,236 @@
+"""Tests for the IMAP and SMTP connection pools."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from universal_email_mcp import config, pool
+
+
+@pytest.fixture
+def account_settings():
+    """Account settings for pool tests."""
+    server = config.EmailServer(
+        user_name="testuser",
+        password="testpass",
+        host="imap.example.com",
+        port=993
+    )
+    return config.EmailSettings(
+        account_name="pool_account",
+        full_name="Test User",
+        email_address="test@example.com",
+        incoming=server,
+        outgoing=server
+    )
+
+
+def make_imap_client(noop_result="OK"):
+    """Create a mock aioimaplib client."""
+    client = MagicMock()
+    client.noop = AsyncMock(return_value=MagicMock(result=noop_result))
+    client.logout = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def connect_imap():
+    """Patch connect_imap to hand out fresh mock clients."""
+    with patch.object(pool, "connect_imap", new_callable=AsyncMock) as mock_connect:
+        mock_connect.side_effect = lambda incoming: make_imap_client()
+        yield mock_connect
+
+
+class TestIMAPConnectionPool:
+    """Test borrow/return semantics of IMAPConnectionPool."""
+
+    @pytest.mark.asyncio
+    async def test_connection_is_reused(self, account_settings, connect_imap):
+        """A returned connection is lent out again without reconnecting."""
+        imap_pool = pool.IMAPConnectionPool(account_settings)
+
+        conn = await imap_pool.acquire()
+        await imap_pool.release(conn)
+        again = await imap_pool.acquire()
+
+        assert again is conn
+        assert connect_imap.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_pool_is_bounded(self, account_settings, connect_imap):
+        """Borrowers wait once max_size connections are out."""
+        imap_pool = pool.IMAPConnectionPool(account_settings, max_size=1)
+
+        conn = await imap_pool.acquire()
+        waiter = asyncio.ensure_future(imap_pool.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        await imap_pool.release(conn)
+        assert await waiter is conn
+        assert imap_pool.size == 1
+
+    @pytest.mark.asyncio
+    async def test_unhealthy_connection_is_replaced(
+        self, account_settings, connect_imap
+    ):
+        """A connection failing NOOP is logged out and replaced."""
+        imap_pool = pool.IMAPConnectionPool(account_settings, health_check_interval=0)
+
+        conn = await imap_pool.acquire()
+        conn.client.noop.return_value = MagicMock(result="BAD")
+        await imap_pool.release(conn)
+
+        replacement = await imap_pool.acquire()
+
+        assert replacement is not conn
+        conn.client.logout.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_idle_connection_is_recycled(self, account_settings, connect_imap):
+        """Connections idle past idle_timeout are logged out."""
+        imap_pool = pool.IMAPConnectionPool(account_settings, idle_timeout=0)
+
+        conn = await imap_pool.acquire()
+        await imap_pool.release(conn)
+        replacement = await imap_pool.acquire()
+
+        assert replacement is not conn
+        conn.client.logout.assert_awaited_once()
+        conn.client.noop.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_connection_with_mailbox_selected_is_preferred(
+        self, account_settings, connect_imap
+    ):
+        """acquire(mailbox) routes to the idle connection that has it open."""
+        imap_pool = pool.IMAPConnectionPool(account_settings)
+
+        inbox = await imap_pool.acquire()
+        other = await imap_pool.acquire()
+        inbox.selected_mailbox = "INBOX"
+        other.selected_mailbox = "Archive"
+        await imap_pool.release(inbox)
+        await imap_pool.release(other)
+
+        assert await imap_pool.acquire("INBOX") is inbox
+        assert await imap_pool.acquire("Sent") is other
+
+    @pytest.mark.asyncio
+    async def test_discarded_connection_is_not_reused(
+        self, account_settings, connect_imap
+    ):
+        """release(discard=True) logs the connection out."""
+        imap_pool = pool.IMAPConnectionPool(account_settings)
+
+        conn = await imap_pool.acquire()
+        await imap_pool.release(conn, discard=True)
+
+        assert imap_pool.size == 0
+        conn.client.logout.assert_awaited_once()
+
+
+def make_smtp_client(noop_code=250, rset_code=250):
+    """Create a mock aiosmtplib client."""
+    client = MagicMock()
+    client.is_connected = True
+    client.noop = AsyncMock(return_value=MagicMock(code=noop_code))
+    client.rset = AsyncMock(return_value=MagicMock(code=rset_code))
+    client.quit = AsyncMock()
+    return client
+
+
+@pytest.fixture
+def connect_smtp():
+    """Patch connect_smtp to hand out fresh mock clients."""
+    with patch.object(pool, "connect_smtp", new_callable=AsyncMock) as mock_connect:
+        mock_connect.side_effect = lambda outgoing: make_smtp_client()
+        yield mock_connect
+
+
+class TestSMTPConnectionPool:
+    """Test session reuse in SMTPConnectionPool."""
+
+    @pytest.mark.asyncio
+    async def test_session_is_reset_and_reused(self, account_settings, connect_smtp):
+        """A returned session is RSET and lent out again without a new login."""
+        smtp_pool = pool.SMTPConnectionPool(account_settings)
+
+        conn = await smtp_pool.acquire()
+        await smtp_pool.release(conn)
+        again = await smtp_pool.acquire()
+
+        assert again is conn
+        conn.client.rset.assert_awaited_once()
+        assert connect_smtp.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_session_refusing_rset_is_closed(
+        self, account_settings, connect_smtp
+    ):
+        """A session that fails RSET is not put back in the pool."""
+        smtp_pool = pool.SMTPConnectionPool(account_settings)
+
+        conn = await smtp_pool.acquire()
+        conn.client.rset.return_value = MagicMock(code=421)
+        await smtp_pool.release(conn)
+
+        assert smtp_pool.size == 0
+        conn.client.quit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_dropped_session_is_replaced(self, account_settings, connect_smtp):
+        """An idle session that fails NOOP is replaced by a new login."""
+        smtp_pool = pool.SMTPConnectionPool(account_settings, health_check_interval=0)
+
+        conn = await smtp_pool.acquire()
+        await smtp_pool.release(conn)
+        conn.client.noop.side_effect = ConnectionResetError()
+
+        replacement = await smtp_pool.acquire()
+
+        assert replacement is not conn
+        assert connect_smtp.await_count == 2
+
+
+class TestPoolRegistry:
+    """Test the process-wide pool registry."""
+
+    @pytest.mark.asyncio
+    async def test_pool_shared_per_account(self, account_settings):
+        """The same account always maps to the same pool."""
+        try:
+            imap_pool = pool.get_imap_pool(account_settings)
+            assert pool.get_imap_pool(account_settings) is imap_pool
+        finally:
+            await pool.close_all_pools()
+
+    @pytest.mark.asyncio
+    async def test_changed_settings_replace_pool(self, account_settings):
+        """New credentials for an account retire the old pool."""
+        try:
+            old_pool = pool.get_imap_pool(account_settings)
+            incoming = account_settings.incoming.model_copy(update={"password": "new"})
+            changed = account_settings.model_copy(update={"incoming": incoming})
+            new_pool = pool.get_imap_pool(changed)
+            await asyncio.sleep(0)
+
+            assert new_pool is not old_pool
+            assert old_pool.closed
+        finally:
+            await pool.close_all_pools()
+
+    @pytest.mark.asyncio
+    async def test_close_pool_closes_smtp_sessions(
+        self, account_settings, connect_smtp
+    ):
+        """close_pool logs out the account's idle SMTP sessions too."""
+        smtp_pool = pool.get_smtp_pool(account_settings)
+        conn = await smtp_pool.acquire()
+        await smtp_pool.release(conn)
+
+        await pool.close_pool(account_settings.account_name)
+
+        assert smtp_pool.closed
+        conn.client.quit.assert_awaited_once()
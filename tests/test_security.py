@@ -0,0 +1,68 @@
+"""Tests for lazy key material and keyring access."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from cryptography.fernet import Fernet
+
+from universal_email_mcp import config, security
+
+
+def test_import_touches_neither_keyring_nor_filesystem(tmp_path):
+    """Starting the server modules reads no keys and creates no files."""
+    code = (
+        "import sys\n"
+        "import universal_email_mcp.server, universal_email_mcp.security\n"
+        "import universal_email_mcp.stdio_main\n"
+        "assert 'keyring' not in sys.modules\n"
+    )
+    src = Path(security.__file__).parents[1]
+    env = {**os.environ, "HOME": str(tmp_path), "PYTHONPATH": str(src)}
+    subprocess.run([sys.executable, "-c", code], env=env, check=True, cwd=tmp_path)
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_secure_config_is_created_on_first_access():
+    with (
+        patch.object(security, "_secure_config", None),
+        patch.object(security, "SecureConfigManager") as manager,
+    ):
+        assert security.secure_config is security.secure_config
+    manager.assert_called_once_with()
+
+
+def test_master_key_is_fetched_once_per_process():
+    """Every SecureStore shares the cipher created from the first keyring lookup."""
+    key = Fernet.generate_key().decode()
+    with (
+        patch.object(security.SecureStore, "_cipher_suite", None),
+        patch("keyring.get_password", return_value=key) as get_password,
+    ):
+        first, second = security.SecureStore(), security.SecureStore()
+        get_password.assert_not_called()
+
+        assert second.decrypt_data(first.encrypt_data("secret")) == "secret"
+    get_password.assert_called_once()
+
+
+def test_config_key_is_resolved_on_first_use(tmp_path):
+    """SecureConfigStore looks up its key when it first encrypts, then never again."""
+    key = Fernet.generate_key()
+    with (
+        patch.object(config, "CONFIG_PATH", tmp_path / "config.toml"),
+        patch.object(config.SecureConfigStore, "_keys", {}),
+        patch.object(
+            config.SecureConfigStore, "_setup_encryption_key", autospec=True
+        ) as setup,
+    ):
+        setup.side_effect = lambda store: setattr(store, "_encryption_key", key)
+        stores = [config.SecureConfigStore() for _ in range(3)]
+        setup.assert_not_called()
+
+        encrypted = stores[0].encrypt_data({"a": 1})
+        assert [store.decrypt_data(encrypted) for store in stores] == [{"a": 1}] * 3
+    setup.assert_called_once()
@@ -0,0 +1,138 @@
+"""Tests for the outbound spool and its delivery worker."""
+
+import asyncio
+import json
+import time
+from unittest.mock import AsyncMock, patch
+
+import aiosmtplib
+import pytest
+
+from universal_email_mcp import spool
+
+
+@pytest.fixture
+def outbound(tmp_path):
+    """A spool in a temporary directory."""
+    return spool.Spool(tmp_path / "spool")
+
+
+def test_enqueue_writes_message_and_state(outbound):
+    """A queued message is on disk with its envelope before enqueue returns."""
+    queue_id = outbound.enqueue(
+        "work", b"Subject: hi\r\n\r\nbody", "me@example.com", ["a@example.com"]
+    )
+
+    assert outbound.message(queue_id) == b"Subject: hi\r\n\r\nbody"
+    state = json.loads((outbound.path / f"{queue_id}.json").read_text())
+    assert state["status"] == spool.QUEUED
+    assert state["recipients"] == ["a@example.com"]
+    assert not list(outbound.path.glob("*.tmp"))
+
+
+def test_unknown_or_malformed_ids(outbound):
+    """get() never reads outside the spool directory."""
+    assert outbound.get("0" * 32) is None
+    assert outbound.get("../secrets") is None
+
+
+@pytest.mark.asyncio
+async def test_worker_delivers_and_forgets_message(outbound):
+    """A delivered entry is marked sent and its message file removed."""
+    deliver = AsyncMock(return_value={"b@example.com": "no such user"})
+    queue_id = outbound.enqueue(
+        "work", b"raw", "me@example.com", ["a@example.com", "b@example.com"]
+    )
+
+    await spool.SpoolWorker(outbound, deliver).deliver_due()
+
+    deliver.assert_awaited_once_with(
+        "work", b"raw", "me@example.com", ["a@example.com", "b@example.com"]
+    )
+    state = outbound.get(queue_id)
+    assert state["status"] == spool.SENT
+    assert state["refused"] == {"b@example.com": "no such user"}
+    assert not (outbound.path / f"{queue_id}.eml").exists()
+
+
+@pytest.mark.asyncio
+async def test_transient_failure_is_retried_with_backoff(outbound):
+    """A dropped connection requeues the entry for later."""
+    deliver = AsyncMock(side_effect=aiosmtplib.SMTPServerDisconnected("gone"))
+    queue_id = outbound.enqueue("work", b"raw", "me@example.com", ["a@example.com"])
+
+    await spool.SpoolWorker(outbound, deliver).deliver_due()
+
+    state = outbound.get(queue_id)
+    assert state["status"] == spool.QUEUED
+    assert state["attempts"] == 1
+    assert state["next_attempt"] >= time.time() + spool.SPOOL_RETRY_BASE_SECONDS - 1
+    assert outbound.due() == []
+
+
+@pytest.mark.asyncio
+async def test_permanent_failure_is_not_retried(outbound):
+    """A 5xx reply fails the entry at once."""
+    deliver = AsyncMock(
+        side_effect=aiosmtplib.SMTPSenderRefused(550, "denied", "me@example.com")
+    )
+    queue_id = outbound.enqueue("work", b"raw", "me@example.com", ["a@example.com"])
+
+    await spool.SpoolWorker(outbound, deliver).deliver_due()
+
+    state = outbound.get(queue_id)
+    assert state["status"] == spool.FAILED
+    assert "denied" in state["last_error"]
+
+
+def test_interrupted_delivery_is_requeued(outbound):
+    """Entries left in 'sending' by a crash are delivered again."""
+    queue_id = outbound.enqueue("work", b"raw", "me@example.com", ["a@example.com"])
+    outbound.mark_sending(outbound.get(queue_id))
+
+    outbound.recover()
+
+    assert [state["queue_id"] for state in outbound.due()] == [queue_id]
+
+
+@pytest.mark.asyncio
+async def test_only_lock_holder_delivers(tmp_path):
+    """A second server on the spool neither recovers nor delivers while one runs."""
+    first, second = spool.Spool(tmp_path / "spool"), spool.Spool(tmp_path / "spool")
+    assert first.try_lock()
+    queue_id = first.enqueue("work", b"raw", "me@example.com", ["a@example.com"])
+    first.mark_sending(first.get(queue_id))
+
+    deliver = AsyncMock(return_value={})
+    worker = spool.SpoolWorker(second, deliver)
+    with patch.object(spool, "SPOOL_POLL_SECONDS", 0.05):
+        worker.start()
+        await asyncio.sleep(0.2)
+
+        deliver.assert_not_awaited()
+        assert second.get(queue_id)["status"] == spool.SENDING
+
+        # Once the first server exits, the standby takes over and recovers the entry.
+        first.unlock()
+        await asyncio.sleep(0.2)
+        await worker.stop()
+
+    deliver.assert_awaited_once()
+    assert second.get(queue_id)["status"] == spool.SENT
+
+
+def test_index_reads_new_state_files_only(outbound):
+    """Entries are parsed once; refresh() only loads those queued by other processes."""
+    outbound.enqueue("work", b"raw", "me@example.com", ["a@example.com"])
+    outbound.entries()
+    other_process = spool.Spool(outbound.path)
+    other_process.enqueue("home", b"raw", "me@example.com", ["b@example.com"])
+
+    with patch.object(outbound, "_load", wraps=outbound._load) as load:
+        outbound.refresh()
+        assert [state["account_name"] for state in outbound.entries()] == [
+            "work",
+            "home",
+        ]
+
+    load.assert_called_once()
@@ -0,0 +1,218 @@
+"""Tests for the SQLite metadata store."""
+
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+from universal_email_mcp import models, store
+
+
+@pytest.fixture
+def metadata(tmp_path):
+    """A fresh metadata store in a temporary directory."""
+    metadata_store = store.MetadataStore(tmp_path / "metadata.db")
+    yield metadata_store
+    metadata_store.close()
+
+
+def make_message(uid, subject="Hello", sender="a@example.com", day=1):
+    return models.EmailMessage(
+        uid=str(uid),
+        subject=subject,
+        sender=sender,
+        body="",
+        date=datetime(2024, 1, day, 12, 0),
+        is_read=False,
+        has_attachments=False,
+        size=100,
+    )
+
+
+class TestMetadataStore:
+    """Test MetadataStore persistence and queries."""
+
+    def test_search_pages_newest_first(self, metadata):
+        metadata.upsert_messages(
+            "acct", "INBOX", [(make_message(uid), [], 1) for uid in range(1, 6)]
+        )
+
+        messages, total = metadata.search("acct", "INBOX", limit=2, offset=1)
+
+        assert total == 5
+        assert [m.uid for m in messages] == ["4", "3"]
+
+    def test_filters_match_decoded_headers(self, metadata):
+        metadata.upsert_messages(
+            "acct",
+            "INBOX",
+            [
+                (make_message(1, subject="=?utf-8?q?Caf=C3=A9_menu?=", day=2), [], 1),
+                (make_message(2, subject="Other", day=5), ["\\Seen"], 1),
+            ],
+        )
+
+        messages, _ = metadata.search("acct", "INBOX", subject_filter="café")
+        assert [m.uid for m in messages] == ["1"]
+
+        _, unread = metadata.search("acct", "INBOX", unread_only=True, limit=0)
+        assert unread == 1
+
+        messages, _ = metadata.search(
+            "acct", "INBOX", since=datetime(2024, 1, 5, 18, 0)
+        )
+        assert [m.uid for m in messages] == ["2"]
+
+    def test_attachments_round_trip(self, metadata):
+        message = make_message(1)
+        message.has_attachments = True
+        message.attachments = [
+            models.AttachmentInfo(
+                section="2", filename="a.pdf", content_type="application/pdf", size=1234
+            )
+        ]
+        metadata.upsert_messages("acct", "INBOX", [(message, [], 1)])
+
+        (stored,), _ = metadata.search("acct", "INBOX")
+
+        assert stored.attachments == message.attachments
+
+    def test_adds_attachments_column_to_old_databases(self, tmp_path):
+        path = tmp_path / "old.db"
+        db = sqlite3.connect(path)
+        db.executescript(
+            store._SCHEMA.replace("    attachments TEXT NOT NULL DEFAULT '[]',\n", "")
+        )
+        db.close()
+
+        metadata = store.MetadataStore(path)
+        metadata.upsert_messages("acct", "INBOX", [(make_message(1), [], 1)])
+
+        (stored,), _ = metadata.search("acct", "INBOX")
+        assert stored.attachments == []
+        metadata.close()
+
+    def test_flag_updates_and_deletes(self, metadata):
+        metadata.upsert_messages(
+            "acct", "INBOX", [(make_message(uid), [], 1) for uid in range(1, 6)]
+        )
+
+        metadata.update_flags("acct", "INBOX", [(3, ["\\Seen"], 7)])
+        metadata.delete_ranges("acct", "INBOX", [(1, 2), (5, 5)])
+
+        messages, total = metadata.search("acct", "INBOX")
+        assert total == 2
+        assert [(m.uid, m.is_read) for m in messages] == [("4", False), ("3", True)]
+        assert metadata.max_uid("acct", "INBOX") == 4
+
+    def test_delete_missing_keeps_present_uids(self, metadata):
+        rows = [(make_message(uid), [], 1) for uid in range(1, 6)]
+        metadata.upsert_messages("acct", "INBOX", rows)
+
+        assert metadata.delete_missing("acct", "INBOX", [1, 3, 5, 9]) == 2
+        assert metadata.uids("acct", "INBOX") == {1, 3, 5}
+
+    def test_reads_wait_for_open_transactions(self, metadata):
+        """A read from another thread never sees rows of an uncommitted transaction."""
+        writing, release = threading.Event(), threading.Event()
+        counts = []
+
+        def write():
+            with metadata._lock, metadata._db:
+                metadata.upsert_messages("acct", "INBOX", [(make_message(1), [], 1)])
+                writing.set()
+                release.wait(5)
+                metadata.upsert_messages("acct", "INBOX", [(make_message(2), [], 1)])
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        writing.wait(5)
+        reader = threading.Thread(
+            target=lambda: counts.append(metadata.count("acct", "INBOX"))
+        )
+        reader.start()
+        reader.join(0.1)
+        assert counts == []
+
+        release.set()
+        writer.join(5)
+        reader.join(5)
+        assert counts == [2]
+
+    def test_state_survives_reopen(self, tmp_path):
+        path = tmp_path / "metadata.db"
+        first = store.MetadataStore(path)
+        first.set_state("acct", "INBOX", store.MailboxState(42, 100, 6))
+        first.close()
+
+        reopened = store.MetadataStore(path)
+        try:
+            assert reopened.get_state("acct", "INBOX") == store.MailboxState(42, 100, 6)
+            reopened.reset_account("acct")
+            assert reopened.get_state("acct", "INBOX") is None
+        finally:
+            reopened.close()
+
+
+class TestFullTextSearch:
+    """Test the FTS5 index kept alongside stored messages."""
+
+    def test_ranked_phrase_search(self, metadata):
+        metadata.upsert_messages(
+            "acct",
+            "INBOX",
+            [
+                (
+                    make_message(1, subject="Weekly report").model_copy(
+                        update={"preview": "The quarterly budget review is attached"}
+                    ),
+                    [],
+                    1,
+                ),
+                (make_message(2, subject="Quarterly budget review"), [], 1),
+                (
+                    make_message(3, subject="Lunch").model_copy(
+                        update={"preview": "budget for the quarterly party"}
+                    ),
+                    [],
+                    1,
+                ),
+            ],
+        )
+
+        ranked = metadata.full_text_search("acct", "INBOX", "budget")
+        assert ranked[0].uid == "2"
+
+        phrase = metadata.full_text_search("acct", "INBOX", '"quarterly budget"')
+        assert sorted(m.uid for m in phrase) == ["1", "2"]
+        assert "[quarterly budget]" in next(m for m in phrase if m.uid == "1").preview
+
+    def test_index_follows_updates_and_deletes(self, metadata):
+        metadata.upsert_messages(
+            "acct", "INBOX", [(make_message(uid), [], 1) for uid in (1, 2)]
+        )
+
+        metadata.index_body("acct", "INBOX", 2, "Invoice number 4711")
+        assert [
+            m.uid for m in metadata.full_text_search("acct", "INBOX", "invoice")
+        ] == ["2"]
+
+        metadata.upsert_messages(
+            "acct", "INBOX", [(make_message(2, subject="Renamed"), [], 2)]
+        )
+        assert [
+            m.uid for m in metadata.full_text_search("acct", "INBOX", "renamed")
+        ] == ["2"]
+
+        metadata.delete_ranges("acct", "INBOX", [(2, 2)])
+        assert metadata.full_text_search("acct", "INBOX", "invoice") == []
+
+    def test_invalid_syntax_searched_as_words(self, metadata):
+        metadata.upsert_messages(
+            "acct", "INBOX", [(make_message(1, subject="Re: C++ (draft)"), [], 1)]
+        )
+
+        assert [
+            m.uid for m in metadata.full_text_search("acct", "INBOX", "c++ (draft")
+        ] == ["1"]
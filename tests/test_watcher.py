@@ -0,0 +1,175 @@
+"""Tests for the IMAP IDLE watchers."""
+
+from array import array
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from universal_email_mcp import cache, config, models, watcher
+
+
+@pytest.fixture
+def account_settings():
+    """Account settings for watcher tests."""
+    server = config.EmailServer(
+        user_name="testuser", password="testpass", host="imap.example.com", port=993
+    )
+    return config.EmailSettings(
+        account_name="watch_account",
+        full_name="Test User",
+        email_address="test@example.com",
+        incoming=server,
+        outgoing=server,
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.message_cache.clear()
+    yield
+    cache.message_cache.clear()
+
+
+def cached_message(uid):
+    return models.EmailMessage(
+        uid=uid,
+        subject="Cached",
+        sender="a@example.com",
+        body="Body",
+        date=datetime(2024, 1, 1),
+        is_read=False,
+    )
+
+
+class TestMailboxWatcher:
+    """Test how pushed IDLE responses are applied."""
+
+    @pytest.fixture
+    def mailbox_watcher(self, account_settings):
+        notify = AsyncMock()
+        mailbox_watcher = watcher.MailboxWatcher(account_settings, "INBOX", notify)
+        mailbox_watcher._uids = array("I", [10, 11, 12])
+        mailbox_watcher._client = MagicMock()
+        mailbox_watcher._client.uid_search = AsyncMock(
+            return_value=MagicMock(result="OK", lines=[b"12 13 14", b"Search done"])
+        )
+        cache.message_cache.set_uidvalidity("watch_account", "INBOX", 7)
+        for uid in ("10", "11", "12"):
+            cache.message_cache.put("watch_account", "INBOX", 7, cached_message(uid))
+        return mailbox_watcher
+
+    @pytest.mark.asyncio
+    async def test_expunge_and_flags_resolved_by_sequence(self, mailbox_watcher):
+        """EXPUNGE shifts sequence numbers for the FETCH that follows it."""
+        await mailbox_watcher._apply([b"1 EXPUNGE", b"2 FETCH (FLAGS (\\Seen))"])
+
+        assert list(mailbox_watcher._uids) == [11, 12]
+        assert cache.message_cache.get("watch_account", "INBOX", 7, "10") is None
+        assert cache.message_cache.get("watch_account", "INBOX", 7, "12").is_read
+
+        events = [call.args[0] for call in mailbox_watcher.notify.await_args_list]
+        assert [(e["event"], e["uids"]) for e in events] == [
+            ("messages_removed", ["10"]),
+            ("flags_changed", ["12"]),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_new_messages_found_by_uid(self, mailbox_watcher):
+        """EXISTS growth triggers a UID SEARCH from the last known UID."""
+        await mailbox_watcher._apply([b"5 EXISTS"])
+
+        mailbox_watcher._client.uid_search.assert_awaited_once_with("UID 13:*")
+        assert list(mailbox_watcher._uids) == [10, 11, 12, 13, 14]
+        event = mailbox_watcher.notify.await_args.args[0]
+        assert event["event"] == "new_messages"
+        assert event["uids"] == ["13", "14"]
+        assert event["total_messages"] == 5
+
+    @pytest.mark.asyncio
+    async def test_vanished_removes_uid_ranges(self, mailbox_watcher):
+        """QRESYNC connections report expunges as VANISHED UID sets."""
+        await mailbox_watcher._apply([b"VANISHED 11:12"])
+
+        assert list(mailbox_watcher._uids) == [10]
+        assert cache.message_cache.get("watch_account", "INBOX", 7, "11") is None
+
+
+@pytest.mark.asyncio
+async def test_uids_load_read_only_through_esearch(account_settings):
+    """The watched mailbox is EXAMINEd and its UIDs come back as ESEARCH ranges."""
+    mailbox_watcher = watcher.MailboxWatcher(account_settings, "INBOX", AsyncMock())
+    client = MagicMock()
+    client.examine = AsyncMock(
+        return_value=MagicMock(result="OK", lines=[b"OK [UIDVALIDITY 7] UIDs valid"])
+    )
+    client.has_capability.side_effect = lambda capability: capability == "ESEARCH"
+    mailbox_watcher._client = client
+
+    with patch(
+        "universal_email_mcp.tools.mail.esearch",
+        new_callable=AsyncMock,
+        return_value={"ALL": "1:3,9"},
+    ) as esearch:
+        await mailbox_watcher._load_uids()
+
+    client.examine.assert_awaited_once_with("INBOX")
+    client.select.assert_not_called()
+    client.uid_search.assert_not_called()
+    esearch.assert_awaited_once_with(client, "ALL", "ALL")
+    assert list(mailbox_watcher._uids) == [1, 2, 3, 9]
+
+
+class TestWatcherManager:
+    """Test that watchers follow the configured accounts."""
+
+    @pytest.mark.asyncio
+    async def test_refresh_starts_and_stops_watchers(self, account_settings):
+        manager = watcher.WatcherManager(AsyncMock(), mailboxes=["INBOX", "Work"])
+        settings = config.Settings(accounts=[account_settings])
+
+        with (
+            patch.object(watcher.config, "get_settings", return_value=settings),
+            patch.object(watcher.MailboxWatcher, "start") as start,
+            patch.object(
+                watcher.MailboxWatcher, "stop", new_callable=AsyncMock
+            ) as stop,
+        ):
+            await manager.refresh()
+            assert manager.watched == [
+                ("watch_account", "INBOX"),
+                ("watch_account", "Work"),
+            ]
+            assert start.call_count == 2
+
+            settings.accounts = []
+            await manager.refresh()
+            assert manager.watched == []
+            assert stop.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_nothing_is_watched_by_default(self):
+        """Without configured mailboxes, no account is even loaded."""
+        manager = watcher.WatcherManager(AsyncMock(), mailboxes=[])
+
+        with patch.object(watcher.config, "load_settings") as load_settings:
+            await manager.refresh()
+
+        load_settings.assert_not_called()
+        assert manager.watched == []
+
+    @pytest.mark.asyncio
+    async def test_only_listed_accounts_are_watched(self, account_settings):
+        other = account_settings.model_copy(update={"account_name": "other"})
+        settings = config.Settings(accounts=[account_settings, other])
+        manager = watcher.WatcherManager(
+            AsyncMock(), mailboxes=["INBOX"], accounts=["other"]
+        )
+
+        with (
+            patch.object(watcher.config, "get_settings", return_value=settings),
+            patch.object(watcher.MailboxWatcher, "start"),
+        ):
+            await manager.refresh()
+
+        assert manager.watched == [("other", "INBOX")]